@@ -21,7 +21,8 @@ from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as Navigatio
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QScrollArea, QMessageBox, QProgressBar, QMenuBar, QAction, QActionGroup, QPlainTextEdit
 
-from net_simulation_pandapipes.pp_net_time_series_simulation import calculate_results, save_results_csv, import_results_csv
+from net_simulation_pandapipes.pp_net_time_series_simulation import calculate_results, save_results_csv, save_results_npz, import_results, hash_net_parameters
+from net_simulation_pandapipes.net_results_store import save_net_results_store, NetResultsStore
 
 from gui.CalculationTab.calculation_dialogs import NetGenerationDialog, ZeitreihenrechnungDialog
 from gui.CalculationTab.net_calculation_threads import NetInitializationThread, NetCalculationThread
@@ -124,6 +125,8 @@ class CalculationTab(QWidget):
 
         calculateNetAction = QAction('Zeitreihenberechnung', self)
         calcMenu.addAction(calculateNetAction)
+        stopCalculationAction = QAction('Zeitreihenberechnung abbrechen', self)
+        calcMenu.addAction(stopCalculationAction)
 
         OSMAction = QAction('OpenStreetMap laden', self)
         SatelliteMapAction = QAction('Satellitenbild Laden', self)
@@ -151,6 +154,7 @@ class CalculationTab(QWidget):
         loadresultsppAction.triggered.connect(self.load_net_results)
         exportppnetGeoJSONAction.triggered.connect(self.exportNetGeoJSON)
         calculateNetAction.triggered.connect(self.opencalculateNetDialog)
+        stopCalculationAction.triggered.connect(self.stop_simulation)
         OSMAction.triggered.connect(lambda: self.loadMap("OSM", OSMAction))
         SatelliteMapAction.triggered.connect(lambda: self.loadMap("Satellite", SatelliteMapAction))
         TopologyMapAction.triggered.connect(lambda: self.loadMap("Topology", TopologyMapAction))
@@ -298,7 +302,7 @@ class CalculationTab(QWidget):
         self.COP_filename = self.data_manager.get_cop_filename()
         args = (vorlauf, ruecklauf, hast, erzeugeranlagen, json_path, self.COP_filename, return_temperature_heat_consumer, supply_temperature_heat_consumer, supply_temperature, flow_pressure_pump, lift_pressure_pump, \
                 netconfiguration, pipetype, v_max_pipe, material_filter, insulation_filter, self.base_path, self.dT_RL, self.v_max_heat_consumer, self.DiameterOpt_ckecked)
-        kwargs = {"import_type": "GeoJSON"}
+        kwargs = {"import_type": "GeoJSON", "snapshot_path": os.path.join(self.base_path, self.config_manager.get_relative_path('net_snapshot_path'))}
         self.initializationThread = NetInitializationThread(*args, **kwargs)
         self.common_thread_initialization()
 
@@ -499,15 +503,40 @@ class CalculationTab(QWidget):
         try:
             self.calculationThread = NetCalculationThread(self.net, self.yearly_time_steps, self.waerme_ges_W, self.calc1, self.calc2, self.supply_temperature, self.supply_temperature_heat_consumer, \
                                                           self.return_temperature_heat_consumer, self.supply_temperature_buildings, self.return_temperature_buildings, self.supply_temperature_buildings_curve, \
-                                                            self.return_temperature_buildings_curve, self.dT_RL, self.netconfiguration, self.building_temp_checked, self.TRY_filename, self.COP_filename)
+                                                            self.return_temperature_buildings_curve, self.dT_RL, self.netconfiguration, self.building_temp_checked, self.TRY_filename, self.COP_filename, \
+                                                                getattr(self, 'net_results_store', None))
             self.calculationThread.calculation_done.connect(self.on_simulation_done)
             self.calculationThread.calculation_error.connect(self.on_simulation_error)
+            self.calculationThread.calculation_progress.connect(self.on_simulation_progress)
             self.calculationThread.start()
             self.progressBar.setRange(0, 0)
 
         except ValueError as e:
             QMessageBox.warning("Ungültige Eingabe", str(e))
 
+    def on_simulation_progress(self, completed_steps, total_steps, elapsed_time, iterations_hydraulic, iterations_thermal):
+        """
+        Callback function for the progress of the simulation.
+
+        Args:
+            completed_steps (int): Number of completed time steps.
+            total_steps (int): Number of time steps.
+            elapsed_time (float): Elapsed time in seconds.
+            iterations_hydraulic (int): Hydraulic iterations of the last time step.
+            iterations_thermal (int): Thermal iterations of the last time step.
+        """
+        self.progressBar.setRange(0, total_steps)
+        self.progressBar.setValue(completed_steps)
+        remaining_time = elapsed_time / completed_steps * (total_steps - completed_steps)
+        self.progressBar.setFormat(f"Zeitschritt %v von %m ({elapsed_time:.0f} s, noch ca. {remaining_time:.0f} s, Iterationen: {iterations_hydraulic} hydraulisch, {iterations_thermal} thermisch)")
+
+    def stop_simulation(self):
+        """
+        Stops the running simulation, the results of the completed time steps are kept.
+        """
+        if hasattr(self, 'calculationThread') and self.calculationThread.isRunning():
+            self.calculationThread.requestInterruption()
+
     def on_simulation_done(self, results):
         """
         Callback function when simulation is done.
@@ -516,18 +545,35 @@ class CalculationTab(QWidget):
             results: Results of the simulation.
         """
         self.progressBar.setRange(0, 1)
+        self.progressBar.resetFormat()
         self.time_steps, self.net, self.net_results, self.waerme_ges_W, self.strom_wp_W = results
 
-        self.waerme_ges_kW = (np.sum(self.waerme_ges_W, axis=0)/1000)[self.calc1:self.calc2]
-        self.strom_wp_kW = (np.sum(self.strom_wp_W, axis=0)/1000)[self.calc1:self.calc2]
+        if len(self.time_steps) == 0:
+            QMessageBox.information(self, "Berechnung abgebrochen", "Die Zeitreihenberechnung wurde vor dem ersten Zeitschritt abgebrochen.")
+            return
+        elif len(self.time_steps) < self.calc2 - self.calc1:
+            QMessageBox.information(self, "Berechnung abgebrochen", f"Die Zeitreihenberechnung wurde abgebrochen. Es werden die Ergebnisse der ersten {len(self.time_steps)} Zeitschritte verwendet.")
+
+        self.waerme_ges_kW = (np.sum(self.waerme_ges_W, axis=0)/1000)[self.calc1:self.calc1 + len(self.time_steps)]
+        self.strom_wp_kW = (np.sum(self.strom_wp_W, axis=0)/1000)[self.calc1:self.calc1 + len(self.time_steps)]
 
         self.pump_results = calculate_results(self.net, self.net_results)
 
+        save_results_csv(self.time_steps, self.waerme_ges_kW, self.strom_wp_kW, self.pump_results, self.output_filename)
+        # Binary copy of the results for fast loading, the CSV file stays as export
+        save_results_npz(self.time_steps, self.waerme_ges_kW, self.strom_wp_kW, self.pump_results, os.path.splitext(self.output_filename)[0] + ".npz")
+        # Results of all network elements, these are only read when plotted
+        net_results_store_path = os.path.splitext(self.output_filename)[0] + " Netzergebnisse"
+        # Release the memory-mapped files of the previous results before they are overwritten
+        if getattr(self, 'net_results_store', None) is not None:
+            self.net_results_store.close()
+        save_net_results_store(self.net, self.net_results, self.time_steps, net_results_store_path, self.calculationThread.inputs, hash_net_parameters(self.net))
+        self.net_results_store = NetResultsStore(net_results_store_path)
+
         self.plot_data =  self.time_steps, self.waerme_ges_kW, self.strom_wp_kW, self.pump_results
         self.plot_data_func(self.plot_data)
         self.plot2()
         self.display_results()
-        save_results_csv(self.time_steps, self.waerme_ges_kW, self.strom_wp_kW, self.pump_results, self.output_filename)
 
     def plot_data_func(self, plot_data):
         """
@@ -555,6 +601,16 @@ class CalculationTab(QWidget):
                 self.plot_data[f"Vorlaufdruck {pump_type} {idx+1}"] = {"data": pump_data['flow_pressure'], "label": "Druck in bar", "axis": "right"}
                 self.plot_data[f"Rücklaufdruck {pump_type} {idx+1}"] = {"data": pump_data['return_pressure'], "label": "Druck in bar", "axis": "right"}
 
+        # The results of the heat consumers are loaded from the results store when they are selected
+        store = getattr(self, 'net_results_store', None)
+        if store is not None and "res_heat_consumer.t_from_k" in store:
+            names = store.get_names("res_heat_consumer.t_from_k")
+            for position, idx in enumerate(store.get_elements("res_heat_consumer.t_from_k")):
+                name = names[position] if names else f"Wärmeübertrager {idx+1}"
+                self.plot_data[f"Vorlauftemperatur {name}"] = {"data": lambda idx=idx: store.load("res_heat_consumer.t_from_k", idx) - 273.15, "label": "Temperatur in °C", "axis": "right"}
+                self.plot_data[f"Rücklauftemperatur {name}"] = {"data": lambda idx=idx: store.load("res_heat_consumer.t_to_k", idx) - 273.15, "label": "Temperatur in °C", "axis": "right"}
+                self.plot_data[f"Massenstrom {name}"] = {"data": lambda idx=idx: store.load("res_heat_consumer.mdot_from_kg_per_s", idx), "label": "Massenstrom in kg/s", "axis": "right"}
+
     def on_simulation_error(self, error_message):
         """
         Callback function when there is a simulation error.
@@ -564,6 +620,7 @@ class CalculationTab(QWidget):
         """
         QMessageBox.critical(self, "Berechnungsfehler", error_message)
         self.progressBar.setRange(0, 1)
+        self.progressBar.resetFormat()
 
     def closeEvent(self, event):
         """
@@ -610,12 +667,13 @@ class CalculationTab(QWidget):
             if self.dataSelectionDropdown.itemChecked(i):
                 key = self.dataSelectionDropdown.itemText(i)
                 data_info = self.plot_data[key]
+                data = data_info["data"]() if callable(data_info["data"]) else data_info["data"]
                 color = next(color_cycle)
                 if data_info["axis"] == "left":
-                    ax_left.plot(self.time_steps, data_info["data"], label=key, color=color)
+                    ax_left.plot(self.time_steps, data, label=key, color=color)
                     left_labels.add(data_info["label"])
                 elif data_info["axis"] == "right":
-                    ax_right.plot(self.time_steps, data_info["data"], label=key, color=color)
+                    ax_right.plot(self.time_steps, data, label=key, color=color)
                     right_labels.add(data_info["label"])
 
         ax_left.set_xlabel("Zeit")
@@ -752,8 +810,12 @@ class CalculationTab(QWidget):
         Loads the network results from a file.
         """
         results_csv_filepath = os.path.join(self.base_path, self.config_manager.get_relative_path('load_profile_path'))
-        plot_data = import_results_csv(results_csv_filepath)
+        plot_data = import_results(results_csv_filepath)
         self.time_steps, self.waerme_ges_kW, self.strom_wp_kW, self.pump_results = plot_data
+
+        net_results_store_path = os.path.splitext(results_csv_filepath)[0] + " Netzergebnisse"
+        self.net_results_store = NetResultsStore(net_results_store_path) if os.path.exists(os.path.join(net_results_store_path, "index.json")) else None
+
         self.plot_data_func(plot_data)
         self.plot2()
         self.display_results()
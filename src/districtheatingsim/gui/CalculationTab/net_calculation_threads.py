@@ -10,8 +10,10 @@ import traceback
 from PyQt5.QtCore import QThread, pyqtSignal
 
 from net_simulation_pandapipes.pp_net_initialisation_geojson import initialize_geojson
-from net_simulation_pandapipes.pp_net_time_series_simulation import thermohydraulic_time_series_net, time_series_preprocessing
+from net_simulation_pandapipes.pp_net_time_series_simulation import thermohydraulic_time_series_net, thermohydraulic_time_series_net_incremental, \
+    time_series_preprocessing, time_series_inputs
 from net_simulation_pandapipes.utilities import net_optimization
+from net_simulation_pandapipes.net_snapshot_cache import hash_initialization_inputs, load_net_snapshot, save_net_snapshot
 
 class NetInitializationThread(QThread):
     """
@@ -31,7 +33,8 @@ class NetInitializationThread(QThread):
         Args:
             *args: Positional arguments.
             mass_flow_secondary_producers (float): Mass flow of secondary producers. Defaults to 0.1.
-            **kwargs: Keyword arguments.
+            **kwargs: Keyword arguments. With "snapshot_path" the initialized network is stored in and loaded from this directory
+                as long as the input files and parameters are unchanged.
         """
         super().__init__()
         self.args = args
@@ -49,6 +52,9 @@ class NetInitializationThread(QThread):
                 self.netconfiguration, self.pipetype, self.v_max_pipe, self.material_filter, self.insulation_filter, \
                 self.base_path, self.dT_RL, self.v_max_heat_consumer, self.DiameterOpt_ckecked = self.args
 
+                if self.load_snapshot():
+                    return
+
                 self.net, self.yearly_time_steps, self.waerme_hast_ges_W, self.return_temperature_heat_consumer, \
                 self.supply_temperature_buildings, self.return_temperature_buildings, self.supply_temperature_building_curve, \
                 self.return_temperature_building_curve, strombedarf_hast_ges_W, max_el_leistung_hast_ges_W  = initialize_geojson(self.vorlauf, self.ruecklauf, self.hast, \
@@ -64,6 +70,8 @@ class NetInitializationThread(QThread):
             # Common steps for both import types
             if self.DiameterOpt_ckecked == True:
                 self.net = net_optimization(self.net, self.v_max_pipe, self.v_max_heat_consumer, self.material_filter, self.insulation_filter)
+
+            self.save_snapshot(strombedarf_hast_ges_W, max_el_leistung_hast_ges_W)
             
             self.calculation_done.emit((self.net, self.yearly_time_steps, self.waerme_hast_ges_W, self.supply_temperature_heat_consumer, self.return_temperature_heat_consumer, \
                                         self.supply_temperature_buildings, self.return_temperature_buildings, self.supply_temperature_building_curve, self.return_temperature_building_curve, \
@@ -71,6 +79,64 @@ class NetInitializationThread(QThread):
 
         except Exception as e:
             self.calculation_error.emit(str(e) + "\n" + traceback.format_exc())
+
+    def get_snapshot_key(self):
+        """
+        Calculates the key of the network snapshot from the input files and parameters.
+
+        Returns:
+            str: Key of the inputs.
+        """
+        filenames = [self.vorlauf, self.ruecklauf, self.hast, self.erzeugeranlagen, self.json_path, self.COP_filename]
+        parameters = {"supply_temperature_heat_consumer": self.supply_temperature_heat_consumer, "return_temperature_heat_consumer": self.return_temperature_heat_consumer,
+                      "supply_temperature": self.supply_temperature, "flow_pressure_pump": self.flow_pressure_pump, "lift_pressure_pump": self.lift_pressure_pump,
+                      "netconfiguration": self.netconfiguration, "pipetype": self.pipetype, "v_max_pipe": self.v_max_pipe, "material_filter": self.material_filter,
+                      "insulation_filter": self.insulation_filter, "dT_RL": self.dT_RL, "v_max_heat_consumer": self.v_max_heat_consumer,
+                      "DiameterOpt_ckecked": self.DiameterOpt_ckecked, "mass_flow_secondary_producers": self.mass_flow_secondary_producers}
+        return hash_initialization_inputs(filenames, parameters)
+
+    def load_snapshot(self):
+        """
+        Loads the network from the snapshot and emits it if the input files and parameters are unchanged.
+
+        Returns:
+            bool: True if the snapshot was used.
+        """
+        snapshot_path = self.kwargs.get("snapshot_path")
+        if not snapshot_path:
+            return False
+
+        # The key is calculated before the initialization, which replaces some of the parameters by the calculated values
+        self.snapshot_key = self.get_snapshot_key()
+        snapshot = load_net_snapshot(snapshot_path, self.snapshot_key)
+        if snapshot is None:
+            return False
+
+        self.net, arrays = snapshot
+        self.yearly_time_steps, self.waerme_hast_ges_W = arrays["yearly_time_steps"], arrays["waerme_hast_ges_W"]
+        self.calculation_done.emit((self.net, self.yearly_time_steps, self.waerme_hast_ges_W, self.supply_temperature_heat_consumer, arrays["return_temperature_heat_consumer"], \
+                                    arrays["supply_temperature_buildings"], arrays["return_temperature_buildings"], arrays["supply_temperature_building_curve"], \
+                                    arrays["return_temperature_building_curve"], arrays["strombedarf_hast_ges_W"], arrays["max_el_leistung_hast_ges_W"]))
+        return True
+
+    def save_snapshot(self, strombedarf_hast_ges_W, max_el_leistung_hast_ges_W):
+        """
+        Saves the initialized network as snapshot for the next initialization with the same inputs.
+
+        Args:
+            strombedarf_hast_ges_W (array): Power consumption of the heat exchangers.
+            max_el_leistung_hast_ges_W (array): Maximum electrical power demand of the heat exchangers.
+        """
+        snapshot_path = self.kwargs.get("snapshot_path")
+        if not snapshot_path:
+            return
+
+        arrays = {"yearly_time_steps": self.yearly_time_steps, "waerme_hast_ges_W": self.waerme_hast_ges_W, 
+                  "return_temperature_heat_consumer": self.return_temperature_heat_consumer, "supply_temperature_buildings": self.supply_temperature_buildings,
+                  "return_temperature_buildings": self.return_temperature_buildings, "supply_temperature_building_curve": self.supply_temperature_building_curve,
+                  "return_temperature_building_curve": self.return_temperature_building_curve, "strombedarf_hast_ges_W": strombedarf_hast_ges_W,
+                  "max_el_leistung_hast_ges_W": max_el_leistung_hast_ges_W}
+        save_net_snapshot(snapshot_path, self.snapshot_key, self.net, arrays)
     
     def stop(self):
         """
@@ -85,15 +151,18 @@ class NetCalculationThread(QThread):
     Thread for network calculations.
 
     Signals:
-        calculation_done (object): Emitted when the calculation is done.
+        calculation_done (object): Emitted when the calculation is done or was stopped, then with the results of the completed time steps.
         calculation_error (str): Emitted when an error occurs during the calculation.
+        calculation_progress (int, int, float, int, int): Emitted after every time step with the completed and total time steps, 
+            the elapsed time in seconds and the hydraulic and thermal iterations of the time step.
     """
     calculation_done = pyqtSignal(object)
     calculation_error = pyqtSignal(str)
+    calculation_progress = pyqtSignal(int, int, float, int, int)
 
     def __init__(self, net, yearly_time_steps, total_heat_W, calc1, calc2, supply_temperature, supply_temperature_heat_consumer, return_temperature_heat_consumer, supply_temperature_buildings, \
                  return_temperature_buildings, supply_temperature_buildings_curve, return_temperature_buildings_curve, dT_RL=5, netconfiguration=None, building_temp_checked=False, \
-                    TRY_filename=None, COP_filename=None):
+                    TRY_filename=None, COP_filename=None, previous_results=None):
         """
         Initializes the NetCalculationThread.
 
@@ -115,6 +184,7 @@ class NetCalculationThread(QThread):
             building_temp_checked (bool, optional): Whether building temperature is checked. Defaults to False.
             TRY_filename (str, optional): TRY filename. Defaults to None.
             COP_filename (str, optional): COP filename. Defaults to None.
+            previous_results (NetResultsStore, optional): Results of the previous calculation, only the time steps affected by changes are calculated again. Defaults to None.
         """
         super().__init__()
         self.net = net
@@ -134,6 +204,7 @@ class NetCalculationThread(QThread):
         self.building_temp_checked = building_temp_checked
         self.TRY_filename = TRY_filename
         self.COP_filename = COP_filename
+        self.previous_results = previous_results
     
     def run(self):
         """
@@ -147,8 +218,20 @@ class NetCalculationThread(QThread):
                                                                                                                                 self.return_temperature_buildings_curve, self.dT_RL, \
                                                                                                                                 self.supply_temperature_buildings_curve, self.COP_filename)
 
-            self.time_steps, self.net, self.net_results = thermohydraulic_time_series_net(self.net, self.yearly_time_steps, self.waerme_hast_ges_W, self.calc1, \
-                                                                                          self.calc2, self.supply_temperature, self.supply_temperature_heat_consumer, self.return_temperature_heat_consumer)
+            if self.previous_results is not None:
+                self.time_steps, self.net, self.net_results = thermohydraulic_time_series_net_incremental(self.net, self.yearly_time_steps, self.waerme_hast_ges_W, self.calc1, \
+                                                                                                          self.calc2, self.supply_temperature, self.supply_temperature_heat_consumer, \
+                                                                                                          self.return_temperature_heat_consumer, previous_results=self.previous_results, \
+                                                                                                          progress_callback=self.calculation_progress.emit, \
+                                                                                                          interruption_check=self.isInterruptionRequested)
+            else:
+                self.time_steps, self.net, self.net_results = thermohydraulic_time_series_net(self.net, self.yearly_time_steps, self.waerme_hast_ges_W, self.calc1, \
+                                                                                              self.calc2, self.supply_temperature, self.supply_temperature_heat_consumer, self.return_temperature_heat_consumer, \
+                                                                                              progress_callback=self.calculation_progress.emit, interruption_check=self.isInterruptionRequested)
+
+            # Inputs of the calculated time steps, stored with the results for the next incremental calculation
+            self.inputs = time_series_inputs(self.waerme_hast_ges_W, self.calc1, self.calc1 + len(self.time_steps), self.supply_temperature, \
+                                             self.supply_temperature_heat_consumer, self.return_temperature_heat_consumer)
 
             self.calculation_done.emit((self.time_steps, self.net, self.net_results, self.waerme_hast_ges_W, self.strom_hast_ges_W))
         except Exception as e:
@@ -14,7 +14,7 @@ import traceback
 
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog, QHBoxLayout, QMessageBox
 
-from net_simulation_pandapipes.pp_net_time_series_simulation import import_results_csv
+from net_simulation_pandapipes.pp_net_time_series_simulation import import_results
 
 class StatComparisonTab(QWidget):
     def __init__(self, folder_manager, config_manager, parent=None):
@@ -242,7 +242,7 @@ class StatComparisonTab(QWidget):
         Loads the network results from a file.
         """
         results_csv_filepath = os.path.join(folder_path, self.config_manager.get_relative_path("load_profile_path"))
-        plot_data = import_results_csv(results_csv_filepath)
+        plot_data = import_results(results_csv_filepath)
         self.time_steps, self.waerme_ges_kW, self.strom_wp_kW, self.pump_results = plot_data
 
     def display_data_in_table(self):
@@ -10,7 +10,7 @@ import traceback
 
 from PyQt5.QtCore import QThread, pyqtSignal
 
-from net_simulation_pandapipes.pp_net_time_series_simulation import import_results_csv
+from net_simulation_pandapipes.pp_net_time_series_simulation import import_results
 from heat_generators.heat_generation_mix import Berechnung_Erzeugermix, optimize_mix
 
 class CalculateMixThread(QThread):
@@ -67,7 +67,7 @@ class CalculateMixThread(QThread):
         Runs the heat generation mix calculation.
         """
         try:
-            time_steps, waerme_ges_kW, strom_wp_kW, pump_results = import_results_csv(self.filename)
+            time_steps, waerme_ges_kW, strom_wp_kW, pump_results = import_results(self.filename)
             ### hier erstmal Vereinfachung, Temperaturen, Drücke der Hauptzenztrale, Leistungen addieren
             
             qext_values = []  # Diese Liste wird alle qext_kW Arrays speichern
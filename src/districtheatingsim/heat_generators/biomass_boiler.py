@@ -8,6 +8,7 @@ Description: Contains the BiomassBoiler class representing a biomass boiler syst
 
 import numpy as np
 from heat_generators.annuity import annuität
+from heat_generators.storage_dispatch import simulate_storage_dispatch
 
 class BiomassBoiler:
     """
@@ -113,33 +114,8 @@ class BiomassBoiler:
         min_speicher_fill = self.min_fill * speicher_kapazitaet
         max_speicher_fill = self.max_fill * speicher_kapazitaet
 
-        self.Wärmeleistung_kW = np.zeros_like(Last_L)
-        self.Wärmeleistung_Speicher_kW = np.zeros_like(Last_L)
-        self.speicher_fuellstand = np.zeros_like(Last_L)
-
-        for i in range(len(Last_L)):
-            if self.BMK_an:
-                if speicher_fill >= max_speicher_fill:
-                    self.BMK_an = False
-                else:
-                    self.Wärmeleistung_kW[i] = self.P_BMK
-                    if Last_L[i] < self.P_BMK:
-                        self.Wärmeleistung_Speicher_kW[i] = Last_L[i] - self.P_BMK
-                        speicher_fill += (self.P_BMK - Last_L[i]) * duration
-                        speicher_fill = float(min(speicher_fill, speicher_kapazitaet))
-                    else:
-                        self.Wärmeleistung_Speicher_kW[i] = 0
-            else:
-                if speicher_fill <= min_speicher_fill:
-                    self.BMK_an = True
-            
-            if not self.BMK_an:
-                self.Wärmeleistung_kW[i] = 0
-                self.Wärmeleistung_Speicher_kW[i] = Last_L[i]
-                speicher_fill -= Last_L[i] * duration
-                speicher_fill = float(max(speicher_fill, 0))
-
-            self.speicher_fuellstand[i] = speicher_fill / speicher_kapazitaet * 100  # %
+        self.Wärmeleistung_kW, self.Wärmeleistung_Speicher_kW, self.speicher_fuellstand, self.BMK_an = \
+            simulate_storage_dispatch(Last_L, self.P_BMK, duration, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, self.BMK_an)
 
         self.Wärmemenge_Biomassekessel_Speicher = np.sum(self.Wärmeleistung_kW / 1000) * duration
 
@@ -171,6 +147,7 @@ class BiomassBoiler:
             float: Weighted average cost of heat generation.
         """
         if Wärmemenge == 0:
+            self.WGK_BMK = 0
             return 0
         
         self.Investitionskosten_Kessel = self.spez_Investitionskosten * self.P_BMK
@@ -9,6 +9,7 @@ Description: Contains the Combined Heat and Power (CHP) class for simulating CHP
 import numpy as np
 
 from heat_generators.annuity import annuität
+from heat_generators.storage_dispatch import simulate_storage_dispatch
 
 class CHP:
     """
@@ -138,35 +139,9 @@ class CHP:
         min_speicher_fill = self.min_fill * speicher_kapazitaet
         max_speicher_fill = self.max_fill * speicher_kapazitaet
 
-        self.Wärmeleistung_kW = np.zeros_like(Last_L)
-        self.Wärmeleistung_Speicher_kW = np.zeros_like(Last_L)
-        self.el_Leistung_BHKW_kW = np.zeros_like(Last_L)
-        self.speicher_fuellstand_BHKW = np.zeros_like(Last_L)
-
-        for i in range(len(Last_L)):
-            if self.BHKW_an:
-                if speicher_fill >= max_speicher_fill:
-                    self.BHKW_an = False
-                else:
-                    self.Wärmeleistung_kW[i] = self.th_Leistung_BHKW
-                    if Last_L[i] < self.th_Leistung_BHKW:
-                        self.Wärmeleistung_Speicher_kW[i] = Last_L[i] - self.th_Leistung_BHKW
-                        speicher_fill += (self.th_Leistung_BHKW - Last_L[i]) * duration
-                        speicher_fill = float(min(speicher_fill, speicher_kapazitaet))
-                    else:
-                        self.Wärmeleistung_Speicher_kW[i] = 0
-            else:
-                if speicher_fill <= min_speicher_fill:
-                    self.BHKW_an = True
-            
-            if not self.BHKW_an:
-                self.Wärmeleistung_kW[i] = 0
-                self.Wärmeleistung_Speicher_kW[i] = Last_L[i]
-                speicher_fill -= Last_L[i] * duration
-                speicher_fill = float(max(speicher_fill, 0))
-
-            self.el_Leistung_BHKW_kW[i] = self.Wärmeleistung_kW[i] / self.thermischer_Wirkungsgrad * self.el_Wirkungsgrad
-            self.speicher_fuellstand_BHKW[i] = speicher_fill / speicher_kapazitaet * 100  # %
+        self.Wärmeleistung_kW, self.Wärmeleistung_Speicher_kW, self.speicher_fuellstand_BHKW, self.BHKW_an = \
+            simulate_storage_dispatch(Last_L, self.th_Leistung_BHKW, duration, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, self.BHKW_an)
+        self.el_Leistung_BHKW_kW = (self.Wärmeleistung_kW / self.thermischer_Wirkungsgrad * self.el_Wirkungsgrad).astype(self.Wärmeleistung_kW.dtype)
 
         self.Wärmemenge_BHKW_Speicher = np.sum(self.Wärmeleistung_kW / 1000) * duration
         self.Strommenge_BHKW_Speicher = np.sum(self.el_Leistung_BHKW_kW / 1000) * duration
@@ -169,29 +169,15 @@ def Berechnung_Erzeugermix(tech_order, initial_data, start, end, TRY, COP_data,
 
     return general_results
 
-def optimize_mix(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, kapitalzins, preissteigerungsrate, betrachtungszeitraum, stundensatz, weights):
+def get_optimization_variables(tech_order):
     """
-    Optimize the energy generation mix for minimal cost, emissions, and primary energy use.
+    Collect the decision variables of the technologies for the optimization of the energy generation mix.
 
     Args:
         tech_order (list): List of technology objects to be considered.
-        initial_data (tuple): Initial data including time steps, load profile, flow temperature, and return temperature.
-        start (int): Start time step for the optimization.
-        end (int): End time step for the optimization.
-        TRY (object): Test Reference Year data for temperature and solar radiation.
-        COP_data (object): Coefficient of Performance data for heat pumps.
-        Gaspreis (float): Gas price in €/kWh.
-        Strompreis (float): Electricity price in €/kWh.
-        Holzpreis (float): Biomass price in €/kWh.
-        BEW (float): Specific CO2 emissions for electricity in kg CO2/kWh.
-        kapitalzins (float): Capital interest rate in percentage.
-        preissteigerungsrate (float): Inflation rate in percentage.
-        betrachtungszeitraum (int): Consideration period in years.
-        stundensatz (float): Hourly rate for labor in €/h.
-        weights (dict): Weights for different optimization criteria.
 
     Returns:
-        list: Optimized list of technology objects with updated parameters.
+        tuple: Initial values, names of the variables (see Berechnung_Erzeugermix) and bounds of the variables.
     """
     initial_values = []
     variables_order = []
@@ -253,21 +239,89 @@ def optimize_mix(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis,
             max_power_river = 1000
             bounds.append((min_power_river, max_power_river))
 
+    return initial_values, variables_order, bounds
+
+def calculate_weighted_sum(general_results, weights):
+    """
+    Calculate the objective of the optimization from the results of the energy generation mix.
+
+    Args:
+        general_results (dict): Results of Berechnung_Erzeugermix.
+        weights (dict): Weights for different optimization criteria.
+
+    Returns:
+        float: Weighted sum of heat generation costs, specific emissions and primary energy factor.
+    """
+    # Skalierung der Zielgrößen basierend auf ihren erwarteten Bereichen
+    wgk_scale = 1.0  # Annahme: Wärmegestehungskosten liegen im Bereich von 0 bis 300 €/MWh
+    co2_scale = 1000  # Annahme: Spezifische Emissionen liegen im Bereich von 0 bis 1 tCO2/MWh
+    primary_energy_scale = 100.0  # Annahme: Primärenergiefaktor liegt im Bereich von 0 bis 3
+
+    weighted_sum = (weights['WGK_Gesamt'] * general_results['WGK_Gesamt'] * wgk_scale +
+                    weights['specific_emissions_Gesamt'] * general_results['specific_emissions_Gesamt'] * co2_scale +
+                    weights['primärenergiefaktor_Gesamt'] * general_results['primärenergiefaktor_Gesamt'] * primary_energy_scale)
+
+    return weighted_sum
+
+def apply_optimized_values(tech_order, optimized_values, variables_order):
+    """
+    Set the optimized values of the decision variables in the technology objects.
+
+    Args:
+        tech_order (list): List of technology objects to be considered.
+        optimized_values (array): Values of the decision variables.
+        variables_order (list): Names of the variables, see get_optimization_variables.
+    """
+    for idx, tech in enumerate(tech_order):
+        if isinstance(tech, SolarThermal):
+            tech.bruttofläche_STA = optimized_values[variables_order.index(f"bruttofläche_STA_{idx}")]
+            tech.vs = optimized_values[variables_order.index(f"vs_{idx}")]
+        elif isinstance(tech, BiomassBoiler):
+            tech.P_BMK = optimized_values[variables_order.index(f"P_BMK_{idx}")]
+            if tech.speicher_aktiv:
+                tech.Speicher_Volumen = optimized_values[variables_order.index(f"Speicher_Volumen_{idx}")]
+        elif isinstance(tech, CHP):
+            tech.th_Leistung_BHKW = optimized_values[variables_order.index(f"th_Leistung_BHKW_{idx}")]
+            if tech.speicher_aktiv:
+                tech.Speicher_Volumen_BHKW = optimized_values[variables_order.index(f"Speicher_Volumen_BHKW_{idx}")]
+        elif isinstance(tech, Geothermal):
+            tech.Fläche = optimized_values[variables_order.index(f"Fläche_{idx}")]
+            tech.Bohrtiefe = optimized_values[variables_order.index(f"Bohrtiefe_{idx}")]
+        elif isinstance(tech, WasteHeatPump):
+            tech.Kühlleistung_Abwärme = optimized_values[variables_order.index(f"Kühlleistung_Abwärme_{idx}")]
+        elif isinstance(tech, RiverHeatPump):
+            tech.Wärmeleistung_FW_WP = optimized_values[variables_order.index(f"Wärmeleistung_FW_WP_{idx}")]
+
+def optimize_mix(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, kapitalzins, preissteigerungsrate, betrachtungszeitraum, stundensatz, weights):
+    """
+    Optimize the energy generation mix for minimal cost, emissions, and primary energy use.
+
+    Args:
+        tech_order (list): List of technology objects to be considered.
+        initial_data (tuple): Initial data including time steps, load profile, flow temperature, and return temperature.
+        start (int): Start time step for the optimization.
+        end (int): End time step for the optimization.
+        TRY (object): Test Reference Year data for temperature and solar radiation.
+        COP_data (object): Coefficient of Performance data for heat pumps.
+        Gaspreis (float): Gas price in €/kWh.
+        Strompreis (float): Electricity price in €/kWh.
+        Holzpreis (float): Biomass price in €/kWh.
+        BEW (float): Specific CO2 emissions for electricity in kg CO2/kWh.
+        kapitalzins (float): Capital interest rate in percentage.
+        preissteigerungsrate (float): Inflation rate in percentage.
+        betrachtungszeitraum (int): Consideration period in years.
+        stundensatz (float): Hourly rate for labor in €/h.
+        weights (dict): Weights for different optimization criteria.
+
+    Returns:
+        list: Optimized list of technology objects with updated parameters.
+    """
+    initial_values, variables_order, bounds = get_optimization_variables(tech_order)
 
     def objective(variables):
         general_results = Berechnung_Erzeugermix(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, variables, variables_order, \
                                             kapitalzins=kapitalzins, preissteigerungsrate=preissteigerungsrate, betrachtungszeitraum=betrachtungszeitraum, stundensatz=stundensatz)
-        
-        # Skalierung der Zielgrößen basierend auf ihren erwarteten Bereichen
-        wgk_scale = 1.0  # Annahme: Wärmegestehungskosten liegen im Bereich von 0 bis 300 €/MWh
-        co2_scale = 1000  # Annahme: Spezifische Emissionen liegen im Bereich von 0 bis 1 tCO2/MWh
-        primary_energy_scale = 100.0  # Annahme: Primärenergiefaktor liegt im Bereich von 0 bis 3
-
-        weighted_sum = (weights['WGK_Gesamt'] * general_results['WGK_Gesamt'] * wgk_scale +
-                        weights['specific_emissions_Gesamt'] * general_results['specific_emissions_Gesamt'] * co2_scale +
-                        weights['primärenergiefaktor_Gesamt'] * general_results['primärenergiefaktor_Gesamt'] * primary_energy_scale)
-        
-        return weighted_sum
+        return calculate_weighted_sum(general_results, weights)
     
     # optimization
     result = minimize(objective, initial_values, method='SLSQP', bounds=bounds, options={'maxiter': 100})
@@ -278,25 +332,7 @@ def optimize_mix(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis,
         print(f"Optimierte Werte: {optimized_values}")
         print(f"Minimierte gewichtete Summe: {optimized_objective:.2f}")
 
-        for idx, tech in enumerate(tech_order):
-            if isinstance(tech, SolarThermal):
-                tech.bruttofläche_STA = optimized_values[variables_order.index(f"bruttofläche_STA_{idx}")]
-                tech.vs = optimized_values[variables_order.index(f"vs_{idx}")]
-            elif isinstance(tech, BiomassBoiler):
-                tech.P_BMK = optimized_values[variables_order.index(f"P_BMK_{idx}")]
-                if tech.speicher_aktiv:
-                    tech.Speicher_Volumen = optimized_values[variables_order.index(f"Speicher_Volumen_{idx}")]
-            elif isinstance(tech, CHP):
-                tech.th_Leistung_BHKW = optimized_values[variables_order.index(f"th_Leistung_BHKW_{idx}")]
-                if tech.speicher_aktiv:
-                    tech.Speicher_Volumen_BHKW = optimized_values[variables_order.index(f"Speicher_Volumen_BHKW_{idx}")]
-            elif isinstance(tech, Geothermal):
-                tech.Fläche = optimized_values[variables_order.index(f"Fläche_{idx}")]
-                tech.Bohrtiefe = optimized_values[variables_order.index(f"Bohrtiefe_{idx}")]
-            elif isinstance(tech, WasteHeatPump):
-                tech.Kühlleistung_Abwärme = optimized_values[variables_order.index(f"Kühlleistung_Abwärme_{idx}")]
-            elif isinstance(tech, RiverHeatPump):
-                tech.Wärmeleistung_FW_WP = optimized_values[variables_order.index(f"Wärmeleistung_FW_WP_{idx}")]
+        apply_optimized_values(tech_order, optimized_values, variables_order)
 
         return tech_order
     else:
@@ -7,11 +7,11 @@ Description: Contains classes for different types of heat pumps and methods to c
 """
 
 import numpy as np
-from scipy.interpolate import RegularGridInterpolator
 
 import CoolProp.CoolProp as CP
 
 from heat_generators.annuity import annuität
+from utilities.cop_interpolation import get_cop_interpolator
 
 class HeatPump:
     """
@@ -57,36 +57,22 @@ class HeatPump:
             tuple: Interpolated COP values and adjusted flow temperatures.
         """
 
-        # Interpolationsformel für den COP
-        values = COP_data  # np.genfromtxt('Kennlinien WP.csv', delimiter=';')
-        row_header = values[0, 1:]  # Vorlauftemperaturen
-        col_header = values[1:, 0]  # Quelltemperaturen
-        values = values[1:, 1:]
-
-        f = RegularGridInterpolator((col_header, row_header), values, method='linear', bounds_error=False, fill_value=None)
+        # Interpolationsformel für den COP, wird je COP-Kennfeld nur einmal erstellt
+        f = get_cop_interpolator(COP_data)
 
         # Technische Grenze der Wärmepumpe ist Temperaturhub von 75 °C
         VLT_L = np.minimum(VLT_L, 75 + QT)
 
-        # Überprüfen, ob QT eine Zahl oder ein Array ist
-        if np.isscalar(QT):
-            # Wenn QT eine Zahl ist, erstellen wir ein Array mit dieser Zahl
-            QT_array = np.full_like(VLT_L, QT)
-        else:
-            # Wenn QT bereits ein Array ist, prüfen wir, ob es die gleiche Länge wie VLT_L hat
-            if len(QT) != len(VLT_L):
-                raise ValueError("QT muss entweder eine einzelne Zahl oder ein Array mit der gleichen Länge wie VLT_L sein.")
-            QT_array = QT
-
-        # Vorbereitung für die Interpolation
-        input_array = np.column_stack((QT_array, VLT_L))
+        # Überprüfen, ob QT eine Zahl oder ein Array mit der gleichen Länge wie VLT_L ist, eine Zahl wird bei der Interpolation auf VLT_L erweitert
+        if not np.isscalar(QT) and len(QT) != len(VLT_L):
+            raise ValueError("QT muss entweder eine einzelne Zahl oder ein Array mit der gleichen Länge wie VLT_L sein.")
 
         # Initialisiere COP_L mit NaNs, um ungültige Werte zu markieren
         COP_L = np.full_like(VLT_L, np.nan)
 
         try:
             # Berechne die COPs für alle Werte, wobei ungültige Werte nicht extrapoliert werden
-            COP_L = f(input_array)
+            COP_L = f(QT, VLT_L, extrapolate=True)
             
             # Für ungültige Werte (wo keine Interpolation möglich ist), setze COP auf 0
             out_of_bounds_mask = np.isnan(COP_L)
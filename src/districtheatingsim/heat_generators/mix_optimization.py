@@ -0,0 +1,490 @@
+"""
+Filename: mix_optimization.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: Optimization of the heat generation mix with exchangeable optimizers (SLSQP from several starting points, differential
+evolution, Bayesian optimization) and objective evaluations in parallel processes.
+
+"""
+
+import os
+import copy
+import time
+import logging
+import warnings
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from scipy.optimize import minimize, differential_evolution
+from scipy.stats import qmc, norm
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import ConstantKernel, Matern, WhiteKernel
+from sklearn.exceptions import ConvergenceWarning
+
+from heat_generators.heat_generation_mix import Berechnung_Erzeugermix, get_optimization_variables, calculate_weighted_sum, apply_optimized_values
+
+# Step of the finite differences, the same as the default of SLSQP in scipy
+FINITE_DIFFERENCE_STEP = 1.4901161193847656e-08
+
+# Data of the optimization in the worker processes, see _init_mix_worker
+shared_mix_data = {}
+
+def create_mix_data(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, kapitalzins, preissteigerungsrate,
+                    betrachtungszeitraum, stundensatz, weights):
+    """
+    Collect everything needed to evaluate the objective for a variable vector, see optimize_mix for the arguments.
+
+    Returns:
+        dict: Data of the optimization, including the names and bounds of the variables.
+    """
+    initial_values, variables_order, bounds = get_optimization_variables(tech_order)
+    return {"tech_order": tech_order, "initial_data": initial_data, "start": start, "end": end, "TRY": TRY, "COP_data": COP_data,
+            "Gaspreis": Gaspreis, "Strompreis": Strompreis, "Holzpreis": Holzpreis, "BEW": BEW, "kapitalzins": kapitalzins,
+            "preissteigerungsrate": preissteigerungsrate, "betrachtungszeitraum": betrachtungszeitraum, "stundensatz": stundensatz,
+            "weights": weights, "initial_values": initial_values, "variables_order": variables_order, "bounds": bounds}
+
+def _init_mix_worker(mix_data):
+    """Store the data of the optimization in the worker process, so it is transferred only once per worker.
+
+    Args:
+        mix_data (dict): Data created by create_mix_data.
+    """
+    shared_mix_data.update(mix_data)
+
+def evaluate_mix(variables, mix_data=None):
+    """
+    Calculate the energy generation mix for a variable vector and return the objective of the optimization.
+
+    The calculation uses a copy of the technologies, since Berechnung_Erzeugermix changes them, so the result does not
+    depend on the evaluations before.
+
+    Args:
+        variables (array): Values of the decision variables.
+        mix_data (dict, optional): Data created by create_mix_data. Defaults to the data of the worker process.
+
+    Returns:
+        float: Weighted sum of heat generation costs, specific emissions and primary energy factor.
+    """
+    mix_data = mix_data or shared_mix_data
+    tech_order = copy.deepcopy(mix_data["tech_order"])
+    general_results = Berechnung_Erzeugermix(tech_order, mix_data["initial_data"], mix_data["start"], mix_data["end"], mix_data["TRY"], mix_data["COP_data"],
+                                             mix_data["Gaspreis"], mix_data["Strompreis"], mix_data["Holzpreis"], mix_data["BEW"], np.asarray(variables),
+                                             mix_data["variables_order"], kapitalzins=mix_data["kapitalzins"], preissteigerungsrate=mix_data["preissteigerungsrate"],
+                                             betrachtungszeitraum=mix_data["betrachtungszeitraum"], stundensatz=mix_data["stundensatz"])
+    return float(calculate_weighted_sum(general_results, mix_data["weights"]))
+
+def _evaluate_mix_counted(variables, mix_data=None):
+    """Evaluate the objective like evaluate_mix and return the id of the calculating process, so the simulations can be counted per process.
+
+    Returns:
+        tuple: Objective and process id.
+    """
+    return evaluate_mix(variables, mix_data), os.getpid()
+
+class MixEvaluator:
+    """Evaluates the objective for batches of variable vectors in a process pool.
+
+    The values of evaluated vectors are stored, so no vector is simulated twice, e.g. the gradient reuses the value of the
+    line search. Several optimization runs can use the same evaluator from different threads.
+
+    Args:
+        mix_data (dict): Data created by create_mix_data.
+        n_workers (int, optional): Number of worker processes, 1 evaluates in the current process. Defaults to 1.
+    """
+    def __init__(self, mix_data, n_workers=1):
+        self.mix_data = mix_data
+        self.n_workers = n_workers
+        self.values = {}
+        self.pending = {}
+        self.evaluations_per_process = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        if n_workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_mix_worker, initargs=(mix_data,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    @property
+    def n_evaluations(self):
+        """int: Number of simulations of the mix in all processes."""
+        return sum(self.evaluations_per_process.values())
+
+    def _count_evaluation(self, pid):
+        """Count one simulation of the mix in the process pid."""
+        self.evaluations_per_process[pid] = self.evaluations_per_process.get(pid, 0) + 1
+
+    def evaluate_batch(self, points):
+        """Evaluate the objective for several variable vectors, the new vectors are calculated in parallel.
+
+        Args:
+            points (list): Variable vectors.
+
+        Returns:
+            np.ndarray: Objective per variable vector.
+        """
+        # Adding 0.0 turns -0.0 into 0.0, so both have the same key
+        points = [np.asarray(point, dtype=float) + 0.0 for point in points]
+        keys = [point.tobytes() for point in points]
+
+        if self.executor is None:
+            for key, point in zip(keys, points):
+                if key not in self.values:
+                    self.values[key], pid = _evaluate_mix_counted(point, self.mix_data)
+                    self._count_evaluation(pid)
+            return np.array([self.values[key] for key in keys])
+
+        # Vectors which are calculated for another optimization run are not submitted again
+        futures = {}
+        with self.lock:
+            for key, point in zip(keys, points):
+                if key in self.values or key in futures:
+                    continue
+                if key not in self.pending:
+                    self.pending[key] = self.executor.submit(_evaluate_mix_counted, point)
+                futures[key] = self.pending[key]
+
+        results = {key: future.result() for key, future in futures.items()}
+        with self.lock:
+            for key, (value, pid) in results.items():
+                self.values[key] = value
+                # Only the thread which takes the vector from the pending ones counts it, the others waited for the same result
+                if self.pending.pop(key, None) is not None:
+                    self._count_evaluation(pid)
+            return np.array([self.values[key] for key in keys])
+
+    def evaluate(self, x):
+        """Evaluate the objective for one variable vector.
+
+        Args:
+            x (array): Values of the decision variables.
+
+        Returns:
+            float: Objective.
+        """
+        return float(self.evaluate_batch([x])[0])
+
+    def gradient(self, x, step=FINITE_DIFFERENCE_STEP):
+        """Forward differences of the objective, all shifted vectors are evaluated in parallel.
+
+        The step is taken backwards where the upper bound would be exceeded, like the finite differences of scipy.
+
+        Args:
+            x (array): Values of the decision variables.
+            step (float, optional): Absolute step of the finite differences. Defaults to FINITE_DIFFERENCE_STEP.
+
+        Returns:
+            np.ndarray: Gradient of the objective.
+        """
+        x = np.asarray(x, dtype=float)
+        upper_bounds = np.array([np.inf if upper is None else upper for _, upper in self.mix_data["bounds"]], dtype=float)
+        steps = np.where(x + step > upper_bounds, -step, step)
+
+        shifted = np.tile(x, (len(x), 1))
+        shifted[np.arange(len(x)), np.arange(len(x))] += steps
+        values = self.evaluate_batch([x] + list(shifted))
+        return (values[1:] - values[0]) / (np.diag(shifted) - x)
+
+def create_starting_points(initial_values, bounds, n_starts, seed=None):
+    """
+    Create starting points for the optimization, the first one are the initial values, the others fill the bounds evenly (Latin hypercube).
+
+    Args:
+        initial_values (list): Initial values of the decision variables.
+        bounds (list): Bounds of the decision variables.
+        n_starts (int): Number of starting points.
+        seed (int, optional): Seed of the random numbers. Defaults to None.
+
+    Returns:
+        np.ndarray: Starting points with shape (n_starts, variables).
+    """
+    initial_values = np.asarray(initial_values, dtype=float)
+    if n_starts <= 1:
+        return initial_values[np.newaxis, :]
+
+    lower_bounds, upper_bounds = np.array(bounds, dtype=float).T
+    sample = qmc.LatinHypercube(d=len(initial_values), seed=seed).random(n_starts - 1)
+    return np.vstack([initial_values, qmc.scale(sample, lower_bounds, upper_bounds)])
+
+def polish_result(evaluator, x, objective, bounds, maxiter=100):
+    """
+    Improve the result of a global optimizer with SLSQP and parallel gradients, the local result is only used if it is better.
+
+    Args:
+        evaluator (MixEvaluator): Evaluator of the objective.
+        x (array): Best variable vector of the global optimizer.
+        objective (float): Objective of x.
+        bounds (list): Bounds of the decision variables.
+        maxiter (int, optional): Maximum number of iterations. Defaults to 100.
+
+    Returns:
+        tuple: Variable vector and objective.
+    """
+    result = minimize(evaluator.evaluate, x, jac=evaluator.gradient, method='SLSQP', bounds=bounds, options={'maxiter': maxiter})
+    if result.fun < objective:
+        return result.x, float(result.fun)
+    return np.asarray(x, dtype=float), objective
+
+def run_slsqp(evaluator, initial_values, bounds, record_iteration, n_starts=4, maxiter=100, seed=None):
+    """
+    Optimizer backend: SLSQP from several starting points (see create_starting_points), the runs share the process pool of the evaluator.
+
+    Args:
+        evaluator (MixEvaluator): Evaluator of the objective.
+        initial_values (np.ndarray): Initial values of the decision variables.
+        bounds (list): Bounds of the decision variables.
+        record_iteration (callable): Called with run, iteration, variables and objective after each iteration.
+        n_starts (int, optional): Number of starting points. Defaults to 4.
+        maxiter (int, optional): Maximum number of iterations per run. Defaults to 100.
+        seed (int, optional): Seed of the starting points. Defaults to None.
+
+    Returns:
+        list: Summary per run.
+    """
+    starting_points = create_starting_points(initial_values, bounds, n_starts, seed)
+
+    def run_start(start_index, x0):
+        n_iterations = 0
+
+        def callback(xk):
+            nonlocal n_iterations
+            n_iterations += 1
+            record_iteration(start_index, n_iterations, xk, evaluator.evaluate(xk))
+
+        result = minimize(evaluator.evaluate, x0, jac=evaluator.gradient, method='SLSQP', bounds=bounds, callback=callback, options={'maxiter': maxiter})
+        return {"start": start_index, "success": bool(result.success), "message": result.message, "objective": float(result.fun),
+                "variables": result.x.tolist(), "initial_variables": x0.tolist(), "iterations": int(result.nit)}
+
+    if evaluator.executor is None:
+        return [run_start(start_index, x0) for start_index, x0 in enumerate(starting_points)]
+    with ThreadPoolExecutor(max_workers=len(starting_points)) as executor:
+        return list(executor.map(run_start, range(len(starting_points)), starting_points))
+
+def run_differential_evolution(evaluator, initial_values, bounds, record_iteration, maxiter=100, popsize=15, tol=0.01, polish=True, seed=None):
+    """
+    Optimizer backend: differential evolution, each generation is evaluated as one batch in the process pool.
+
+    The initial values are part of the first generation. Unlike SLSQP it does not stop at the steps of the objective caused by
+    the minimum part load and the storage hysteresis.
+
+    Args:
+        evaluator (MixEvaluator): Evaluator of the objective.
+        initial_values (np.ndarray): Initial values of the decision variables.
+        bounds (list): Bounds of the decision variables.
+        record_iteration (callable): Called with run, iteration, variables and objective after each generation.
+        maxiter (int, optional): Maximum number of generations. Defaults to 100.
+        popsize (int, optional): Size of the population per decision variable. Defaults to 15.
+        tol (float, optional): Relative tolerance of the convergence, see scipy.optimize.differential_evolution. Defaults to 0.01.
+        polish (bool, optional): Improve the best vector with SLSQP, see polish_result. Defaults to True.
+        seed (int, optional): Seed of the random numbers. Defaults to None.
+
+    Returns:
+        list: Summary of the run.
+    """
+    lower_bounds, upper_bounds = np.array(bounds, dtype=float).T
+    n_generations = 0
+
+    def callback(xk, convergence):
+        nonlocal n_generations
+        n_generations += 1
+        record_iteration(0, n_generations, xk, evaluator.evaluate(xk))
+
+    result = differential_evolution(lambda population: evaluator.evaluate_batch(population.T), bounds, x0=np.clip(initial_values, lower_bounds, upper_bounds),
+                                    maxiter=maxiter, popsize=popsize, tol=tol, seed=seed, polish=False, updating='deferred', vectorized=True, callback=callback)
+    x, objective = result.x, float(result.fun)
+    if polish:
+        x, objective = polish_result(evaluator, x, objective, bounds, maxiter)
+
+    return [{"start": 0, "success": bool(result.success), "message": result.message, "objective": objective, "variables": np.asarray(x).tolist(),
+             "initial_variables": np.asarray(initial_values).tolist(), "iterations": int(result.nit)}]
+
+def run_bayesian_optimization(evaluator, initial_values, bounds, record_iteration, maxiter=30, n_initial=None, batch_size=None, n_candidates=2000,
+                              xi=0.01, polish=False, seed=None):
+    """
+    Optimizer backend: Bayesian optimization with a Gaussian process as surrogate of the objective.
+
+    After an initial Latin hypercube design, each iteration selects a batch of vectors with the highest expected improvement
+    of the surrogate. Within a batch the surrogate assumes the best objective so far for the selected vectors (constant liar),
+    so the vectors of a batch differ and are evaluated in parallel. Suited for few, expensive evaluations.
+
+    Args:
+        evaluator (MixEvaluator): Evaluator of the objective.
+        initial_values (np.ndarray): Initial values of the decision variables.
+        bounds (list): Bounds of the decision variables.
+        record_iteration (callable): Called with run, iteration, variables and objective after each batch.
+        maxiter (int, optional): Number of batches after the initial design. Defaults to 30.
+        n_initial (int, optional): Size of the initial design including the initial values. Defaults to 2 * variables + 1.
+        batch_size (int, optional): Vectors per batch. Defaults to the number of worker processes.
+        n_candidates (int, optional): Random candidates for the maximization of the expected improvement. Defaults to 2000.
+        xi (float, optional): Minimum improvement relative to the standard deviation of the objective, larger values explore more. Defaults to 0.01.
+        polish (bool, optional): Improve the best vector with SLSQP, see polish_result. Defaults to False.
+        seed (int, optional): Seed of the random numbers. Defaults to None.
+
+    Returns:
+        list: Summary of the run.
+    """
+    rng = np.random.default_rng(seed)
+    lower_bounds, upper_bounds = np.array(bounds, dtype=float).T
+    scale = np.where(upper_bounds > lower_bounds, upper_bounds - lower_bounds, 1.0)
+    n_variables = len(initial_values)
+    n_initial = n_initial or 2 * n_variables + 1
+    batch_size = batch_size or evaluator.n_workers
+
+    # The surrogate is fitted on variables scaled to the unit cube
+    initial_unit = np.clip((np.asarray(initial_values, dtype=float) - lower_bounds) / scale, 0, 1)
+    X = np.vstack([initial_unit, qmc.LatinHypercube(d=n_variables, seed=rng).random(n_initial - 1)])
+    y = evaluator.evaluate_batch(lower_bounds + X * scale)
+
+    kernel = ConstantKernel(1.0) * Matern(length_scale=np.full(n_variables, 0.3), length_scale_bounds=(1e-2, 1e2), nu=2.5) + WhiteKernel(1e-4, (1e-8, 1e-1))
+    for iteration in range(1, maxiter + 1):
+        # Hyperparameters at their bounds are expected for steps in the objective
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            gp = GaussianProcessRegressor(kernel=kernel, normalize_y=True, n_restarts_optimizer=2, random_state=int(rng.integers(2**31))).fit(X, y)
+
+        batch = []
+        X_batch, y_batch = X, y
+        for _ in range(batch_size):
+            # Candidates over the whole range and close to the best vectors
+            best_unit = X_batch[np.argsort(y_batch)[:5]]
+            local_candidates = best_unit[rng.integers(len(best_unit), size=n_candidates // 2)] + rng.normal(0, 0.05, (n_candidates // 2, n_variables))
+            candidates = np.vstack([rng.random((n_candidates - n_candidates // 2, n_variables)), np.clip(local_candidates, 0, 1)])
+
+            mean, std = gp.predict(candidates, return_std=True)
+            improvement = np.min(y_batch) - mean - xi * np.std(y)
+            z = improvement / np.maximum(std, 1e-12)
+            expected_improvement = np.where(std > 1e-12, improvement * norm.cdf(z) + std * norm.pdf(z), 0.0)
+            batch.append(candidates[np.argmax(expected_improvement)])
+
+            X_batch = np.vstack([X_batch, batch[-1]])
+            y_batch = np.append(y_batch, np.min(y))
+            if len(batch) < batch_size:
+                gp = GaussianProcessRegressor(kernel=gp.kernel_, normalize_y=True, optimizer=None).fit(X_batch, y_batch)
+
+        X = np.vstack([X, batch])
+        y = np.append(y, evaluator.evaluate_batch(lower_bounds + np.array(batch) * scale))
+        record_iteration(0, iteration, lower_bounds + X[np.argmin(y)] * scale, float(np.min(y)))
+
+    x, objective = lower_bounds + X[np.argmin(y)] * scale, float(np.min(y))
+    if polish:
+        x, objective = polish_result(evaluator, x, objective, bounds)
+
+    return [{"start": 0, "success": True, "message": f"{len(y)} vectors evaluated", "objective": objective, "variables": np.asarray(x).tolist(),
+             "initial_variables": np.asarray(initial_values).tolist(), "iterations": maxiter}]
+
+# Optimizer backends for optimize_mix_global, further backends are functions with the same arguments
+MIX_OPTIMIZERS = {"slsqp": run_slsqp,
+                  "differential_evolution": run_differential_evolution,
+                  "bayesian": run_bayesian_optimization}
+
+def optimize_mix_global(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, kapitalzins, preissteigerungsrate,
+                        betrachtungszeitraum, stundensatz, weights, optimizer="differential_evolution", n_workers=None, seed=None, **options):
+    """
+    Optimize the energy generation mix with one of the optimizer backends in MIX_OPTIMIZERS.
+
+    The objective is the same as in optimize_mix. The backends submit batches of variable vectors to a process pool, each
+    vector is simulated only once during the optimization, repeated vectors are taken from the stored values.
+
+    Args:
+        tech_order (list): List of technology objects to be considered.
+        initial_data (tuple): Initial data including time steps, load profile, flow temperature, and return temperature.
+        start (int): Start time step for the optimization.
+        end (int): End time step for the optimization.
+        TRY (object): Test Reference Year data for temperature and solar radiation.
+        COP_data (object): Coefficient of Performance data for heat pumps.
+        Gaspreis (float): Gas price in €/kWh.
+        Strompreis (float): Electricity price in €/kWh.
+        Holzpreis (float): Biomass price in €/kWh.
+        BEW (float): Specific CO2 emissions for electricity in kg CO2/kWh.
+        kapitalzins (float): Capital interest rate in percentage.
+        preissteigerungsrate (float): Inflation rate in percentage.
+        betrachtungszeitraum (int): Consideration period in years.
+        stundensatz (float): Hourly rate for labor in €/h.
+        weights (dict): Weights for different optimization criteria.
+        optimizer (str, optional): Name of the backend in MIX_OPTIMIZERS. Defaults to "differential_evolution".
+        n_workers (int, optional): Number of worker processes, 1 calculates in the current process. Defaults to the number of CPUs.
+        seed (int, optional): Seed of the random numbers. Defaults to None.
+        **options: Further arguments of the backend, e.g. maxiter.
+
+    Returns:
+        tuple: List of technology objects with the parameters of the best run and the convergence log, a dict with the best
+            objective and variables, a summary per run and the objective after each iteration. If no run converges, the best
+            run is only used if it improves the initial values.
+    """
+    if optimizer not in MIX_OPTIMIZERS:
+        raise ValueError(f"{optimizer} ist kein bekannter Optimierer, verfügbar sind: {', '.join(MIX_OPTIMIZERS)}")
+
+    start_time = time.time()
+    mix_data = create_mix_data(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, kapitalzins, preissteigerungsrate,
+                               betrachtungszeitraum, stundensatz, weights)
+    variables_order, bounds = mix_data["variables_order"], mix_data["bounds"]
+    n_workers = n_workers or os.cpu_count() or 1
+
+    iterations = []
+    log_lock = threading.Lock()
+
+    with MixEvaluator(mix_data, n_workers) as evaluator:
+        def record_iteration(run, iteration, variables, objective):
+            with log_lock:
+                iterations.append({"start": run, "iteration": iteration, "objective": objective, "variables": np.asarray(variables).tolist(),
+                                   "evaluations": len(evaluator.values), "time_s": time.time() - start_time})
+
+        runs = MIX_OPTIMIZERS[optimizer](evaluator, np.asarray(mix_data["initial_values"], dtype=float), bounds, record_iteration, seed=seed, **options)
+        initial_objective = evaluator.evaluate(mix_data["initial_values"])
+        n_evaluations = len(evaluator.values)
+        evaluations_per_process = dict(evaluator.evaluations_per_process)
+
+    for run in runs:
+        logging.info(f"Optimization run {run['start']} ({optimizer}): {run['message']}, objective {run['objective']:.2f} after {run['iterations']} iterations")
+
+    # Runs which stop without convergence still end at feasible points, they are used if they improve the initial values
+    successful_runs = [run for run in runs if run["success"]]
+    best_run = min(successful_runs or runs, key=lambda run: run["objective"])
+    optimization_log = {"optimizer": optimizer, "variables_order": variables_order, "runs": runs, "iterations": iterations, "evaluations": n_evaluations,
+                        "evaluations_per_process": evaluations_per_process, "time_s": time.time() - start_time, "initial_objective": initial_objective, "best_start": best_run["start"],
+                        "success": best_run["success"], "objective": best_run["objective"], "variables": best_run["variables"]}
+
+    if not best_run["success"]:
+        print("Optimierung nicht erfolgreich")
+        for run in runs:
+            print(f"Start {run['start']}: {run['message']}")
+        if best_run["objective"] >= initial_objective:
+            return tech_order, optimization_log
+
+    print(f"Optimierte Werte: {np.array(best_run['variables'])}")
+    print(f"Minimierte gewichtete Summe: {best_run['objective']:.2f} ({optimizer}, Start {best_run['start']} von {len(runs)}, "
+          f"{n_evaluations} Berechnungen in {optimization_log['time_s']:.1f} s)")
+
+    apply_optimized_values(tech_order, best_run["variables"], variables_order)
+    return tech_order, optimization_log
+
+def optimize_mix_multistart(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, kapitalzins, preissteigerungsrate,
+                            betrachtungszeitraum, stundensatz, weights, n_starts=4, n_workers=None, maxiter=100, seed=None):
+    """
+    Optimize the energy generation mix like optimize_mix with SLSQP from several starting points at once.
+
+    The runs share one process pool, in which the objective values of each finite difference gradient are calculated in
+    parallel. With n_starts=1 the run starts from the initial values and follows optimize_mix. See optimize_mix_global for
+    the arguments.
+
+    Args:
+        n_starts (int, optional): Number of starting points, see create_starting_points. Defaults to 4.
+        n_workers (int, optional): Number of worker processes, 1 calculates in the current process. Defaults to the number of CPUs.
+        maxiter (int, optional): Maximum number of iterations per run. Defaults to 100.
+        seed (int, optional): Seed of the starting points. Defaults to None.
+
+    Returns:
+        tuple: List of technology objects with the parameters of the best run and the convergence log.
+    """
+    return optimize_mix_global(tech_order, initial_data, start, end, TRY, COP_data, Gaspreis, Strompreis, Holzpreis, BEW, kapitalzins, preissteigerungsrate,
+                               betrachtungszeitraum, stundensatz, weights, optimizer="slsqp", n_workers=n_workers, seed=seed, n_starts=n_starts, maxiter=maxiter)
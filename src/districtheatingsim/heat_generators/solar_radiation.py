@@ -8,12 +8,85 @@ Additional Information: Yield calculation program for solar thermal energy in he
 """
 
 # Import libraries
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 
 # Constant for degree-to-radian conversion
 DEG_TO_RAD = np.pi / 180
 
-def calculate_solar_radiation(global_radiation, direct_radiation, day_of_year, time_steps, Longitude, STD_Longitude, Latitude, Albedo, East_West_collector_azimuth_angle, Collector_tilt_angle, IAM_W=None, IAM_N=None):    
+# Results of recent calculations, see calculate_solar_radiation
+SOLAR_RADIATION_CACHE_SIZE = 8
+solar_radiation_cache = OrderedDict()
+
+def get_solar_radiation_cache_key(arrays, parameters, IAM_W, IAM_N):
+    """
+    Creates the cache key of a solar radiation calculation from its inputs.
+
+    Args:
+        arrays (list): Radiation data, day of the year and time steps.
+        parameters (tuple): Location, albedo and orientation of the collector.
+        IAM_W (dict): Incidence Angle Modifier for EW orientation.
+        IAM_N (dict): Incidence Angle Modifier for NS orientation.
+
+    Returns:
+        tuple: Hashable key, the arrays are represented by a hash of their content.
+    """
+    sha1 = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        sha1.update(f"{array.dtype.str}{array.shape}".encode())
+        sha1.update(array.tobytes())
+    iam_tables = tuple(tuple(sorted(table.items())) if table is not None else None for table in (IAM_W, IAM_N))
+    return sha1.hexdigest(), tuple(parameters), iam_tables
+
+def calculate_solar_radiation(global_radiation, direct_radiation, day_of_year, time_steps, Longitude, STD_Longitude, Latitude, Albedo, East_West_collector_azimuth_angle, Collector_tilt_angle, IAM_W=None, IAM_N=None):
+    """
+    Calculates solar radiation based on Test Reference Year data, results of recent calls with the same inputs are reused.
+
+    The inputs do not change while the area or the storage volume of a solar thermal system is optimized, so the radiation is
+    calculated only once. The returned arrays are shared between calls and therefore read-only.
+
+    Args:
+        global_radiation (np.ndarray): Global radiation data.
+        direct_radiation (np.ndarray): Direct radiation data.
+        day_of_year (np.ndarray): Day of the year data.
+        time_steps (np.ndarray): Array of time steps.
+        Longitude (float): Longitude of the location.
+        STD_Longitude (float): Standard longitude for the time zone.
+        Latitude (float): Latitude of the location.
+        Albedo (float): Albedo value.
+        East_West_collector_azimuth_angle (float): East-West collector azimuth angle.
+        Collector_tilt_angle (float): Collector tilt angle.
+        IAM_W (dict): Incidence Angle Modifier for EW orientation.
+        IAM_N (dict): Incidence Angle Modifier for NS orientation.
+
+    Returns:
+        tuple: Contains arrays for total radiation on the inclined surface, beam radiation, diffuse radiation, and modified beam radiation.
+    """
+    key = get_solar_radiation_cache_key([global_radiation, direct_radiation, day_of_year, time_steps],
+                                        (Longitude, STD_Longitude, Latitude, Albedo, East_West_collector_azimuth_angle, Collector_tilt_angle), IAM_W, IAM_N)
+    if key in solar_radiation_cache:
+        solar_radiation_cache.move_to_end(key)
+        return solar_radiation_cache[key]
+
+    results = calculate_solar_radiation_arrays(global_radiation, direct_radiation, day_of_year, time_steps, Longitude, STD_Longitude, Latitude, Albedo,
+                                               East_West_collector_azimuth_angle, Collector_tilt_angle, IAM_W, IAM_N)
+    for result in results:
+        if result is not None:
+            result.flags.writeable = False
+
+    solar_radiation_cache[key] = results
+    if len(solar_radiation_cache) > SOLAR_RADIATION_CACHE_SIZE:
+        solar_radiation_cache.popitem(last=False)
+    return results
+
+def clear_solar_radiation_cache():
+    """Removes all results from the solar radiation cache."""
+    solar_radiation_cache.clear()
+
+def calculate_solar_radiation_arrays(global_radiation, direct_radiation, day_of_year, time_steps, Longitude, STD_Longitude, Latitude, Albedo, East_West_collector_azimuth_angle, Collector_tilt_angle, IAM_W=None, IAM_N=None):
     """
     Calculates solar radiation based on Test Reference Year data.
 
@@ -112,13 +185,10 @@ def calculate_solar_radiation(global_radiation, direct_radiation, day_of_year, t
         Incidence_angle_NS = np.where(condition, f_NS, 89.999)
 
         def IAM(Incidence_angle, iam_data):
-            sverweis_1 = np.abs(Incidence_angle) - np.abs(Incidence_angle) % 10
-            sverweis_2 = np.vectorize(iam_data.get)(sverweis_1)
-            sverweis_3 = (np.abs(Incidence_angle) + 10) - (np.abs(Incidence_angle) + 10) % 10
-            sverweis_4 = np.vectorize(iam_data.get)(sverweis_3)
-
-            result = sverweis_2 + (np.abs(Incidence_angle) - sverweis_1) / (sverweis_3 - sverweis_1) * (sverweis_4 - sverweis_2)
-            return result
+            # Linear interpolation between the tabulated angles
+            angles = np.array(sorted(iam_data), dtype=float)
+            values = np.array([iam_data[angle] for angle in sorted(iam_data)], dtype=float)
+            return np.interp(np.abs(Incidence_angle), angles, values)
 
         # For IAM_EW
         IAM_EW = IAM(Incidence_angle_EW, IAM_W)
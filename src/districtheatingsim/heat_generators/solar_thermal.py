@@ -10,7 +10,6 @@ Additional Information: Yield calculation program for solar thermal energy in he
 # Import Bibliotheken
 from math import pi, exp, log, sqrt
 import numpy as np
-from datetime import datetime, timezone
 
 from heat_generators.solar_radiation import calculate_solar_radiation
 from heat_generators.annuity import annuität
@@ -293,7 +292,8 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
     if Bruttofläche_STA == 0 or VS == 0:
         return 0, np.zeros_like(Last_L), np.zeros_like(Last_L), np.zeros_like(Last_L)
     
-    Tag_des_Jahres_L = np.array([datetime.fromtimestamp(t.astype('datetime64[s]').astype(np.int64), tz=timezone.utc).timetuple().tm_yday for t in time_steps])
+    # Tag des Jahres aus der Differenz zum Jahresbeginn (UTC)
+    Tag_des_Jahres_L = (time_steps.astype('datetime64[D]') - time_steps.astype('datetime64[Y]').astype('datetime64[D]')).astype(np.int64) + 1
 
     # Definition Albedo-Wert
     Albedo = 0.2
@@ -376,6 +376,15 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
                                                                      STD_Longitude, Latitude, Albedo, East_West_collector_azimuth_angle,
                                                                      Collector_tilt_angle, IAM_W, IAM_N)
 
+    # Von der Speicherbilanz unabhängige Größen werden vorab für alle Zeitschritte berechnet
+    Eta0b_neu_G_L = Eta0b_neu * K_beam_L * GbT_L + Eta0b_neu * Kthetadiff * GdT_H_Dk_L
+    Wind_c3_L = Koll_c3 * wcorr * Windgeschwindigkeit_L
+    exp_Koll = exp(-Koll_c1 / KollCeff_A * 3.6)
+    exp_RE = exp(-Keq_RE / CRK)
+    exp_KK = exp(-KK / CKK)
+    KollCeff_Bezugsfläche = KollCeff_A * Bezugsfläche
+    PSV_Faktor = 0.75 * (VS * 1000) ** 0.5 * 0.16
+
     Speicher_Wärmeoutput_L = []
     Speicherladung_L = []
     Speicherfüllstand_L = []
@@ -383,9 +392,12 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
 
     Zähler = 0
 
-    for Tag_des_Jahres, K_beam, GbT, GdT_H_Dk, Temperatur, Windgeschwindigkeit, Last, VLT, RLT in zip(Tag_des_Jahres_L, K_beam_L, GbT_L, GdT_H_Dk_L, Temperatur_L, Windgeschwindigkeit_L, Last_L, VLT_L, RLT_L):
-        Eta0b_neu_K_beam_GbT = Eta0b_neu * K_beam * GbT
-        Eta0b_neu_Kthetadiff_GdT_H_Dk = Eta0b_neu * Kthetadiff * GdT_H_Dk
+    # Jeder Zeitschritt hängt über die Speicherladung, die Kollektor- und Rohrleitungstemperaturen und die Stagnation vom vorherigen
+    # Zeitschritt ab, die Begrenzungen (min, max, Fallunterscheidungen) verhindern eine vektorisierte Berechnung mit gleichen Ergebnissen.
+    # Die Schleife läuft über Python-Zahlen, Rechenoperationen mit NumPy-Skalaren sind deutlich langsamer
+    Zeitreihen = [np.asarray(values).tolist() for values in (Tag_des_Jahres_L, Eta0b_neu_G_L, Wind_c3_L, Temperatur_L, Last_L, VLT_L, RLT_L)]
+
+    for Tag_des_Jahres, Eta0b_neu_G, Wind_c3, Temperatur, Last, VLT, RLT in zip(*Zeitreihen):
 
         if Zähler < 1:
             TS_unten = RLT
@@ -394,11 +406,9 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
             Tm_a = (Zieltemperatur_Solaranlage + TRL_Solar) / 2
             Pkoll_a = 0
             Tgkoll_a = 9.3
-            T_koll_a = Temperatur - (Temperatur - Tgkoll_a) * exp(-Koll_c1 / KollCeff_A * 3.6) + (Pkoll_a * 3600) / (
-                        KollCeff_A * Bezugsfläche)
+            T_koll_a = Temperatur - (Temperatur - Tgkoll_a) * exp_Koll + (Pkoll_a * 3600) / KollCeff_Bezugsfläche
             Pkoll_b = 0
-            T_koll_b = Temperatur - (Temperatur - 0) * exp(-Koll_c1 / KollCeff_A * 3.6) + (Pkoll_b * 3600) / (
-                        KollCeff_A * Bezugsfläche)
+            T_koll_b = Temperatur - (Temperatur - 0) * exp_Koll + (Pkoll_b * 3600) / KollCeff_Bezugsfläche
             Tgkoll = 9.3  # Kollektortemperatur im Gleichgewicht
 
             # Verluste Verbindungsleitung
@@ -429,7 +439,7 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
             # Define constants
             c1 = Koll_c1 * (Tm_a - Temperatur)
             c2 = Koll_c2 * (Tm_a - Temperatur) ** 2
-            c3 = Koll_c3 * wcorr * Windgeschwindigkeit * (Tm_a - Temperatur)
+            c3 = Wind_c3 * (Tm_a - Temperatur)
 
             # Calculate lower storage tank temperature
             if QS/QSmax >= 0.8:
@@ -442,17 +452,15 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
             TRL_Solar = TS_unten + DT_WT_Solar_K
 
             # Calculate collector A power output and temperature
-            Pkoll_a = max(0, (Eta0b_neu_K_beam_GbT + Eta0b_neu_Kthetadiff_GdT_H_Dk - c1 - c2 - c3) * Bezugsfläche / 1000)
-            T_koll_a = Temperatur - (Temperatur - Tgkoll_a_alt) * exp(-Koll_c1 / KollCeff_A * 3.6) + (Pkoll_a * 3600) / (
-                        KollCeff_A * Bezugsfläche)
+            Pkoll_a = max(0, (Eta0b_neu_G - c1 - c2 - c3) * Bezugsfläche / 1000)
+            T_koll_a = Temperatur - (Temperatur - Tgkoll_a_alt) * exp_Koll + (Pkoll_a * 3600) / KollCeff_Bezugsfläche
 
             # Calculate collector B power output and temperature
             c1 = Koll_c1 * (T_koll_b_alt - Temperatur)
             c2 = Koll_c2 * (T_koll_b_alt - Temperatur) ** 2
-            c3 = Koll_c3 * wcorr * Windgeschwindigkeit * (T_koll_b_alt - Temperatur)
-            Pkoll_b = max(0, (Eta0b_neu_K_beam_GbT + Eta0b_neu_Kthetadiff_GdT_H_Dk - c1 - c2 - c3) * Bezugsfläche / 1000)
-            T_koll_b = Temperatur - (Temperatur - Tgkoll_a_alt) * exp(-Koll_c1 / KollCeff_A * 3.6) + (Pkoll_b * 3600) / (
-                        KollCeff_A * Bezugsfläche)
+            c3 = Wind_c3 * (T_koll_b_alt - Temperatur)
+            Pkoll_b = max(0, (Eta0b_neu_G - c1 - c2 - c3) * Bezugsfläche / 1000)
+            T_koll_b = Temperatur - (Temperatur - Tgkoll_a_alt) * exp_Koll + (Pkoll_b * 3600) / KollCeff_Bezugsfläche
 
             # Calculate new collector A glycol temperature and average temperature
             Tgkoll_a = min(Zieltemperatur_Solaranlage, T_koll_a)
@@ -470,12 +478,11 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
             # calculate collector power output
             c1 = Koll_c1 * (Tm - Temperatur)
             c2 = Koll_c2 * (Tm - Temperatur) ** 2
-            c3 = Koll_c3 * wcorr * Windgeschwindigkeit * (Tm - Temperatur)
-            Pkoll = max(0, (Eta0b_neu_K_beam_GbT + Eta0b_neu_Kthetadiff_GdT_H_Dk - c1 - c2 - c3) * Bezugsfläche / 1000)
+            c3 = Wind_c3 * (Tm - Temperatur)
+            Pkoll = max(0, (Eta0b_neu_G - c1 - c2 - c3) * Bezugsfläche / 1000)
 
             # calculate collector temperature surplus
-            T_koll = Temperatur - (Temperatur - Tgkoll) * exp(-Koll_c1 / KollCeff_A * 3.6) + (Pkoll * 3600) / (
-                        KollCeff_A * Bezugsfläche)
+            T_koll = Temperatur - (Temperatur - Tgkoll) * exp_Koll + (Pkoll * 3600) / KollCeff_Bezugsfläche
             Tgkoll = min(Zieltemperatur_Solaranlage, T_koll)
 
             # Verluste Verbindungsleitung
@@ -491,8 +498,8 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
                 TRV_bin_vl = Zieltemperatur_Solaranlage
                 TRV_bin_rl = TRL_Solar
             else:
-                TRV_bin_vl = Temperatur - (Temperatur - TRV_bin_vl_alt) * exp(-Keq_RE / CRK)
-                TRV_bin_rl = Temperatur - (Temperatur - TRV_bin_rl_alt) * exp(-Keq_RE / CRK)
+                TRV_bin_vl = Temperatur - (Temperatur - TRV_bin_vl_alt) * exp_RE
+                TRV_bin_rl = Temperatur - (Temperatur - TRV_bin_rl_alt) * exp_RE
 
             # Berechnung von P_RVT_bin_vl und P_RVT_bin_rl, für Erdverlegte sind diese Identisch
             P_RVT_bin_vl = P_RVT_bin_rl = Lrbin_E / 1000 * ((TRV_bin_vl + TRV_bin_rl) / 2 - Temperatur) * 2 * pi * L_Erdreich * hs_RE
@@ -509,12 +516,8 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
             TRV_int_vl_alt = TRV_int_vl
             TRV_int_rl_alt = TRV_int_rl
 
-            trv_int_vl_check = Tgkoll >= Zieltemperatur_Solaranlage and Pkoll > 0
-            trv_int_rl_check = Tgkoll >= Zieltemperatur_Solaranlage and Pkoll > 0
-
-            TRV_int_vl = Zieltemperatur_Solaranlage if trv_int_vl_check else Temperatur - (
-                        Temperatur - TRV_int_vl_alt) * exp(-KK / CKK)
-            TRV_int_rl = TRL_Solar if trv_int_rl_check else Temperatur - (Temperatur - TRV_int_rl_alt) * exp(-KK / CKK)
+            TRV_int_vl = Zieltemperatur_Solaranlage if ziel_erreich else Temperatur - (Temperatur - TRV_int_vl_alt) * exp_KK
+            TRV_int_rl = TRL_Solar if ziel_erreich else Temperatur - (Temperatur - TRV_int_rl_alt) * exp_KK
 
             P_RVT_int_vl = (TRV_int_vl - Temperatur) * KK * Bezugsfläche / 1000 / 2
             P_RVT_int_rl = (TRV_int_rl - Temperatur) * KK * Bezugsfläche / 1000 / 2
@@ -582,7 +585,7 @@ def Berechnung_STA(Bruttofläche_STA, VS, Typ, Last_L, VLT_L, RLT_L, TRY, time_s
             value4 = (1 - value1) * TS_unten
             Tms = value1 * ergebnis1 + value4
 
-            PSV = 0.75 * (VS * 1000) ** 0.5 * 0.16 * (Tms - Temperatur) / 1000
+            PSV = PSV_Faktor * (Tms - Temperatur) / 1000
 
             if Tag_des_Jahres == Tag_des_Jahres_alt:
                 value1_stagnation = 0
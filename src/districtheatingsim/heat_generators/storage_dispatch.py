@@ -0,0 +1,228 @@
+"""
+Filename: storage_dispatch.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: Storage dispatch with on/off hysteresis shared by the CHP and the biomass boiler.
+
+"""
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+# Operating states per time step: storage covers the load, generator on, generator switched on in the following time step
+ENTLADUNG, BETRIEB, START = 0, 1, 2
+
+def predict_dispatch_states(charge_L, discharge_L, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an):
+    """
+    Predicts the operating states from the cumulated charge and discharge, one search per switching event instead of one step per time step.
+
+    Args:
+        charge_L (np.ndarray): Charge of the storage per time step while the generator is on in kWh.
+        discharge_L (np.ndarray): Discharge of the storage per time step while the generator is off in kWh.
+        speicher_kapazitaet (float): Storage capacity in kWh.
+        speicher_fill (float): Initial fill level of the storage in kWh.
+        min_speicher_fill (float): Fill level in kWh at which the generator is switched on.
+        max_speicher_fill (float): Fill level in kWh at which the generator is switched off.
+        an (bool): Initial operating state of the generator.
+
+    Returns:
+        tuple: Operating state per time step and the time steps in which the fill level is limited to the capacity or to zero.
+    """
+    n = len(charge_L)
+    charge_sum = memoryview(np.cumsum(charge_L))
+    discharge_sum = memoryview(np.cumsum(discharge_L))
+
+    # The first event of a segment is reaching the switching level or exceeding the limits of the storage, whichever comes first
+    if max_speicher_fill <= speicher_kapazitaet:
+        charge_limit, search_charge = max_speicher_fill, bisect_left
+    else:
+        charge_limit, search_charge = speicher_kapazitaet, bisect_right
+    if min_speicher_fill >= 0:
+        discharge_limit, search_discharge = min_speicher_fill, bisect_left
+    else:
+        discharge_limit, search_discharge = 0, bisect_right
+
+    ends, states, clipped = [], [], []
+    i = 0
+    while i < n:
+        if an and speicher_fill >= max_speicher_fill:
+            an = False
+        elif not an and speicher_fill <= min_speicher_fill:
+            an = True
+            ends.append(i + 1)
+            states.append(START)
+            i += 1
+            continue
+
+        if an:
+            base = charge_sum[i - 1] if i > 0 else 0.0
+            k = search_charge(charge_sum, base + charge_limit - speicher_fill, i)
+            if k < n:
+                speicher_fill += charge_sum[k] - base
+                clipped.append(speicher_fill > speicher_kapazitaet)
+                speicher_fill = min(speicher_fill, speicher_kapazitaet)
+            states.append(BETRIEB)
+        else:
+            base = discharge_sum[i - 1] if i > 0 else 0.0
+            k = search_discharge(discharge_sum, base + speicher_fill - discharge_limit, i)
+            if k < n:
+                speicher_fill -= discharge_sum[k] - base
+                clipped.append(speicher_fill < 0)
+                speicher_fill = max(speicher_fill, 0.0)
+            states.append(ENTLADUNG)
+        if k >= n:
+            k = n - 1
+            clipped.append(False)
+        ends.append(k + 1)
+        i = k + 1
+
+        # The start of the generator follows directly after the storage is discharged
+        if not an and speicher_fill <= min_speicher_fill and i < n:
+            an = True
+            ends.append(i + 1)
+            states.append(START)
+            i += 1
+
+    ends = np.array(ends, dtype=int)
+    state_L = np.repeat(np.array(states, dtype=np.int8), np.diff(ends, prepend=0))
+    clipped_mask = np.zeros(n, dtype=bool)
+    is_segment = np.array(states, dtype=np.int8) != START
+    clipped_mask[ends[is_segment] - 1] = np.array(clipped, dtype=bool)
+    return state_L, clipped_mask
+
+def calculate_fill_levels(state_L, clipped_mask, charge_L, discharge_L, speicher_kapazitaet, speicher_fill):
+    """
+    Calculates the fill level after each time step for given operating states.
+
+    The fill level is accumulated sequentially like in a step-by-step calculation, only restarting where it is limited by the storage.
+
+    Args:
+        state_L (np.ndarray): Operating state per time step.
+        clipped_mask (np.ndarray): Time steps in which the fill level is limited to the capacity or to zero.
+        charge_L (np.ndarray): Charge of the storage per time step while the generator is on in kWh.
+        discharge_L (np.ndarray): Discharge of the storage per time step while the generator is off in kWh.
+        speicher_kapazitaet (float): Storage capacity in kWh.
+        speicher_fill (float): Initial fill level of the storage in kWh.
+
+    Returns:
+        tuple: Fill level after each time step in kWh and the unlimited fill level in the limited time steps.
+    """
+    on_mask = state_L == BETRIEB
+    increment_L = charge_L * on_mask - discharge_L * (state_L == ENTLADUNG)
+    clipped_indices = np.flatnonzero(clipped_mask)
+    if len(clipped_indices) == 0:
+        return np.add.accumulate(np.concatenate(([speicher_fill], increment_L)))[1:], np.empty(0)
+
+    # The accumulation restarts after each limited time step from the capacity or from zero, each part is accumulated
+    # in place behind its initial fill level
+    part_starts = np.concatenate(([0], clipped_indices + 1))
+    part_fills = np.concatenate(([speicher_fill], np.where(on_mask[clipped_indices], speicher_kapazitaet, 0.0)))
+    fill_positions = part_starts + np.arange(len(part_starts))
+    parts = np.insert(increment_L, part_starts, part_fills)
+    for begin, end in zip(fill_positions.tolist(), fill_positions[1:].tolist() + [len(parts)]):
+        part = parts[begin:end]
+        np.add.accumulate(part, out=part)
+    fill_L = np.delete(parts, fill_positions)
+
+    unlimited_fill = fill_L[clipped_indices]
+    fill_L[clipped_indices] = part_fills[1:]
+    return fill_L, unlimited_fill
+
+def check_dispatch_states(state_L, fill_L, clipped_mask, unlimited_fill, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an):
+    """
+    Checks that the operating states and fill levels follow the switching rules in every time step.
+
+    Returns:
+        bool: True if the states are consistent with the fill levels.
+    """
+    start_fill_L = np.concatenate(([speicher_fill], fill_L[:-1]))
+    an_L = np.concatenate(([an], state_L[:-1] != ENTLADUNG))
+    expected_L = np.where(an_L, np.where(start_fill_L >= max_speicher_fill, ENTLADUNG, BETRIEB),
+                          np.where(start_fill_L <= min_speicher_fill, START, ENTLADUNG))
+    if not np.array_equal(expected_L, state_L):
+        return False
+
+    # The fill level is limited exactly in the predicted time steps
+    over_limit = ((state_L == BETRIEB) & (fill_L > speicher_kapazitaet)) | ((state_L == ENTLADUNG) & (fill_L < 0))
+    clipped_states = state_L[clipped_mask]
+    clipped_over_limit = np.where(clipped_states == BETRIEB, unlimited_fill > speicher_kapazitaet, unlimited_fill < 0)
+    return not np.any(over_limit) and bool(np.all(clipped_over_limit))
+
+def simulate_dispatch_steps(charge_L, discharge_L, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an):
+    """
+    Calculates the operating states and fill levels step by step, used if the prediction is not consistent.
+
+    The prediction compares cumulated sums with the switching levels, while the step-by-step calculation adds the charge and
+    discharge one after another. Both differ within rounding errors, so the prediction is not consistent if a fill level ends
+    within these rounding errors of min_speicher_fill, max_speicher_fill, zero or the capacity, e.g. for loads which are exact
+    fractions of the switching levels. Negative loads decrease the cumulated discharge, the search for the switching events
+    does not apply then either.
+
+    Returns:
+        tuple: Operating state and fill level after each time step.
+    """
+    state_L = np.empty(len(charge_L), dtype=np.int8)
+    fill_L = np.empty(len(charge_L))
+    for i, (charge, discharge) in enumerate(zip(charge_L.tolist(), discharge_L.tolist())):
+        if an and speicher_fill >= max_speicher_fill:
+            an = False
+        elif not an and speicher_fill <= min_speicher_fill:
+            an = True
+            state_L[i] = START
+            fill_L[i] = speicher_fill
+            continue
+
+        if an:
+            state_L[i] = BETRIEB
+            speicher_fill = float(min(speicher_fill + charge, speicher_kapazitaet))
+        else:
+            state_L[i] = ENTLADUNG
+            speicher_fill = float(max(speicher_fill - discharge, 0))
+        fill_L[i] = speicher_fill
+    return state_L, fill_L
+
+def simulate_storage_dispatch(Last_L, Leistung, duration, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an):
+    """
+    Simulates a generator with constant output power charging a storage, switched on and off by the fill level of the storage.
+
+    The generator runs at full power until the storage reaches max_speicher_fill, then the storage covers the load until it falls to
+    min_speicher_fill. The operating states are predicted from the cumulated charge and discharge, the fill levels are accumulated
+    in the same order as in a step-by-step calculation and checked against the switching rules, so the results are identical.
+    If the check fails, all time steps are calculated step by step with simulate_dispatch_steps (see there for the cases).
+
+    Args:
+        Last_L (array): Load profile in kW.
+        Leistung (float): Thermal power of the generator in kW.
+        duration (float): Duration of each time step in hours.
+        speicher_kapazitaet (float): Storage capacity in kWh.
+        speicher_fill (float): Initial fill level of the storage in kWh.
+        min_speicher_fill (float): Fill level in kWh at which the generator is switched on.
+        max_speicher_fill (float): Fill level in kWh at which the generator is switched off.
+        an (bool): Initial operating state of the generator.
+
+    Returns:
+        tuple: Heat output of the generator, heat output of the storage (negative while charging), fill level of the storage in %
+            and the operating state after the last time step.
+    """
+    Last_L = np.asarray(Last_L)
+    speicher_fill = float(speicher_fill)
+
+    # Charge while the generator is on (surplus above the load) and discharge while it is off (the storage covers the load)
+    charge_L = np.where(Last_L < Leistung, (Leistung - Last_L) * duration, 0.0).astype(float)
+    discharge_L = (Last_L * duration).astype(float)
+
+    state_L, clipped_mask = predict_dispatch_states(charge_L, discharge_L, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an)
+    fill_L, unlimited_fill = calculate_fill_levels(state_L, clipped_mask, charge_L, discharge_L, speicher_kapazitaet, speicher_fill)
+    if not check_dispatch_states(state_L, fill_L, clipped_mask, unlimited_fill, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an):
+        # Switching levels or storage limits reached within rounding errors of the cumulated sums or negative loads
+        state_L, fill_L = simulate_dispatch_steps(charge_L, discharge_L, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an)
+
+    betrieb_mask = state_L == BETRIEB
+    Wärmeleistung_kW = (Leistung * betrieb_mask).astype(Last_L.dtype)
+    Wärmeleistung_Speicher_kW = (np.minimum(Last_L - Leistung, 0) * betrieb_mask + Last_L * (state_L == ENTLADUNG)).astype(Last_L.dtype)
+    speicher_fuellstand = (fill_L / speicher_kapazitaet * 100).astype(Last_L.dtype)  # %
+
+    if len(state_L) > 0:
+        an = bool(state_L[-1] != ENTLADUNG)
+    return Wärmeleistung_kW, Wärmeleistung_Speicher_kW, speicher_fuellstand, an
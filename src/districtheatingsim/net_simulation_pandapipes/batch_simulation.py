@@ -0,0 +1,244 @@
+"""
+Filename: batch_simulation.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: Headless batch simulation of network scenarios (e.g. supply temperature, dT_RL, v_max_pipe, insulation) in a process pool.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import itertools
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+from net_simulation_pandapipes.pp_net_initialisation_geojson import initialize_geojson
+from net_simulation_pandapipes.pp_net_time_series_simulation import thermohydraulic_time_series_net, time_series_preprocessing, calculate_time_series_statistics
+from net_simulation_pandapipes.utilities import net_optimization
+from net_simulation_pandapipes.net_snapshot_cache import hash_file
+
+# Parameters of a scenario, the values correspond to the defaults of the network generation and time series dialogs
+DEFAULT_SCENARIO_PARAMETERS = {
+    "supply_temperature": 85,
+    "min_supply_temperature_building": None,
+    "return_temperature_heat_consumer": None,
+    "flow_pressure_pump": 4,
+    "lift_pressure_pump": 1.5,
+    "netconfiguration": "Niedertemperaturnetz",
+    "pipetype": "KMR 100/250-2v",
+    "dT_RL": 5,
+    "v_max_pipe": 1.0,
+    "material_filter": "KMR",
+    "insulation_filter": "2v",
+    "v_max_heat_consumer": 1.5,
+    "mass_flow_secondary_producers": 0.1,
+    "diameter_optimization": True,
+    "building_temp_checked": False,
+    "start": 0,
+    "end": 8760
+}
+
+# Data shared by all scenarios of a batch in a worker process
+shared_batch_data = {}
+
+def create_scenario_grid(**parameter_values):
+    """Create all combinations of the given parameter values.
+
+    Args:
+        **parameter_values: Lists of values per parameter, e.g. supply_temperature=[75, 85], dT_RL=[5, 10].
+
+    Returns:
+        list: Scenarios as dictionaries of parameter values.
+    """
+    names = list(parameter_values.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*parameter_values.values())]
+
+def get_scenario_id(scenario, input_hash=""):
+    """Get a stable identifier of a scenario, used to find completed scenarios when a batch is resumed.
+
+    Args:
+        scenario (dict): Parameter values of the scenario.
+        input_hash (str, optional): Hash of the input files of the batch, see load_batch_data. Results of changed input files
+            get other identifiers and are simulated again. Defaults to "".
+
+    Returns:
+        str: Identifier of the scenario.
+    """
+    return hashlib.sha1(f"{input_hash} {json.dumps(scenario, sort_keys=True, default=str)}".encode()).hexdigest()[:12]
+
+def load_batch_data(vorlauf, ruecklauf, hast, erzeugeranlagen, json_path, COP_filename):
+    """Load the GeoJSON files and the building data once for all scenarios of a batch.
+
+    Args:
+        vorlauf (str): Path to the GeoJSON file for the forward line.
+        ruecklauf (str): Path to the GeoJSON file for the return line.
+        hast (str): Path to the GeoJSON file for the heat exchangers.
+        erzeugeranlagen (str): Path to the GeoJSON file for the heat producers.
+        json_path (str): Path to the JSON file with the building data and heat demand profiles.
+        COP_filename (str): Path to the file with COP data.
+
+    Returns:
+        dict: The loaded data and the hash of the content of all input files.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        building_data = json.load(f)
+
+    input_hash = hashlib.sha1(" ".join(hash_file(filename) for filename in [vorlauf, ruecklauf, hast, erzeugeranlagen, json_path, COP_filename]).encode()).hexdigest()
+
+    return {"vorlauf": gpd.read_file(vorlauf, driver='GeoJSON'),
+            "ruecklauf": gpd.read_file(ruecklauf, driver='GeoJSON'),
+            "hast": gpd.read_file(hast, driver='GeoJSON'),
+            "erzeugeranlagen": gpd.read_file(erzeugeranlagen, driver='GeoJSON'),
+            "building_data": building_data,
+            "COP_filename": COP_filename,
+            "input_hash": input_hash}
+
+def _init_batch_worker(batch_data):
+    """Store the data of the batch in the worker process, so it is transferred only once per worker.
+
+    Args:
+        batch_data (dict): Data loaded by load_batch_data.
+    """
+    shared_batch_data.update(batch_data)
+
+def simulate_scenario(scenario, batch_data=None):
+    """Initialize, optimize and simulate the network of one scenario.
+
+    The steps correspond to the network generation and the time series calculation in the GUI.
+
+    Args:
+        scenario (dict): Parameter values of the scenario, missing parameters are taken from DEFAULT_SCENARIO_PARAMETERS.
+        batch_data (dict, optional): Data loaded by load_batch_data. Defaults to the data of the worker process.
+
+    Returns:
+        dict: Parameters and summary results of the scenario.
+    """
+    batch_data = batch_data or shared_batch_data
+    p = {**DEFAULT_SCENARIO_PARAMETERS, **scenario}
+    start_time = time.time()
+
+    net, yearly_time_steps, waerme_hast_ges_W, return_temperature_heat_consumer, supply_temperature_buildings, return_temperature_buildings, \
+        supply_temperature_building_curve, return_temperature_building_curve, _, _ = initialize_geojson(batch_data["vorlauf"], batch_data["ruecklauf"], batch_data["hast"],
+                                                                                                        batch_data["erzeugeranlagen"], batch_data["building_data"],
+                                                                                                        batch_data["COP_filename"], p["min_supply_temperature_building"],
+                                                                                                        p["return_temperature_heat_consumer"], p["supply_temperature"],
+                                                                                                        p["flow_pressure_pump"], p["lift_pressure_pump"], p["netconfiguration"],
+                                                                                                        p["pipetype"], p["dT_RL"], p["v_max_pipe"], p["material_filter"],
+                                                                                                        p["insulation_filter"], p["v_max_heat_consumer"],
+                                                                                                        p["mass_flow_secondary_producers"])
+
+    if p["diameter_optimization"]:
+        net = net_optimization(net, p["v_max_pipe"], p["v_max_heat_consumer"], p["material_filter"], p["insulation_filter"])
+
+    waerme_hast_ges_W, strom_hast_ges_W, supply_temperature_heat_consumer, return_temperature_heat_consumer = time_series_preprocessing(p["supply_temperature"],
+                                                                                            p["min_supply_temperature_building"], return_temperature_heat_consumer,
+                                                                                            supply_temperature_buildings, return_temperature_buildings, p["building_temp_checked"],
+                                                                                            p["netconfiguration"], waerme_hast_ges_W, return_temperature_building_curve,
+                                                                                            p["dT_RL"], supply_temperature_building_curve, batch_data["COP_filename"])
+
+    time_steps, net, net_results = thermohydraulic_time_series_net(net, yearly_time_steps, waerme_hast_ges_W, p["start"], p["end"], p["supply_temperature"],
+                                                                   supply_temperature_heat_consumer, return_temperature_heat_consumer)
+
+    result = {"scenario_id": get_scenario_id(scenario, batch_data.get("input_hash", "")), "status": "ok", **scenario,
+              "pipe_length_m": net.pipe["length_km"].sum() * 1000,
+              "pipe_types": ", ".join(f"{std_type}: {count}" for std_type, count in net.pipe["std_type"].value_counts().sort_index().items()),
+              "heat_demand_MWh": np.sum(np.asarray(waerme_hast_ges_W)[:, p["start"]:p["end"]]) / 1e6,
+              "electricity_demand_MWh": np.sum(np.asarray(strom_hast_ges_W)[:, p["start"]:p["end"]]) / 1e6}
+
+    for pump, statistics in calculate_time_series_statistics(net, net_results).items():
+        for name, value in statistics.items():
+            if np.ndim(value) == 0:
+                result[f"{pump} {name}"] = value
+
+    result["calculation_time_s"] = time.time() - start_time
+    return result
+
+def _simulate_scenario_safe(scenario, batch_data=None):
+    """Simulate a scenario and return the error instead of raising it, so one failed scenario does not stop the batch.
+
+    Args:
+        scenario (dict): Parameter values of the scenario.
+        batch_data (dict, optional): Data loaded by load_batch_data. Defaults to the data of the worker process.
+
+    Returns:
+        dict: Parameters and summary results or the error of the scenario.
+    """
+    try:
+        return simulate_scenario(scenario, batch_data)
+    except Exception as e:
+        input_hash = (batch_data or shared_batch_data).get("input_hash", "")
+        return {"scenario_id": get_scenario_id(scenario, input_hash), "status": "error", **scenario, "error": f"{e}\n{traceback.format_exc()}"}
+
+def load_batch_results(results_filename):
+    """Load the result table of a batch, for repeated scenarios only the last result is kept.
+
+    Args:
+        results_filename (str): Path to the CSV file of the batch results.
+
+    Returns:
+        pd.DataFrame: The results of the batch, empty if the file does not exist.
+    """
+    if not os.path.exists(results_filename):
+        return pd.DataFrame()
+
+    results = pd.read_csv(results_filename, sep=';', dtype={"scenario_id": str, "status": str})
+    # Incomplete rows, e.g. of a file written by another program, have no valid status and are simulated again
+    results = results[results["status"].isin(["ok", "error"])]
+    return results.drop_duplicates(subset="scenario_id", keep="last").reset_index(drop=True)
+
+def append_batch_result(result, results_filename):
+    """Append the result of a scenario to the result table.
+
+    Args:
+        result (dict): Parameters and summary results of the scenario.
+        results_filename (str): Path to the CSV file of the batch results.
+    """
+    results = load_batch_results(results_filename)
+    results = pd.concat([results, pd.DataFrame([result])], ignore_index=True)
+    # The file is replaced atomically, so a crash while writing does not corrupt the results of completed scenarios
+    temporary_filename = results_filename + ".tmp"
+    results.to_csv(temporary_filename, sep=';', index=False)
+    os.replace(temporary_filename, results_filename)
+
+def run_batch_simulation(batch_data, scenarios, results_filename, n_workers=None):
+    """Simulate all scenarios of a batch and write the results to one table.
+
+    Scenarios which are already contained in the result table without error are skipped, so an interrupted batch continues
+    with the remaining scenarios when it is started again. The identifiers of the scenarios contain the hash of the input
+    files, so results of changed input files are not reused. Each result is written as soon as its scenario is completed.
+
+    Args:
+        batch_data (dict): Data loaded by load_batch_data.
+        scenarios (list): Scenarios as dictionaries of parameter values, e.g. from create_scenario_grid.
+        results_filename (str): Path to the CSV file of the batch results.
+        n_workers (int, optional): Number of worker processes, 1 simulates the scenarios in the current process. Defaults to the number of CPUs.
+
+    Returns:
+        pd.DataFrame: The results of all scenarios.
+    """
+    results = load_batch_results(results_filename)
+    completed = set(results.loc[results["status"] == "ok", "scenario_id"]) if not results.empty else set()
+    open_scenarios = [scenario for scenario in scenarios if get_scenario_id(scenario, batch_data.get("input_hash", "")) not in completed]
+    logging.info(f"Batch simulation: {len(scenarios) - len(open_scenarios)} of {len(scenarios)} scenarios already completed")
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1 or len(open_scenarios) <= 1:
+        for scenario in open_scenarios:
+            result = _simulate_scenario_safe(scenario, batch_data)
+            append_batch_result(result, results_filename)
+            logging.info(f"Scenario {result['scenario_id']} {scenario}: {result['status']}")
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(open_scenarios)), initializer=_init_batch_worker, initargs=(batch_data,)) as executor:
+            futures = {executor.submit(_simulate_scenario_safe, scenario): scenario for scenario in open_scenarios}
+            for future in as_completed(futures):
+                result = future.result()
+                append_batch_result(result, results_filename)
+                logging.info(f"Scenario {result['scenario_id']} {futures[future]}: {result['status']}")
+
+    return load_batch_results(results_filename)
@@ -2,11 +2,12 @@
 Filename: controllers.py
 Author: Dipl.-Ing. (FH) Jonas Pfeiffer
 Date: 2024-07-31
-Description: Contains two custom pandapipes Controllers for the net simulation.
+Description: Contains the custom pandapipes Controllers for the net simulation.
 """
 
 from pandapower.control.basic_controller import BasicCtrl
 from math import pi
+import logging
 import numpy as np
 
 class WorstPointPressureController(BasicCtrl):
@@ -20,9 +21,13 @@ class WorstPointPressureController(BasicCtrl):
         target_dp_min_bar (float, optional): Target minimum pressure difference in bar. Defaults to 1.
         tolerance (float, optional): Tolerance for pressure difference. Defaults to 0.2.
         proportional_gain (float, optional): Proportional gain for the controller. Defaults to 0.2.
+        track_worst_point (bool, optional): Determine the worst point again in every time step from the converged results of the 
+            time step instead of keeping worst_point_idx for the whole simulation. Defaults to False.
+        min_qext_w (float, optional): Minimum heat demand in W of a heat consumer to be controlled or considered as worst point. Defaults to 400.
         **kwargs: Additional keyword arguments.
     """
-    def __init__(self, net, worst_point_idx, circ_pump_pressure_idx=0, target_dp_min_bar=1, tolerance=0.2, proportional_gain=0.2, **kwargs):
+    def __init__(self, net, worst_point_idx, circ_pump_pressure_idx=0, target_dp_min_bar=1, tolerance=0.2, proportional_gain=0.2, track_worst_point=False, 
+                 min_qext_w=400, **kwargs):
         super(WorstPointPressureController, self).__init__(net, **kwargs)
         self.heat_exchanger_idx = worst_point_idx
         self.flow_control_idx = worst_point_idx
@@ -31,8 +36,52 @@ class WorstPointPressureController(BasicCtrl):
         self.target_dp_min_bar = target_dp_min_bar
         self.tolerance = tolerance
         self.proportional_gain = proportional_gain
+        self.track_worst_point = track_worst_point
+        self.min_qext_w = min_qext_w
 
         self.iteration = 0  # Add iteration counter
+        self.time_step_value = None
+        self.worst_point_updated = False
+        self.worst_point_changes = []  # (time step, previous worst point, new worst point)
+
+    def set_worst_point(self, worst_point_idx):
+        """Set the heat consumer which is controlled.
+
+        Args:
+            worst_point_idx (int): Index of the worst point in the network.
+        """
+        self.heat_exchanger_idx = worst_point_idx
+        self.flow_control_idx = worst_point_idx
+        self.heat_consumer_idx = worst_point_idx
+
+    def update_worst_point(self, net):
+        """Determine the worst point from the current pipeflow results, i.e. the heat consumer with the lowest pressure difference 
+        of all heat consumers with a heat demand above min_qext_w.
+
+        Args:
+            net (pandapipesNet): The pandapipes network.
+        """
+        self.worst_point_updated = True
+        active = net.heat_consumer["qext_w"].values > self.min_qext_w
+        if not np.any(active):
+            return
+
+        dp_bar = net.res_heat_consumer["p_from_bar"].values - net.res_heat_consumer["p_to_bar"].values
+        dp_bar = np.where(active & ~np.isnan(dp_bar), dp_bar, np.inf)
+        worst_point_idx = net.heat_consumer.index[np.argmin(dp_bar)]
+
+        if worst_point_idx != self.heat_consumer_idx:
+            logging.info(f"Time step {self.time_step_value}: worst point moved from heat consumer {self.heat_consumer_idx} to {worst_point_idx}")
+            self.worst_point_changes.append((self.time_step_value, self.heat_consumer_idx, worst_point_idx))
+            self.set_worst_point(worst_point_idx)
+
+    def get_worst_point_changes(self):
+        """Get the time steps in which the worst point moved to another heat consumer.
+
+        Returns:
+            list: Tuples of time step, previous and new index of the worst point.
+        """
+        return self.worst_point_changes
 
     def time_step(self, net, time_step):
         """Reset the iteration counter at the start of each time step.
@@ -45,8 +94,17 @@ class WorstPointPressureController(BasicCtrl):
             int: The current time step.
         """
         self.iteration = 0  # reset iteration counter
+        self.time_step_value = time_step
         return time_step
 
+    def initialize_control(self, net):
+        """Reset the worst point update at the start of each control loop.
+
+        Args:
+            net (pandapipesNet): The pandapipes network.
+        """
+        self.worst_point_updated = False
+
     def is_converged(self, net):
         """Check if the controller has converged.
 
@@ -57,12 +115,21 @@ class WorstPointPressureController(BasicCtrl):
             bool: True if converged, False otherwise.
         """
         qext_w = net.heat_consumer["qext_w"].at[self.heat_consumer_idx]
-        if qext_w <= 400:
-            return True
-        current_dp_bar = net.res_heat_consumer["p_from_bar"].at[self.heat_consumer_idx] - net.res_heat_consumer["p_to_bar"].at[self.heat_consumer_idx]
+        if qext_w <= self.min_qext_w:
+            dp_within_tolerance = True
+        else:
+            current_dp_bar = net.res_heat_consumer["p_from_bar"].at[self.heat_consumer_idx] - net.res_heat_consumer["p_to_bar"].at[self.heat_consumer_idx]
+
+            # Check if the pressure difference is within tolerance
+            dp_within_tolerance = abs(current_dp_bar - self.target_dp_min_bar) < self.tolerance
 
-        # Check if the pressure difference is within tolerance
-        dp_within_tolerance = abs(current_dp_bar - self.target_dp_min_bar) < self.tolerance
+        # The worst point is determined once per time step from the converged hydraulic solution, if it moved the pressure is
+        # controlled again for the new worst point
+        if dp_within_tolerance and self.track_worst_point and not self.worst_point_updated and net.converged:
+            previous_worst_point_idx = self.heat_consumer_idx
+            self.update_worst_point(net)
+            if self.heat_consumer_idx != previous_worst_point_idx:
+                return self.is_converged(net)
 
         if dp_within_tolerance == True:
             return dp_within_tolerance
@@ -82,7 +149,7 @@ class WorstPointPressureController(BasicCtrl):
         current_plift_bar = net.circ_pump_pressure["plift_bar"].at[self.circ_pump_pressure_idx]
         current_pflow_bar = net.circ_pump_pressure["p_flow_bar"].at[self.circ_pump_pressure_idx]
 
-        if qext_w <= 400:
+        if qext_w <= self.min_qext_w:
             return super(WorstPointPressureController, self).control_step(net)
 
         dp_error = self.target_dp_min_bar - current_dp_bar
@@ -395,4 +462,248 @@ class ReturnTemperatureController(BasicCtrl):
                 print(f"Max iterations reached for heat_consumer_idx: {self.heat_consumer_idx}")
             return True
 
-        return False
\ No newline at end of file
+        return False
+
+
+class VectorizedReturnTemperatureController(BasicCtrl):
+    """
+    A controller for maintaining the return temperatures of all heat consumers in the network at once.
+
+    It applies the control logic of ReturnTemperatureController to every heat consumer, but updates the mass flows
+    as NumPy arrays instead of one controller object per heat consumer.
+    
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        heat_consumer_idx (array-like): Indices of the heat consumers.
+        target_return_temperature (array-like): Target return temperatures.
+        min_supply_temperature (array-like, optional): Minimum supply temperatures. Defaults to 65.
+        kp (float, optional): Proportional gain. Defaults to 0.95.
+        ki (float, optional): Integral gain. Defaults to 0.0.
+        kd (float, optional): Derivative gain. Defaults to 0.0.
+        tolerance (float, optional): Tolerance for temperature difference. Defaults to 2.
+        min_velocity (float, optional): Minimum velocity in m/s. Defaults to 0.01.
+        max_velocity (float, optional): Maximum velocity in m/s. Defaults to 2.
+        max_iterations (int, optional): Maximum number of iterations. Defaults to 100.
+        debug (bool, optional): Flag to enable debug output. Defaults to False.
+        **kwargs: Additional keyword arguments.
+    """
+    def __init__(self, net, heat_consumer_idx, target_return_temperature, min_supply_temperature=65, kp=0.95, ki=0.0, kd=0.0, tolerance=2, min_velocity=0.01, max_velocity=2, max_iterations=100, debug=False, **kwargs):
+        super(VectorizedReturnTemperatureController, self).__init__(net, **kwargs)
+        self.heat_consumer_idx = np.asarray(heat_consumer_idx)
+        n = len(self.heat_consumer_idx)
+        self.target_return_temperature = np.broadcast_to(np.asarray(target_return_temperature, dtype=float), (n,)).copy()
+        self.min_supply_temperature = np.broadcast_to(np.asarray(min_supply_temperature, dtype=float), (n,)).copy()
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.cp = 4190  # Specific heat capacity in J/(kg K)
+        self.tolerance = tolerance
+        self.min_velocity = min_velocity
+        self.max_velocity = max_velocity
+        self.max_iterations = max_iterations
+        self.original_target_return_temperature = self.target_return_temperature.copy()
+
+        self.data_source = None
+        self.return_temperature_columns = [f'return_temperature_{i}' for i in range(n)]
+        self.min_supply_temperature_columns = [f'min_supply_temperature_{i}' for i in range(n)]
+        self.debug = debug
+
+        self.calculate_mass_flow_limits(net)
+        self.at_min_mass_flow_limit = np.zeros(n, dtype=bool)
+        self.at_max_mass_flow_limit = np.zeros(n, dtype=bool)
+        self.reset_state()
+
+    def reset_state(self):
+        """Reset the iteration counters and the PID and temperature history of all heat consumers."""
+        n = len(self.heat_consumer_idx)
+        self.iteration = np.zeros(n, dtype=int)
+        self.integral = np.zeros(n)
+        self.last_error = np.full(n, np.nan)  # NaN marks that no previous error exists
+        # The last two supply temperatures of every heat consumer, the newest one in the last column
+        self.previous_temperatures = np.full((n, 2), np.nan)
+        self.converged_mask = np.zeros(n, dtype=bool)
+
+    def time_step(self, net, time_step):
+        """Reset the controller parameters at the start of each time step.
+
+        Args:
+            net (pandapipesNet): The pandapipes network.
+            time_step (int): The current time step.
+
+        Returns:
+            int: The current time step.
+        """
+        self.reset_state()
+        self.target_return_temperature = self.original_target_return_temperature.copy()
+
+        mass_flow = net.heat_consumer["controlled_mdot_kg_per_s"].loc[self.heat_consumer_idx].values
+        mass_flow = np.where(self.at_min_mass_flow_limit, self.min_mass_flow * 1.05, mass_flow)
+        mass_flow = np.where(self.at_max_mass_flow_limit, self.max_mass_flow * 0.95, mass_flow)
+        net.heat_consumer.loc[self.heat_consumer_idx, "controlled_mdot_kg_per_s"] = mass_flow
+
+        # Check if a data source exists and get the target temperatures for the current time step
+        if self.data_source is not None:
+            self.target_return_temperature = self.data_source.df.loc[time_step, self.return_temperature_columns].values.astype(float)
+            self.min_supply_temperature = self.data_source.df.loc[time_step, self.min_supply_temperature_columns].values.astype(float)
+
+        return time_step
+
+    def calculate_mass_flow_limits(self, net):
+        """Calculate the minimum and maximum mass flow limits.
+
+        Args:
+            net (pandapipesNet): The pandapipes network.
+        """
+        diameter = net.heat_consumer["diameter_m"].loc[self.heat_consumer_idx].values
+        area = (pi / 4) * (diameter ** 2)
+
+        self.min_mass_flow = self.min_velocity * area * 1000
+        self.max_mass_flow = self.max_velocity * area * 1000
+
+    def get_weighted_average_temperature(self):
+        """Calculate the weighted average of the previous temperatures.
+
+        Returns:
+            np.ndarray: The weighted average temperatures, NaN where no previous temperature exists.
+        """
+        older, newer = self.previous_temperatures[:, 0], self.previous_temperatures[:, 1]
+        return np.where(np.isnan(older), newer, (older + 2 * newer) / 3)
+
+    def read_state(self, net):
+        """Read the heat demand, temperatures and mass flows of all heat consumers.
+
+        Args:
+            net (pandapipesNet): The pandapipes network.
+
+        Returns:
+            tuple: Heat demand, supply and return temperatures in °C and controlled mass flows.
+        """
+        # Positional indexing of the columns avoids the overhead of label based access
+        positions = net.heat_consumer.index.get_indexer(self.heat_consumer_idx)
+        res_positions = net.res_heat_consumer.index.get_indexer(self.heat_consumer_idx)
+
+        qext_w = net.heat_consumer["qext_w"].values[positions].astype(float)
+        current_T_in = net.res_heat_consumer["t_from_k"].values[res_positions] - 273.15
+        current_T_out = net.res_heat_consumer["t_to_k"].values[res_positions] - 273.15
+        current_mass_flow = net.heat_consumer["controlled_mdot_kg_per_s"].values[positions].astype(float)
+        return qext_w, current_T_in, current_T_out, current_mass_flow
+
+    def control_step(self, net):
+        """Adjust the mass flows of all unconverged heat consumers to maintain the target return temperatures.
+
+        Args:
+            net (pandapipesNet): The pandapipes network.
+        """
+        active = ~self.converged_mask
+        self.iteration[active] += 1
+
+        qext_w, current_T_in, current_T_out, current_mass_flow = self.read_state(net)
+        new_mass_flow = current_mass_flow.copy()
+
+        # Not converging under that value
+        low_demand = active & (qext_w <= 500)
+        new_mass_flow[low_demand] = self.min_mass_flow[low_demand]
+        active = active & ~low_demand
+
+        weighted_avg_T_in = self.get_weighted_average_temperature()
+        current_T_in = np.where(np.isnan(weighted_avg_T_in), current_T_in, weighted_avg_T_in)
+
+        # Ensure the supply temperature does not fall below the minimum supply temperature
+        supply_too_low = active & (current_T_in < self.min_supply_temperature)
+        if np.any(supply_too_low):
+            error = self.min_supply_temperature[supply_too_low] - current_T_in[supply_too_low]
+            derivative = self.calculate_derivative(error, supply_too_low)
+            pid_output = (self.kp * error) + (self.ki * self.integral[supply_too_low]) + (self.kd * derivative)
+            new_mass_flow[supply_too_low] = current_mass_flow[supply_too_low] + pid_output * self.cp * (self.min_supply_temperature[supply_too_low] - current_T_out[supply_too_low])
+            new_mass_flow[supply_too_low] = np.clip(new_mass_flow[supply_too_low], self.min_mass_flow[supply_too_low], self.max_mass_flow[supply_too_low])
+        active = active & ~supply_too_low
+
+        if np.any(active):
+            # Adjust target slightly to avoid division by zero
+            self.target_return_temperature = np.where(active & (current_T_in == self.target_return_temperature), self.target_return_temperature + 0.1, self.target_return_temperature)
+
+            T_in, T_out, q = current_T_in[active], current_T_out[active], qext_w[active]
+            error = self.target_return_temperature[active] - T_out
+            self.integral[active] += error
+            derivative = self.calculate_derivative(error, active)
+
+            # PID calculation
+            pid_output = (self.kp * error) + (self.ki * self.integral[active]) + (self.kd * derivative)
+
+            # Calculate new mass flow based on Q = m * cp * dT, avoid division by zero
+            delta_T = T_in - T_out
+            delta_T = np.where(delta_T == 0, 0.1, delta_T)
+            adjusted_delta_T = T_in - (T_out + pid_output)
+            adjusted_delta_T = np.where(adjusted_delta_T == 0, 0.1, adjusted_delta_T)
+
+            # At the first iteration the mass flow from the previous time step is not corrected but recalculated
+            mass_flow_correction = q / (self.cp * adjusted_delta_T) - q / (self.cp * delta_T)
+            first_iteration = self.iteration[active] == 1
+            mass_flow = np.where(first_iteration, q / (self.cp * adjusted_delta_T), current_mass_flow[active] + mass_flow_correction)
+
+            # Apply physical limits
+            new_mass_flow[active] = np.clip(mass_flow, self.min_mass_flow[active], self.max_mass_flow[active])
+
+        net.heat_consumer.loc[self.heat_consumer_idx, "controlled_mdot_kg_per_s"] = new_mass_flow
+
+        if self.debug:
+            print(f"Iteration: {self.iteration.max()}, controlled heat consumers: {np.sum(~self.converged_mask)}, minimum supply temperature not met: {np.sum(supply_too_low)}")
+
+        return super(VectorizedReturnTemperatureController, self).control_step(net)
+
+    def calculate_derivative(self, error, mask):
+        """Calculate the derivative component of the PID controller for the selected heat consumers.
+
+        Args:
+            error (np.ndarray): The current errors of the selected heat consumers.
+            mask (np.ndarray): Boolean mask of the selected heat consumers.
+
+        Returns:
+            np.ndarray: The derivatives of the errors.
+        """
+        last_error = self.last_error[mask]
+        derivative = np.where(np.isnan(last_error), 0, error - last_error)
+        self.last_error[mask] = error
+        return derivative
+
+    def is_converged(self, net):
+        """Check if the controller has converged for all heat consumers.
+
+        The heat consumers that have not converged are controlled in the next control step.
+
+        Args:
+            net (pandapipesNet): The pandapipes network.
+
+        Returns:
+            bool: True if converged, False otherwise.
+        """
+        qext_w, current_T_in, current_T_out, current_mass_flow = self.read_state(net)
+
+        # Not converging under that value
+        low_demand = qext_w <= 500
+
+        # Check whether the temperatures have changed within the specified tolerance
+        previous_T_in = self.previous_temperatures[:, 1]
+        temperature_change = np.where(np.isnan(previous_T_in), np.inf, np.abs(current_T_in - previous_T_in))
+        converged_T_in = temperature_change < self.tolerance
+        converged_T_out = np.abs(current_T_out - self.target_return_temperature) < self.tolerance
+
+        # Update the previous temperatures of all heat consumers with sufficient heat demand
+        self.previous_temperatures[~low_demand, 0] = self.previous_temperatures[~low_demand, 1]
+        self.previous_temperatures[~low_demand, 1] = current_T_in[~low_demand]
+
+        # Check whether the mass flow limits have been reached
+        self.at_min_mass_flow_limit = np.where(low_demand, self.at_min_mass_flow_limit, current_mass_flow <= self.min_mass_flow)
+        self.at_max_mass_flow_limit = np.where(low_demand, self.at_max_mass_flow_limit, current_mass_flow >= self.max_mass_flow)
+        at_limit = (self.at_min_mass_flow_limit | self.at_max_mass_flow_limit) & (self.iteration > 10)
+
+        # Convergence based on the minimum supply temperature, the temperatures and the maximum number of iterations
+        supply_too_low = current_T_in < self.min_supply_temperature
+        converged = ~supply_too_low & ((converged_T_in & converged_T_out) | (self.iteration >= self.max_iterations))
+
+        self.converged_mask = low_demand | at_limit | converged
+
+        if self.debug:
+            print(f"Converged heat consumers: {np.sum(self.converged_mask)} of {len(self.converged_mask)}")
+
+        return bool(np.all(self.converged_mask))
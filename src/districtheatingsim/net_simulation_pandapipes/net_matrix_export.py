@@ -0,0 +1,284 @@
+"""
+Filename: net_matrix_export.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: Export of the hydraulic network as sparse incidence matrix with parameter arrays to NPZ, import back to a pandapipes network and a sparse mass flow calculation.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+import pandapipes as pp
+
+# Increase if the content of the export changes
+MATRIX_EXPORT_VERSION = 1
+
+# Branch elements and their junction columns, the branch direction is from the first to the second junction
+BRANCH_TABLES = {"pipe": ("from_junction", "to_junction"),
+                 "heat_consumer": ("from_junction", "to_junction"),
+                 "flow_control": ("from_junction", "to_junction"),
+                 "circ_pump_pressure": ("return_junction", "flow_junction"),
+                 "circ_pump_mass": ("return_junction", "flow_junction")}
+
+# Branch elements with a given mass flow, the mass flow of all other branches follows from the continuity equation
+FIXED_MASS_FLOW_COLUMNS = {"heat_consumer": "controlled_mdot_kg_per_s",
+                           "flow_control": "controlled_mdot_kg_per_s",
+                           "circ_pump_mass": "mdot_flow_kg_per_s"}
+
+def _table_to_arrays(table, table_name):
+    """Convert the columns of an element table to arrays, text columns are stored as strings with "" for None.
+
+    Args:
+        table (pd.DataFrame): Element table of the network.
+        table_name (str): Name of the table, used as prefix of the array names.
+
+    Returns:
+        dict: Arrays named "<table_name>.<column>" and the element index "<table_name>.index".
+    """
+    arrays = {f"{table_name}.index": table.index.values}
+    for column in table.columns:
+        values = table[column]
+        if values.dtype == object:
+            arrays[f"{table_name}.{column}"] = np.asarray(values.where(values.notna(), "").astype(str).values, dtype=str)
+        else:
+            arrays[f"{table_name}.{column}"] = values.values
+    return arrays
+
+def _arrays_to_table(matrices, table_name):
+    """Convert the arrays of an element table back to a DataFrame.
+
+    Args:
+        matrices (dict): Arrays as returned by import_net_matrices.
+        table_name (str): Name of the table.
+
+    Returns:
+        pd.DataFrame: The element table.
+    """
+    prefix = f"{table_name}."
+    columns = {name[len(prefix):]: values for name, values in matrices.items() if name.startswith(prefix) and name != f"{table_name}.index"}
+    table = pd.DataFrame(columns, index=matrices[f"{table_name}.index"])
+    for column in table.columns:
+        if table[column].dtype.kind == "U" or table[column].dtype == object:
+            table[column] = table[column].astype(object).where(table[column] != "", None)
+    return table
+
+def get_branch_tables(net):
+    """Get the branch element tables of the network which contain elements.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+
+    Returns:
+        list: Names of the branch tables, in the order of BRANCH_TABLES.
+    """
+    return [table_name for table_name in BRANCH_TABLES if table_name in net and not net[table_name].empty]
+
+def create_incidence_matrix(junction_index, branch_from_junctions, branch_to_junctions):
+    """Create the sparse junction-branch incidence matrix.
+
+    The entry is -1 at the junction where a branch starts and +1 at the junction where it ends, so the product with the
+    branch mass flows is the mass flow into each junction.
+
+    Args:
+        junction_index (array): Index of the junctions, defines the row order.
+        branch_from_junctions (array): Start junction of each branch.
+        branch_to_junctions (array): End junction of each branch.
+
+    Returns:
+        scipy.sparse.csr_matrix: Incidence matrix of shape (junctions, branches).
+    """
+    junction_positions = pd.Index(junction_index)
+    from_positions = junction_positions.get_indexer(branch_from_junctions)
+    to_positions = junction_positions.get_indexer(branch_to_junctions)
+    if np.any(from_positions < 0) or np.any(to_positions < 0):
+        raise ValueError("Branch elements are connected to junctions which do not exist.")
+
+    n_branches = len(from_positions)
+    rows = np.concatenate((from_positions, to_positions))
+    columns = np.concatenate((np.arange(n_branches), np.arange(n_branches)))
+    data = np.concatenate((-np.ones(n_branches), np.ones(n_branches)))
+    return sp.csr_matrix((data, (rows, columns)), shape=(len(junction_positions), n_branches))
+
+def export_net_matrices(net, filename):
+    """Export the hydraulic network as sparse incidence matrix, element parameter arrays and consumer injection vectors to NPZ.
+
+    The file contains:
+        - "incidence.data", "incidence.indices", "incidence.indptr", "incidence.shape": The junction-branch incidence matrix in CSR format.
+        - "branch.table", "branch.index": Element table and index of each branch (matrix column).
+        - "<table>.<column>" and "<table>.index": All columns of the junction and branch element tables, and the junction geodata.
+        - "junction.consumer_mdot_kg_per_s": Mass flow drawn by the heat consumers from each junction (negative at their return junction).
+        - "junction.consumer_qext_w": Heat extracted by the heat consumers at their supply junction.
+
+    The mass flows of the heat consumers are taken from the pipeflow results if available, otherwise from controlled_mdot_kg_per_s.
+    Controllers are not exported.
+
+    Args:
+        net (pandapipesNet): The dimensioned pandapipes network.
+        filename (str): Path to the NPZ file.
+    """
+    branch_tables = get_branch_tables(net)
+    branch_from_junctions = np.concatenate([net[table_name][BRANCH_TABLES[table_name][0]].values for table_name in branch_tables])
+    branch_to_junctions = np.concatenate([net[table_name][BRANCH_TABLES[table_name][1]].values for table_name in branch_tables])
+    incidence = create_incidence_matrix(net.junction.index.values, branch_from_junctions, branch_to_junctions)
+
+    arrays = {"version": MATRIX_EXPORT_VERSION,
+              "fluid": net.fluid.name,
+              "incidence.data": incidence.data,
+              "incidence.indices": incidence.indices,
+              "incidence.indptr": incidence.indptr,
+              "incidence.shape": np.array(incidence.shape),
+              "branch.table": np.concatenate([np.full(len(net[table_name]), table_name) for table_name in branch_tables]),
+              "branch.index": np.concatenate([net[table_name].index.values for table_name in branch_tables])}
+
+    arrays.update(_table_to_arrays(net.junction, "junction"))
+    if "junction_geodata" in net and not net.junction_geodata.empty:
+        arrays.update(_table_to_arrays(net.junction_geodata, "junction_geodata"))
+    for table_name in branch_tables:
+        arrays.update(_table_to_arrays(net[table_name], table_name))
+
+    # Injection vectors of the heat consumers per junction
+    consumer_mdot = np.zeros(len(net.junction))
+    consumer_qext = np.zeros(len(net.junction))
+    if "heat_consumer" in branch_tables:
+        if "res_heat_consumer" in net and len(net.res_heat_consumer) == len(net.heat_consumer) and net.res_heat_consumer.mdot_from_kg_per_s.notna().all():
+            mdot = net.res_heat_consumer.mdot_from_kg_per_s.values
+        else:
+            mdot = net.heat_consumer.controlled_mdot_kg_per_s.fillna(0).values
+        consumer_columns = np.flatnonzero(arrays["branch.table"] == "heat_consumer")
+        consumer_mdot = -(incidence[:, consumer_columns] @ mdot)
+        from_positions = net.junction.index.get_indexer(net.heat_consumer.from_junction.values)
+        np.add.at(consumer_qext, from_positions, net.heat_consumer.qext_w.fillna(0).values)
+    arrays["junction.consumer_mdot_kg_per_s"] = consumer_mdot
+    arrays["junction.consumer_qext_w"] = consumer_qext
+
+    np.savez_compressed(filename, **arrays)
+    logging.info(f"Network exported to {filename}: {incidence.shape[0]} junctions, {incidence.shape[1]} branches")
+
+def import_net_matrices(filename):
+    """Import the matrices and arrays of a network exported with export_net_matrices.
+
+    Args:
+        filename (str): Path to the NPZ file.
+
+    Returns:
+        dict: All arrays of the file and the incidence matrix as scipy.sparse.csr_matrix under "incidence".
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        matrices = {name: data[name] for name in data.files}
+
+    if int(matrices["version"]) != MATRIX_EXPORT_VERSION:
+        raise ValueError(f"Unsupported version {int(matrices['version'])} of the network export, expected {MATRIX_EXPORT_VERSION}.")
+
+    matrices["incidence"] = sp.csr_matrix((matrices["incidence.data"], matrices["incidence.indices"], matrices["incidence.indptr"]),
+                                          shape=tuple(matrices["incidence.shape"]))
+    return matrices
+
+def create_net_from_matrices(matrices):
+    """Create a pandapipes network from the imported matrices and arrays.
+
+    The elements are created with the bulk creators, afterwards all exported columns are restored, so the element tables
+    equal the exported network. Controllers have to be created again, e.g. with create_controllers.
+
+    Args:
+        matrices (dict): Arrays as returned by import_net_matrices.
+
+    Returns:
+        pandapipesNet: The pandapipes network.
+    """
+    net = pp.create_empty_network(fluid=str(matrices["fluid"]))
+
+    junction = _arrays_to_table(matrices, "junction")
+    geodata = None
+    if "junction_geodata.index" in matrices:
+        junction_geodata = _arrays_to_table(matrices, "junction_geodata").reindex(junction.index)
+        geodata = list(zip(junction_geodata.x.values, junction_geodata.y.values))
+    pp.create_junctions(net, len(junction), pn_bar=junction.pn_bar.values, tfluid_k=junction.tfluid_k.values, index=junction.index.values, geodata=geodata)
+
+    tables = {"junction": junction}
+    branch_table_names = [table_name for table_name in BRANCH_TABLES if f"{table_name}.index" in matrices]
+    for table_name in branch_table_names:
+        table = _arrays_to_table(matrices, table_name)
+        tables[table_name] = table
+        if table_name == "pipe":
+            pp.create_pipes_from_parameters(net, table.from_junction.values, table.to_junction.values, table.length_km.values,
+                                            table.diameter_m.values, index=table.index.values)
+        elif table_name == "heat_consumer":
+            pp.create_heat_consumers(net, table.from_junction.values, table.to_junction.values, table.diameter_m.values,
+                                     qext_w=table.qext_w.fillna(0).values, controlled_mdot_kg_per_s=table.controlled_mdot_kg_per_s.fillna(0).values,
+                                     index=table.index.values)
+        elif table_name == "flow_control":
+            pp.create_flow_controls(net, table.from_junction.values, table.to_junction.values, table.controlled_mdot_kg_per_s.values,
+                                    table.diameter_m.values, index=table.index.values)
+        elif table_name == "circ_pump_pressure":
+            for index, row in table.iterrows():
+                pp.create_circ_pump_const_pressure(net, row.return_junction, row.flow_junction, row.p_flow_bar, row.plift_bar, t_flow_k=row.t_flow_k, index=index)
+        elif table_name == "circ_pump_mass":
+            for index, row in table.iterrows():
+                pp.create_circ_pump_const_mass_flow(net, row.return_junction, row.flow_junction, row.p_flow_bar, row.mdot_flow_kg_per_s, t_flow_k=row.t_flow_k, index=index)
+
+    # Restore all exported columns, including the ones the creators do not set (std_type, text_k, name, ...)
+    for table_name, table in tables.items():
+        for column in table.columns:
+            net[table_name][column] = table[column].values.astype(net[table_name][column].dtype) if column in net[table_name] else table[column].values
+
+    return net
+
+def calculate_branch_mass_flows(matrices, consumer_mdot_kg_per_s=None):
+    """Calculate the mass flows of all branches of a radial network from the mass flows of the heat consumers.
+
+    The mass flows of the pipes and pressure controlled pumps follow from the continuity equation A @ mdot = 0 at all junctions.
+    The incidence matrix is factorized once, so the mass flows of many time steps are calculated in one call without pandapipes.
+    In a radial network the number of unknown mass flows equals the number of independent junction equations. Meshed networks
+    additionally require the pressure equations and are not supported.
+
+    Args:
+        matrices (dict): Arrays as returned by import_net_matrices.
+        consumer_mdot_kg_per_s (array, optional): Mass flows of the heat consumers, shape (consumers,) or (consumers, time steps).
+            Defaults to the exported controlled_mdot_kg_per_s.
+
+    Returns:
+        np.ndarray: Mass flows of all branches in the order of "branch.table", shape (branches,) or (branches, time steps).
+    """
+    incidence = matrices["incidence"]
+    branch_tables = matrices["branch.table"]
+
+    # Branches with a given mass flow
+    fixed_mdot = []
+    fixed_mask = np.zeros(len(branch_tables), dtype=bool)
+    for table_name, column in FIXED_MASS_FLOW_COLUMNS.items():
+        branch_mask = branch_tables == table_name
+        if not branch_mask.any():
+            continue
+        fixed_mask |= branch_mask
+        if table_name == "heat_consumer" and consumer_mdot_kg_per_s is not None:
+            mdot = np.asarray(consumer_mdot_kg_per_s, dtype=float)
+        else:
+            mdot = np.nan_to_num(matrices[f"{table_name}.{column}"].astype(float))
+        fixed_mdot.append((np.flatnonzero(branch_mask), mdot))
+
+    n_time_steps = None if consumer_mdot_kg_per_s is None or np.ndim(consumer_mdot_kg_per_s) == 1 else np.shape(consumer_mdot_kg_per_s)[1]
+    shape = (len(branch_tables),) if n_time_steps is None else (len(branch_tables), n_time_steps)
+    branch_mdot = np.zeros(shape)
+    for columns, mdot in fixed_mdot:
+        branch_mdot[columns] = mdot if mdot.ndim == branch_mdot.ndim else mdot[:, np.newaxis]
+
+    # Continuity equations of the junctions connected to branches with unknown mass flow, except one of them, as
+    # the equations of a connected network are linearly dependent
+    free_columns = np.flatnonzero(~fixed_mask)
+    free_rows = np.flatnonzero(np.diff(incidence[:, free_columns].tocsr().indptr) > 0)
+    reduced_incidence = incidence[free_rows[1:]]
+    system_matrix = reduced_incidence[:, free_columns].tocsc()
+    if system_matrix.shape[0] != system_matrix.shape[1]:
+        raise ValueError(f"The network is not radial: {system_matrix.shape[1]} unknown mass flows for {system_matrix.shape[0]} junction equations.")
+    try:
+        lu = splu(system_matrix)
+    except RuntimeError as e:
+        raise ValueError(f"The continuity equations of the network can not be solved, check the connectivity of the network: {e}")
+
+    fixed_columns = np.flatnonzero(fixed_mask)
+    branch_mdot[free_columns] = lu.solve(-(reduced_incidence[:, fixed_columns] @ branch_mdot[fixed_columns]))
+    return branch_mdot
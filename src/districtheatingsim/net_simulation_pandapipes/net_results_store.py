@@ -0,0 +1,163 @@
+"""
+Filename: net_results_store.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: On-disk store for the complete results of the time series simulation with lazy per-variable loading.
+"""
+
+import os
+import json
+
+import numpy as np
+
+def save_net_results_store(net, net_results, time_steps, path, inputs=None, net_hash=None):
+    """Save all logged variables of the time series simulation to a results store.
+
+    Every variable (e.g. "res_junction.p_bar") is written to its own npy file in column-major order, so the time series of each
+    element is stored contiguously and can be read without loading the whole (time steps x elements) matrix. An index file
+    describes the variables and their elements. The inputs of the simulation and the hash of the network parameters can be stored
+    as well, they are used to re-simulate only the affected time steps after changes (see thermohydraulic_time_series_net_incremental).
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        net_results (dict): Results of the time series simulation.
+        time_steps (array): Array of time steps.
+        path (str): Directory of the results store.
+        inputs (dict, optional): Input profiles of the simulation with the time steps in the last axis. Defaults to None.
+        net_hash (str, optional): Hash of the network parameters. Defaults to None.
+
+    Returns:
+        None
+    """
+    os.makedirs(path, exist_ok=True)
+
+    np.save(os.path.join(path, "time_steps.npy"), np.asarray(time_steps).astype('datetime64[s]'))
+    index = {"version": 1, "variables": {}, "inputs": [], "net_hash": net_hash}
+
+    for variable, values in net_results.items():
+        table, column = variable.split(".", 1)
+        values = np.asarray(values)
+        np.save(os.path.join(path, f"{variable}.npy"), np.asfortranarray(values))
+
+        variable_info = {"table": table, "column": column, "shape": list(values.shape), "elements": None, "names": None}
+        if table in net and values.ndim == 2 and len(net[table]) == values.shape[1]:
+            variable_info["elements"] = net[table].index.tolist()
+            if "name" in net[table]:
+                variable_info["names"] = [str(name) for name in net[table]["name"]]
+        index["variables"][variable] = variable_info
+
+    for name, values in (inputs or {}).items():
+        np.save(os.path.join(path, f"inputs.{name}.npy"), np.asarray(values))
+        index["inputs"].append(name)
+
+    with open(os.path.join(path, "index.json"), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=4, ensure_ascii=False)
+
+class NetResultsStore:
+    """
+    Read access to a results store written by save_net_results_store. The variables are memory-mapped when first accessed
+    and only the requested slices are read from disk.
+
+    Args:
+        path (str): Directory of the results store.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json"), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.arrays = {}
+
+    def __contains__(self, variable):
+        return variable in self.index["variables"]
+
+    def memmap(self, name):
+        """Memory-map a stored array.
+
+        Args:
+            name (str): Name of the variable or "time_steps".
+
+        Returns:
+            np.memmap: The read-only memory-mapped array.
+        """
+        if name not in self.arrays:
+            self.arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+        return self.arrays[name]
+
+    def close(self):
+        """Release the memory-mapped arrays, e.g. before the store is overwritten. The arrays are mapped again when accessed."""
+        self.arrays = {}
+
+    def get_variables(self):
+        """Get the stored variables.
+
+        Returns:
+            list: Names of the stored variables.
+        """
+        return list(self.index["variables"].keys())
+
+    def get_time_steps(self):
+        """Get the time steps of the results.
+
+        Returns:
+            np.ndarray: Array of time steps.
+        """
+        return np.array(self.memmap("time_steps"))
+
+    def get_elements(self, variable):
+        """Get the element indices of a variable.
+
+        Args:
+            variable (str): Name of the variable, e.g. "res_junction.p_bar".
+
+        Returns:
+            list: Indices of the elements in the network table, or None for variables without elements.
+        """
+        return self.index["variables"][variable]["elements"]
+
+    def get_names(self, variable):
+        """Get the element names of a variable.
+
+        Args:
+            variable (str): Name of the variable, e.g. "res_heat_consumer.t_from_k".
+
+        Returns:
+            list: Names of the elements, or None if the table has no names.
+        """
+        return self.index["variables"][variable]["names"]
+
+    def get_inputs(self):
+        """Get the stored input profiles of the simulation.
+
+        Returns:
+            dict: Input profiles, empty if the store contains no inputs.
+        """
+        return {name: np.array(self.memmap(f"inputs.{name}")) for name in self.index.get("inputs", [])}
+
+    def get_net_hash(self):
+        """Get the hash of the network parameters of the stored simulation.
+
+        Returns:
+            str: Hash of the network parameters, or None if it was not stored.
+        """
+        return self.index.get("net_hash")
+
+    def load(self, variable, elements=None, start=None, end=None):
+        """Read a slice of a variable from the store.
+
+        Args:
+            variable (str): Name of the variable, e.g. "res_junction.p_bar".
+            elements (int or list, optional): Element index or list of element indices of the network table. Defaults to all elements.
+            start (int, optional): Index of the first time step. Defaults to None.
+            end (int, optional): Index of the end time step (exclusive). Defaults to None.
+
+        Returns:
+            np.ndarray: The values with shape (time steps,) for a single element or (time steps, elements).
+        """
+        values = self.memmap(variable)[start:end]
+        if elements is None or values.ndim == 1:
+            return np.array(values)
+
+        element_positions = {element: position for position, element in enumerate(self.get_elements(variable))}
+        if np.ndim(elements) == 0:
+            return np.array(values[:, element_positions[elements]])
+        return np.array(values[:, [element_positions[element] for element in elements]])
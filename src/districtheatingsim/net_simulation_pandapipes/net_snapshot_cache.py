@@ -0,0 +1,103 @@
+"""
+Filename: net_snapshot_cache.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: Snapshot of the initialized and dimensioned network, which is reused as long as the input files and parameters are unchanged.
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+import pandapipes as pp
+
+# Increase if the network initialization changes, so existing snapshots are not used anymore
+SNAPSHOT_VERSION = 1
+
+def hash_file(filename):
+    """Calculate the hash of the content of a file.
+
+    Args:
+        filename (str): Path to the file.
+
+    Returns:
+        str: Hexadecimal hash of the file content.
+    """
+    hasher = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def hash_initialization_inputs(filenames, parameters):
+    """Calculate the key of a network initialization from the content of the input files and the parameters.
+
+    Args:
+        filenames (list): Paths to the input files (GeoJSON files, building load profiles, COP data).
+        parameters (dict): Parameters of the network initialization and dimensioning.
+
+    Returns:
+        str: Hexadecimal hash of the inputs.
+    """
+    hasher = hashlib.sha1()
+    hasher.update(f"{SNAPSHOT_VERSION} {pp.__version__}".encode())
+    for filename in filenames:
+        hasher.update(hash_file(filename).encode())
+    hasher.update(json.dumps(parameters, sort_keys=True, default=lambda value: np.asarray(value).tolist()).encode())
+    return hasher.hexdigest()
+
+def save_net_snapshot(path, key, net, arrays):
+    """Save the initialized network and the related profiles as snapshot.
+
+    Args:
+        path (str): Directory of the snapshot.
+        key (str): Key of the inputs, see hash_initialization_inputs.
+        net (pandapipesNet): The initialized pandapipes network.
+        arrays (dict): Profiles and temperatures of the network initialization.
+    """
+    os.makedirs(path, exist_ok=True)
+    index_filename = os.path.join(path, "index.json")
+
+    # An existing index is removed first, so an interrupted overwrite never pairs the old index with new files
+    if os.path.exists(index_filename):
+        os.remove(index_filename)
+
+    pp.to_pickle(net, os.path.join(path, "net.p"))
+    np.savez(os.path.join(path, "arrays.npz"), **{name: np.asarray(values) for name, values in arrays.items()})
+
+    # The index is written last and moved into place in one step, so an incomplete snapshot is never used
+    with open(index_filename + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"version": SNAPSHOT_VERSION, "key": key, "arrays": list(arrays.keys())}, f, indent=4)
+    os.replace(index_filename + ".tmp", index_filename)
+
+def load_net_snapshot(path, key):
+    """Load the snapshot of the network if it was created from the same inputs.
+
+    Args:
+        path (str): Directory of the snapshot.
+        key (str): Key of the current inputs, see hash_initialization_inputs.
+
+    Returns:
+        tuple: The pandapipes network and the dictionary of profiles, or None if there is no valid snapshot.
+    """
+    index_filename = os.path.join(path, "index.json")
+    if not os.path.exists(index_filename):
+        return None
+
+    with open(index_filename, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if index.get("key") != key:
+        logging.info("Inputs of the network initialization changed, the snapshot is not used")
+        return None
+
+    try:
+        net = pp.from_pickle(os.path.join(path, "net.p"))
+        with np.load(os.path.join(path, "arrays.npz")) as data:
+            arrays = {name: data[name] for name in index["arrays"]}
+    except Exception as e:
+        logging.warning(f"Snapshot of the network could not be loaded: {e}")
+        return None
+
+    return net, arrays
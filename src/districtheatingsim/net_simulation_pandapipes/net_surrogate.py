@@ -0,0 +1,172 @@
+"""
+Filename: net_surrogate.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: Reduced-order surrogate of a dimensioned network, fitted from a few thermohydraulic time steps, for fast scenario screening.
+"""
+
+import time
+import logging
+
+import numpy as np
+
+from net_simulation_pandapipes.pp_net_time_series_simulation import thermohydraulic_time_series_net, select_time_steps
+
+# Predicted values of the main circulation pump (see calculate_results) and of the worst point
+SURROGATE_TARGETS = ("mass_flow", "deltap", "flow_temp", "return_temp", "deltap_worst_point")
+
+def select_training_time_steps(qext_w_profiles, start, end, n_samples=24):
+    """Select time steps at evenly spaced quantiles of the total heat demand, including the minimum and the peak load.
+
+    Args:
+        qext_w_profiles (array): Heat demand profiles of the heat consumers with shape (consumers, time steps).
+        start (int): Start index of the interval.
+        end (int): End index of the interval.
+        n_samples (int, optional): Number of time steps. Defaults to 24.
+
+    Returns:
+        np.ndarray: Sorted indices of the selected time steps relative to start.
+    """
+    total_qext_w = np.sum(np.asarray(qext_w_profiles)[:, start:end], axis=0)
+    order = np.argsort(total_qext_w, kind='stable')
+    positions = np.round(np.linspace(0, len(order) - 1, min(n_samples, len(order)))).astype(int)
+    return np.unique(order[positions])
+
+def extract_surrogate_targets(net, net_results):
+    """Extract the values predicted by the surrogate from the results of a time series simulation.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        net_results (dict): Results of the time series simulation.
+
+    Returns:
+        dict: Arrays per target (see SURROGATE_TARGETS) over the time steps. Temperatures in °C, pressures in bar, mass flows in kg/s.
+    """
+    flow_position, return_position = net.junction.index.get_indexer(net.circ_pump_pressure[["flow_junction", "return_junction"]].values[0])
+    from_positions = net.junction.index.get_indexer(net.heat_consumer["from_junction"].values)
+    to_positions = net.junction.index.get_indexer(net.heat_consumer["to_junction"].values)
+    p_bar = net_results["res_junction.p_bar"]
+
+    return {"mass_flow": net_results["res_circ_pump_pressure.mdot_flow_kg_per_s"][:, 0],
+            "deltap": net_results["res_circ_pump_pressure.deltap_bar"][:, 0],
+            "flow_temp": net_results["res_junction.t_k"][:, flow_position] - 273.15,
+            "return_temp": net_results["res_junction.t_k"][:, return_position] - 273.15,
+            "deltap_worst_point": np.nanmin(p_bar[:, from_positions] - p_bar[:, to_positions], axis=1)}
+
+class NetSurrogate:
+    """Polynomial surrogate of the main circulation pump and the worst point over the heat demand of the heat consumers.
+
+    The model is linear in the heat demand of each heat consumer, plus powers of the total heat demand up to degree,
+    which describe the quadratic pressure losses and the heat losses of the network. It is valid for the supply and return
+    temperatures and the pipe dimensions the training runs were calculated with.
+
+    Args:
+        coefficients (np.ndarray): Coefficients with shape (features, targets).
+        qext_w_scale (np.ndarray): Heat demand per heat consumer used for scaling, e.g. the maximum of the training data.
+        degree (int): Highest power of the total heat demand.
+        targets (tuple): Names of the predicted values.
+        errors (dict, optional): Leave-one-out errors of the fit per target. Defaults to None.
+    """
+    def __init__(self, coefficients, qext_w_scale, degree, targets=SURROGATE_TARGETS, errors=None):
+        self.coefficients = coefficients
+        self.qext_w_scale = qext_w_scale
+        self.degree = degree
+        self.targets = tuple(targets)
+        self.errors = errors or {}
+
+    def create_features(self, qext_w):
+        """Create the feature matrix of the model.
+
+        Args:
+            qext_w (array): Heat demand of the heat consumers in W, shape (consumers,) or (consumers, scenarios).
+
+        Returns:
+            np.ndarray: Features with shape (scenarios, features).
+        """
+        qext_w = np.asarray(qext_w, dtype=float)
+        if qext_w.ndim == 1:
+            qext_w = qext_w[:, np.newaxis]
+        scaled_qext_w = qext_w / self.qext_w_scale[:, np.newaxis]
+        scaled_total = np.sum(qext_w, axis=0) / np.sum(self.qext_w_scale)
+        powers = [scaled_total**power for power in range(2, self.degree + 1)]
+        return np.column_stack([np.ones(qext_w.shape[1]), scaled_qext_w.T] + powers)
+
+    def predict(self, qext_w):
+        """Predict the values of the main circulation pump and the worst point.
+
+        Args:
+            qext_w (array): Heat demand of the heat consumers in W, shape (consumers,) or (consumers, scenarios).
+
+        Returns:
+            dict: Predicted values per target, arrays with one value per scenario.
+        """
+        predictions = self.create_features(qext_w) @ self.coefficients
+        return {target: predictions[:, i] for i, target in enumerate(self.targets)}
+
+    def get_errors(self):
+        """Get the leave-one-out errors of the fit.
+
+        Returns:
+            dict: Maximum absolute error per target.
+        """
+        return self.errors
+
+def fit_net_surrogate(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75,
+                      return_temperature_heat_consumer=60, n_samples=24, degree=2, ridge=1e-6):
+    """Fit a surrogate of the network from a few time steps of the thermohydraulic simulation.
+
+    The time steps are selected over the range of the total heat demand (see select_training_time_steps) and simulated in
+    chronological order with thermohydraulic_time_series_net, so the controllers act as in the full time series.
+    The coefficients are fitted by ridge regression, the errors are estimated by leave-one-out cross validation.
+
+    Args:
+        net (pandapipesNet): The dimensioned pandapipes network.
+        yearly_time_steps (array): Array of yearly time steps.
+        qext_w_profiles (array): Heat demand profiles of the heat consumers with shape (consumers, time steps).
+        start (int): Start index of the interval.
+        end (int): End index of the interval.
+        supply_temperature (float or array, optional): Supply temperature. Defaults to 85.
+        supply_temperature_heat_consumer (float or array, optional): Minimum supply temperature for heat consumers. Defaults to 75.
+        return_temperature_heat_consumer (float or array, optional): Return temperature for heat consumers. Defaults to 60.
+        n_samples (int, optional): Number of simulated time steps. Defaults to 24.
+        degree (int, optional): Highest power of the total heat demand. Defaults to 2.
+        ridge (float, optional): Regularization of the coefficients, needed if there are fewer time steps than heat consumers. Defaults to 1e-6.
+
+    Returns:
+        tuple: The fitted NetSurrogate, the network and the results of the simulated time steps.
+    """
+    start_time = time.time()
+    qext_w_profiles = np.asarray(qext_w_profiles)
+    time_step_indices = start + select_training_time_steps(qext_w_profiles, start, end, n_samples)
+
+    _, net, net_results = thermohydraulic_time_series_net(net, yearly_time_steps[time_step_indices], qext_w_profiles[:, time_step_indices], 0, len(time_step_indices),
+                                                          select_time_steps(supply_temperature, time_step_indices),
+                                                          select_time_steps(supply_temperature_heat_consumer, time_step_indices, min_ndim=2),
+                                                          select_time_steps(return_temperature_heat_consumer, time_step_indices, min_ndim=2))
+    targets = extract_surrogate_targets(net, net_results)
+    values = np.column_stack([targets[target] for target in SURROGATE_TARGETS])
+
+    # The heat demand of the simulated time steps is taken from the logged results, in the same order as the targets
+    qext_w = net_results["heat_consumer.qext_w"].T
+    qext_w_scale = np.max(np.abs(qext_w), axis=1)
+    qext_w_scale[qext_w_scale == 0] = 1
+
+    surrogate = NetSurrogate(None, qext_w_scale, degree)
+    features = surrogate.create_features(qext_w)
+
+    # Ridge regression, the constant is not regularized
+    regularization = ridge * np.eye(features.shape[1])
+    regularization[0, 0] = 0
+    inverse = np.linalg.pinv(features.T @ features + regularization)
+    surrogate.coefficients = inverse @ features.T @ values
+
+    # Leave-one-out residuals from the diagonal of the hat matrix
+    leverage = np.einsum('ij,jk,ik->i', features, inverse, features)
+    residuals = (values - features @ surrogate.coefficients) / np.maximum(1 - leverage, 1e-12)[:, np.newaxis]
+    surrogate.errors = {target: np.max(np.abs(residuals[:, i])) for i, target in enumerate(SURROGATE_TARGETS)}
+
+    logging.info(f"Surrogate fitted from {len(values)} time steps in {time.time() - start_time:.2f} seconds")
+    for target, error in surrogate.errors.items():
+        logging.info(f"Surrogate leave-one-out error {target}: {error:.4f}")
+
+    return surrogate, net, net_results
@@ -11,19 +11,23 @@ import pandapipes as pp
 import json
 import pandas as pd
 
-from net_simulation_pandapipes.utilities import create_controllers, correct_flow_directions, COP_WP, init_diameter_types
+from net_simulation_pandapipes.utilities import create_controllers, correct_flow_directions, COP_WP, presize_diameter_types
+
+# Points of the GeoJSON lines whose coordinates are equal after rounding to this number of decimals are connected by one junction
+COORDINATE_DECIMALS = 6
 
 def initialize_geojson(vorlauf, ruecklauf, hast, erzeugeranlagen, json_path, COP_filename, min_supply_temperature_building, \
                        return_temperature_heat_consumer, supply_temperature_net, flow_pressure_pump, lift_pressure_pump, netconfiguration, pipetype, dT_RL, \
-                       v_max_pipe, material_filter, insulation_filter, v_max_heat_consumer, mass_flow_secondary_producers=0.5):
+                       v_max_pipe, material_filter, insulation_filter, v_max_heat_consumer, mass_flow_secondary_producers=0.5, vectorized_controllers=False, \
+                       track_worst_point=False):
     """Initialize the network using GeoJSON data and various parameters.
 
     Args:
-        vorlauf (str): Path to the GeoJSON file for the forward line.
-        ruecklauf (str): Path to the GeoJSON file for the return line.
-        hast (str): Path to the GeoJSON file for the heat exchangers.
-        erzeugeranlagen (str): Path to the GeoJSON file for the heat producers.
-        json_path (str): Path to the JSON file containing additional network data.
+        vorlauf (str or GeoDataFrame): Path to the GeoJSON file for the forward line or the already loaded GeoDataFrame.
+        ruecklauf (str or GeoDataFrame): Path to the GeoJSON file for the return line or the already loaded GeoDataFrame.
+        hast (str or GeoDataFrame): Path to the GeoJSON file for the heat exchangers or the already loaded GeoDataFrame.
+        erzeugeranlagen (str or GeoDataFrame): Path to the GeoJSON file for the heat producers or the already loaded GeoDataFrame.
+        json_path (str or dict): Path to the JSON file containing additional network data or the already loaded data.
         COP_filename (str): Path to the file with COP data.
         min_supply_temperature_building (float): Minimum supply temperature for buildings.
         return_temperature_heat_consumer (float): Return temperature for heat consumers.
@@ -38,6 +42,8 @@ def initialize_geojson(vorlauf, ruecklauf, hast, erzeugeranlagen, json_path, COP
         insulation_filter (str): Insulation filter for the pipes.
         v_max_heat_consumer (float): Maximum velocity for heat consumers.
         mass_flow_secondary_producers (float, optional): Mass flow for secondary producers. Defaults to 0.5.
+        vectorized_controllers (bool, optional): Use one vectorized return temperature controller for all heat consumers. Defaults to False.
+        track_worst_point (bool, optional): Determine the worst point again in every time step of the time series. Defaults to False.
 
     Returns:
         pandapipesNet: The initialized pandapipes network.
@@ -51,22 +57,25 @@ def initialize_geojson(vorlauf, ruecklauf, hast, erzeugeranlagen, json_path, COP
         np.ndarray: Power consumption of heat exchangers.
         np.ndarray: Maximum electrical power demand of heat exchangers.
     """
-    vorlauf = gpd.read_file(vorlauf, driver='GeoJSON')
-    ruecklauf = gpd.read_file(ruecklauf, driver='GeoJSON')
-    hast = gpd.read_file(hast, driver='GeoJSON')
-    erzeugeranlagen = gpd.read_file(erzeugeranlagen, driver='GeoJSON')
+    vorlauf = load_geojson(vorlauf)
+    ruecklauf = load_geojson(ruecklauf)
+    hast = load_geojson(hast)
+    erzeugeranlagen = load_geojson(erzeugeranlagen)
 
     supply_temperature_net = np.max(supply_temperature_net)
     print(f"Vorlauftemperatur Netz: {supply_temperature_net} °C")
     
-    with open(json_path, 'r', encoding='utf-8') as f:
-        loaded_data = json.load(f)
+    if isinstance(json_path, dict):
+        loaded_data = json_path
+    else:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            loaded_data = json.load(f)
 
-        # Ensure results contain the necessary keys
-        results = {k: v for k, v in loaded_data.items() if isinstance(v, dict) and 'wärme' in v}
+    # Ensure results contain the necessary keys
+    results = {k: v for k, v in loaded_data.items() if isinstance(v, dict) and 'wärme' in v}
 
-        # Process the loaded data to form a DataFrame
-        df = pd.DataFrame.from_dict({k: v for k, v in loaded_data.items() if k.isdigit()}, orient='index')
+    # Process the loaded data to form a DataFrame
+    df = pd.DataFrame.from_dict({k: v for k, v in loaded_data.items() if k.isdigit()}, orient='index')
 
     supply_temperature_buildings = df["VLT_max"].values.astype(float)
     return_temperature_buildings = df["RLT_max"].values.astype(float)
@@ -141,11 +150,25 @@ def initialize_geojson(vorlauf, ruecklauf, hast, erzeugeranlagen, json_path, COP
 
     net = create_network(vorlauf, ruecklauf, hast, erzeugeranlagen, max_waerme_hast_ges_W, min_supply_temperature_building, return_temperature_heat_consumer, \
                             supply_temperature_net, flow_pressure_pump, lift_pressure_pump, pipetype, \
-                            v_max_pipe, material_filter, insulation_filter, v_max_heat_consumer=v_max_heat_consumer, mass_flow_secondary_producers=mass_flow_secondary_producers)
+                            v_max_pipe, material_filter, insulation_filter, v_max_heat_consumer=v_max_heat_consumer, mass_flow_secondary_producers=mass_flow_secondary_producers, 
+                            vectorized_controllers=vectorized_controllers, track_worst_point=track_worst_point)
     
     return net, yearly_time_steps, waerme_hast_ges_W, return_temperature_heat_consumer, supply_temperature_buildings, return_temperature_buildings, \
         supply_temperature_building_curve, return_temperature_building_curve, strombedarf_hast_ges_W, max_el_leistung_hast_ges_W
 
+def load_geojson(data):
+    """Load a GeoJSON file, already loaded data is copied so it can be reused for several networks.
+
+    Args:
+        data (str or GeoDataFrame): Path to the GeoJSON file or the loaded GeoDataFrame.
+
+    Returns:
+        GeoDataFrame: The loaded data.
+    """
+    if isinstance(data, gpd.GeoDataFrame):
+        return data.copy()
+    return gpd.read_file(data, driver='GeoJSON')
+
 def get_line_coords_and_lengths(gdf):
     """Extract line coordinates and lengths from a GeoDataFrame.
 
@@ -155,38 +178,48 @@ def get_line_coords_and_lengths(gdf):
     Returns:
         tuple: Lists of line coordinates and their lengths.
     """
-    all_line_coords, all_line_lengths = [], []
+    is_line = (gdf.geometry.geom_type == 'LineString').values
+    for geom_type in gdf.geometry.geom_type.values[~is_line]:
+        print(f"Geometrie ist kein LineString: {geom_type}")
+
     # Berechnung der Länge jeder Linie
-    gdf['length'] = gdf.geometry.length
-    for index, row in gdf.iterrows():
-        line = row['geometry']
-        
-        if line.geom_type == 'LineString':
-            coords = list(line.coords)
-            length = row['length']
-            all_line_coords.append(coords)
-            all_line_lengths.append(length)
-        else:
-            print(f"Geometrie ist kein LineString: {line.type}")
+    all_line_lengths = gdf.geometry.length.values[is_line].tolist()
+    all_line_coords = [list(line.coords) for line in gdf.geometry.values[is_line]]
 
     return all_line_coords, all_line_lengths
 
-def get_all_point_coords_from_line_cords(all_line_coords):
+def get_coordinate_key(coords, decimals=COORDINATE_DECIMALS):
+    """Get the key of a point for the junction lookup, points with the same rounded coordinates are the same junction.
+
+    Args:
+        coords (tuple): Coordinates of the point.
+        decimals (int, optional): Number of decimals of the rounded coordinates. Defaults to COORDINATE_DECIMALS.
+
+    Returns:
+        tuple: Rounded coordinates.
+    """
+    return tuple(round(value, decimals) for value in coords)
+
+def get_all_point_coords_from_line_cords(all_line_coords, decimals=COORDINATE_DECIMALS):
     """Get all unique point coordinates from line coordinates.
 
     Args:
         all_line_coords (list): List of line coordinates.
+        decimals (int, optional): Number of decimals of the rounded coordinates used to find identical points. Defaults to COORDINATE_DECIMALS.
 
     Returns:
-        list: List of unique point coordinates.
+        list: List of unique point coordinates in the order of their first occurrence.
     """
-    point_coords = [koordinate for paar in all_line_coords for koordinate in paar]
-    unique_point_coords = list(set(point_coords))
-    return unique_point_coords
+    unique_point_coords = {}
+    for line_coords in all_line_coords:
+        for coords in line_coords:
+            unique_point_coords.setdefault(get_coordinate_key(coords, decimals), coords)
+    return list(unique_point_coords.values())
 
 def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_producer, qext_w, supply_temperature_heat_consumer=75, return_temperature_heat_consumer=60, supply_temperature=85,
                    flow_pressure_pump=4, lift_pressure_pump=1.5, pipetype="KMR 100/250-2v", v_max_pipe=1, material_filter="KMR", insulation_filter="2v", 
-                   pipe_creation_mode="type", v_max_heat_consumer=2, main_producer_location_index=0, mass_flow_secondary_producers=0.5):
+                   pipe_creation_mode="type", v_max_heat_consumer=2, main_producer_location_index=0, mass_flow_secondary_producers=0.5, vectorized_controllers=False, 
+                   track_worst_point=False):
     """Create the pandapipes network using the provided data and parameters.
 
     Args:
@@ -208,6 +241,8 @@ def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_
         v_max_heat_consumer (float, optional): Maximum velocity for heat consumers. Defaults to 2.
         main_producer_location_index (int, optional): Index of the main producer location. Defaults to 0.
         mass_flow_secondary_producers (float, optional): Mass flow for secondary producers. Defaults to 0.5.
+        vectorized_controllers (bool, optional): Use one vectorized return temperature controller for all heat consumers. Defaults to False.
+        track_worst_point (bool, optional): Determine the worst point again in every time step of the time series. Defaults to False.
 
     Returns:
         pandapipesNet: The created pandapipes network.
@@ -235,13 +270,26 @@ def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_
             all_coords (list): List of coordinates for the junctions.
 
         Returns:
-            dict: Dictionary mapping coordinates to junction IDs.
+            dict: Dictionary mapping the rounded coordinates to junction IDs.
         """
-        junction_dict = {}
-        for i, coords in enumerate(all_coords, start=0):
-            junction_id = pp.create_junction(net_i, pn_bar=1.05, tfluid_k=293.15, name=f"Junction {i}", geodata=coords) # pn_bar and tfluid_k just for initialization
-            junction_dict[coords] = junction_id
-        return junction_dict
+        if not all_coords:
+            return {}
+        junction_ids = pp.create_junctions(net_i, len(all_coords), pn_bar=1.05, tfluid_k=293.15, name=[f"Junction {i}" for i in range(len(all_coords))], 
+                                           geodata=np.array(all_coords, dtype=float)[:, :2]) # pn_bar and tfluid_k just for initialization
+        return {get_coordinate_key(coords): junction_id for coords, junction_id in zip(all_coords, junction_ids)}
+
+    def get_junctions(junction_dict, all_coords, position):
+        """Get the junctions at a position (0 for the start and 1 for the end) of the lines.
+
+        Args:
+            junction_dict (dict): Dictionary mapping the rounded coordinates to junction IDs.
+            all_coords (list): List of line coordinates.
+            position (int): Position of the point in the line coordinates.
+
+        Returns:
+            np.ndarray: Junction IDs.
+        """
+        return np.array([junction_dict[get_coordinate_key(coords[position])] for coords in all_coords], dtype=np.int64)
 
     def create_pipes(net_i, all_line_coords, all_line_lengths, junction_dict, pipe_mode, pipe_type_or_diameter, line_type):
         """Create pipes in the network from line coordinates and lengths.
@@ -255,20 +303,21 @@ def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_
             pipe_type_or_diameter (str or float): Pipe type or diameter.
             line_type (str): Type of line ("flow line" or "return line").
         """
-        for coords, length_m, i in zip(all_line_coords, all_line_lengths, range(len(all_line_coords))):
-            if pipe_mode == "diameter":
-                diameter_mm = pipe_type_or_diameter
-                pipe_name = line_type
-                pp.create_pipe_from_parameters(net_i, from_junction=junction_dict[coords[0]],
-                                            to_junction=junction_dict[coords[1]], length_km=length_m/1000,
-                                            diameter_m=diameter_mm/1000, k_mm=k, alpha_w_per_m2k=alpha, 
-                                            name=f"{pipe_name} {i}", geodata=coords, sections=5, text_k=283)
-            elif pipe_mode == "type":
-                pipetype = pipe_type_or_diameter
-                pipe_name = line_type
-                pp.create_pipe(net_i, from_junction=junction_dict[coords[0]], to_junction=junction_dict[coords[1]],
-                            std_type=pipetype, length_km=length_m/1000, k_mm=k, alpha_w_per_m2k=alpha,
-                            name=f"{pipe_name} {i}", geodata=coords, sections=5, text_k=283)
+        if not all_line_coords:
+            return
+        from_junctions = get_junctions(junction_dict, all_line_coords, 0)
+        to_junctions = get_junctions(junction_dict, all_line_coords, 1)
+        length_km = np.asarray(all_line_lengths, dtype=float) / 1000
+        names = [f"{line_type} {i}" for i in range(len(all_line_coords))]
+
+        if pipe_mode == "diameter":
+            diameter_mm = pipe_type_or_diameter
+            pp.create_pipes_from_parameters(net_i, from_junctions, to_junctions, length_km=length_km, diameter_m=diameter_mm/1000, k_mm=k, 
+                                            alpha_w_per_m2k=alpha, name=names, geodata=all_line_coords, sections=5, text_k=283)
+        elif pipe_mode == "type":
+            pipetype = pipe_type_or_diameter
+            pp.create_pipes(net_i, from_junctions, to_junctions, std_type=pipetype, length_km=length_km, k_mm=k, alpha_w_per_m2k=alpha,
+                            name=names, geodata=all_line_coords, sections=5, text_k=283)
 
     def create_heat_exchangers(net_i, all_coords, junction_dict, name_prefix):
         """Create heat exchangers in the network.
@@ -279,9 +328,13 @@ def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_
             junction_dict (dict): Dictionary mapping coordinates to junction IDs.
             name_prefix (str): Prefix for naming the heat exchangers.
         """
-        for i, (coords, q, t, m, d) in enumerate(zip(all_coords, qext_w, return_temperature_heat_consumer, initial_mdot_guess_kg_s, initial_dimension_guess_m)):
-            pp.create_heat_consumer(net_i, from_junction=junction_dict[coords[0]], to_junction=junction_dict[coords[1]], controlled_mdot_kg_per_s=m, diameter_m=d, 
-                                    loss_coefficient=0, qext_w=q, name=f"{name_prefix} {i}") # treturn_k=t when implemented in function
+        # treturn_k=return_temperature_heat_consumer when implemented in function
+        n = min(len(all_coords), len(qext_w))
+        if n == 0:
+            return
+        pp.create_heat_consumers(net_i, get_junctions(junction_dict, all_coords[:n], 0), get_junctions(junction_dict, all_coords[:n], 1), 
+                                 diameter_m=np.asarray(initial_dimension_guess_m, dtype=float)[:n], controlled_mdot_kg_per_s=np.asarray(initial_mdot_guess_kg_s, dtype=float)[:n], 
+                                 loss_coefficient=0, qext_w=np.asarray(qext_w, dtype=float)[:n], name=[f"{name_prefix} {i}" for i in range(n)])
 
     def create_circulation_pump_pressure(net_i, all_coords, junction_dict, name_prefix):
         """Create circulation pumps with constant pressure in the network.
@@ -293,7 +346,7 @@ def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_
             name_prefix (str): Prefix for naming the pumps.
         """
         for i, coords in enumerate(all_coords, start=0):
-            pp.create_circ_pump_const_pressure(net_i, junction_dict[coords[1]], junction_dict[coords[0]],
+            pp.create_circ_pump_const_pressure(net_i, junction_dict[get_coordinate_key(coords[1])], junction_dict[get_coordinate_key(coords[0])],
                                                p_flow_bar=flow_pressure_pump, plift_bar=lift_pressure_pump,
                                                t_flow_k=273.15 + supply_temperature, type="auto",
                                                name=f"{name_prefix} {i}")
@@ -311,11 +364,11 @@ def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_
             mid_coord = ((coords[0][0] + coords[1][0]) / 2, (coords[0][1] + coords[1][1]) / 2)
             mid_junction_idx = pp.create_junction(net_i, pn_bar=1.05, tfluid_k=293.15, name=f"Junction {name_prefix}", geodata=mid_coord)
 
-            pp.create_circ_pump_const_mass_flow(net_i, junction_dict[coords[1]], mid_junction_idx,
+            pp.create_circ_pump_const_mass_flow(net_i, junction_dict[get_coordinate_key(coords[1])], mid_junction_idx,
                                                p_flow_bar=flow_pressure_pump, mdot_flow_kg_per_s=mass_flow_secondary_producers,
                                                t_flow_k=273.15 + supply_temperature, type="auto",
                                                name=f"{name_prefix} {i}")
-            pp.create_flow_control(net, mid_junction_idx, junction_dict[coords[0]], controlled_mdot_kg_per_s=mass_flow_secondary_producers, diameter_m=0.1)
+            pp.create_flow_control(net, mid_junction_idx, junction_dict[get_coordinate_key(coords[0])], controlled_mdot_kg_per_s=mass_flow_secondary_producers, diameter_m=0.1)
 
     # Create the junction dictionaries for the forward and return lines
     junction_dict_vl = create_junctions_from_coords(net, get_all_point_coords_from_line_cords(
@@ -342,8 +395,9 @@ def create_network(gdf_flow_line, gdf_return_line, gdf_heat_exchanger, gdf_heat_
             if i != main_producer_location_index:
                 create_circulation_pump_mass_flow(net, [all_heat_producer_coords[i]], {**junction_dict_vl, **junction_dict_rl}, "heat source slave")
 
-    net = create_controllers(net, qext_w, return_temperature_heat_consumer, supply_temperature_heat_consumer)
+    net = create_controllers(net, qext_w, return_temperature_heat_consumer, supply_temperature_heat_consumer, vectorized=vectorized_controllers, 
+                             track_worst_point=track_worst_point)
     net = correct_flow_directions(net)
-    net = init_diameter_types(net, v_max_pipe=v_max_pipe, material_filter=material_filter, insulation_filter=insulation_filter)
+    net = presize_diameter_types(net, v_max_pipe=v_max_pipe, material_filter=material_filter, insulation_filter=insulation_filter)
 
     return net
\ No newline at end of file
@@ -5,6 +5,22 @@ Date: 2024-07-31
 Description: Script with functions for the implemented time series calculation.
 """
 
+import copy
+import os
+import time
+import json
+import struct
+import zipfile
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import pandapipes as pp
+from pandapipes.idx_node import PINIT
+from pandapipes.idx_branch import MDOTINIT
+from pandapipes.pipeflow import hydraulics, heat_transfer
+from pandapipes.pf.pipeflow_setup import get_net_option, init_options, init_all_result_tables, create_lookups, initialize_pit, \
+    identify_active_nodes_branches, reduce_pit, PipeflowNotConverged
+from pandapipes.pf.result_extraction import extract_all_results, extract_results_active_pit
 from pandapipes.timeseries import run_time_series
 from pandapower.control.controller.const_control import ConstControl
 from pandapower.timeseries import OutputWriter
@@ -12,9 +28,15 @@ from pandapower.timeseries import DFData
 
 import pandas as pd
 import numpy as np
+from sklearn.cluster import KMeans
+
+from net_simulation_pandapipes.controllers import ReturnTemperatureController, VectorizedReturnTemperatureController
+from net_simulation_pandapipes.utilities import COP_WP, hash_net_state
 
-from net_simulation_pandapipes.controllers import ReturnTemperatureController
-from net_simulation_pandapipes.utilities import COP_WP
+# Columns which are set by the controllers during the time series or only initialize the pipeflow and do not describe the network
+TIME_SERIES_COLUMNS = {"heat_consumer": ["qext_w", "controlled_mdot_kg_per_s", "treturn_k", "deltat_k"], 
+                       "circ_pump_pressure": ["t_flow_k", "plift_bar", "p_flow_bar"], 
+                       "junction": ["pn_bar", "tfluid_k"]}
 
 def update_const_controls(net, qext_w_profiles, time_steps, start, end):
     """Update constant controls with new data sources for time series simulation.
@@ -57,6 +79,12 @@ def update_return_temperature_controller(net, supply_temperature_heat_consumer,
             ctrl.data_source = data_source_return_temp
             controller_count += 1
 
+        elif isinstance(ctrl, VectorizedReturnTemperatureController):
+            # One column per heat consumer for the return and minimum supply temperatures
+            data = {f'return_temperature_{i}': return_temperature_heat_consumer[i][start:end] for i in range(len(ctrl.heat_consumer_idx))}
+            data.update({f'min_supply_temperature_{i}': supply_temperature_heat_consumer[i][start:end] for i in range(len(ctrl.heat_consumer_idx))})
+            ctrl.data_source = DFData(pd.DataFrame(index=time_steps, data=data))
+
 def update_supply_temperature_controls(net, supply_temperature, time_steps, start, end):
     """Update supply temperature controls with new data sources for time series simulation.
 
@@ -156,15 +184,8 @@ def time_series_preprocessing(supply_temperature, supply_temperature_heat_consum
         COP, _ = COP_WP(supply_temperature_buildings, return_temperature_heat_consumer, COP_file_values)
         print(f"COP dezentrale Wärmepumpen Gebäude: {COP}")
 
-        for waerme_gebaeude, cop in zip(total_heat_W, COP):
-            strom_wp = waerme_gebaeude/cop
-            waerme_hast = waerme_gebaeude - strom_wp
-
-            waerme_hast_ges_W.append(waerme_hast)
-            strom_hast_ges_W.append(strom_wp)
-
-        waerme_hast_ges_W = np.array(waerme_hast_ges_W)
-        strom_hast_ges_W = np.array(strom_hast_ges_W)
+        strom_hast_ges_W = np.asarray(total_heat_W) / COP[:, np.newaxis]
+        waerme_hast_ges_W = total_heat_W - strom_hast_ges_W
     
     if building_temp_checked == True and netconfiguration != "kaltes Netz":
         supply_temperature_heat_consumer = supply_temperature_buildings_curve + dT_RL
@@ -174,23 +195,186 @@ def time_series_preprocessing(supply_temperature, supply_temperature_heat_consum
 
     elif building_temp_checked == True and netconfiguration == "kaltes Netz":
         supply_temperature_heat_consumer = return_temperature_heat_consumer + dT_RL
-        for st, rt, waerme_gebaeude in zip(supply_temperature_buildings_curve, return_temperature_heat_consumer, total_heat_W):
-            cop, _ = COP_WP(st, rt, COP_file_values)
+        # COP of all buildings and time steps in one evaluation, the source temperature is constant per building
+        source_temperature = np.asarray(return_temperature_heat_consumer, dtype=float)
+        if source_temperature.ndim == 1:
+            source_temperature = source_temperature[:, np.newaxis]
+        COP, _ = COP_WP(supply_temperature_buildings_curve, source_temperature, COP_file_values)
 
-            strom_wp = waerme_gebaeude/cop
-            waerme_hast = waerme_gebaeude - strom_wp
-
-            waerme_hast_ges_W.append(waerme_hast)
-            strom_hast_ges_W.append(strom_wp)
-
-        waerme_hast_ges_W = np.array(waerme_hast_ges_W)
-        strom_hast_ges_W = np.array(strom_hast_ges_W)
+        strom_hast_ges_W = np.asarray(total_heat_W) / COP
+        waerme_hast_ges_W = total_heat_W - strom_hast_ges_W
 
         print(f"Rücklauftemperatur HAST: {return_temperature_heat_consumer} °C")
 
     return waerme_hast_ges_W, strom_hast_ges_W, supply_temperature_heat_consumer, return_temperature_heat_consumer 
     
-def thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75, return_temperature_heat_consumer=60):
+class TimeSeriesInterrupted(Exception):
+    """
+    Raised by the progress function of the time series simulation when an interruption was requested.
+
+    Args:
+        completed_steps (int): Number of completed time steps.
+    """
+    def __init__(self, completed_steps):
+        super().__init__(f"Zeitreihenberechnung nach {completed_steps} Zeitschritten abgebrochen.")
+        self.completed_steps = completed_steps
+
+# Branch tables in which the initial mass flow is the controlled mass flow, it is not seeded by the warm start
+CONTROLLED_MDOT_TABLES = ("heat_consumer", "flow_control")
+
+def get_warm_start_solution(net):
+    """Copy the solution of the last converged pipeflow from the internal arrays of pandapipes.
+
+    Args:
+        net (pandapipesNet): The pandapipes network after a converged pipeflow.
+
+    Returns:
+        dict: Node pressures, branch mass flows and the rows of the branches whose mass flow is not controlled.
+    """
+    node_pit, branch_pit = net["_pit"]["node"], net["_pit"]["branch"]
+    free_mdot = np.ones(len(branch_pit), dtype=bool)
+    for table, (f, t) in net["_lookups"]["branch_from_to"].items():
+        if table in CONTROLLED_MDOT_TABLES:
+            free_mdot[f:t] = False
+
+    return {"p_bar": node_pit[:, PINIT].copy(), "mdot_kg_per_s": branch_pit[:, MDOTINIT].copy(), "free_mdot": free_mdot}
+
+def seed_pit(node_pit, branch_pit, solution):
+    """Replace the initial pressures and mass flows of the internal arrays by a previous solution, values which are not finite are not used.
+
+    The temperatures are not seeded. The hydraulic calculation uses the fluid properties at the initial temperatures, seeded
+    temperatures would change the hydraulic results compared to a calculation without warm start.
+
+    Args:
+        node_pit (np.ndarray): Internal node array created by pandapipes.
+        branch_pit (np.ndarray): Internal branch array created by pandapipes.
+        solution (dict): Solution from get_warm_start_solution.
+    """
+    # The solution only fits the arrays of an unchanged network
+    if len(solution["p_bar"]) != len(node_pit) or len(solution["mdot_kg_per_s"]) != len(branch_pit):
+        return
+
+    valid = np.isfinite(solution["p_bar"])
+    node_pit[valid, PINIT] = solution["p_bar"][valid]
+    valid = np.isfinite(solution["mdot_kg_per_s"]) & solution["free_mdot"]
+    branch_pit[valid, MDOTINIT] = solution["mdot_kg_per_s"][valid]
+
+# pandapipes versions whose pipeflow steps are reproduced by seeded_pipeflow, the internal arrays are private to pandapipes
+# and their creation may change with other versions
+WARM_START_PANDAPIPES_VERSIONS = ("0.10.",)
+
+def warm_start_supported():
+    """Check if the installed pandapipes version is supported by seeded_pipeflow.
+
+    Returns:
+        bool: True if the pipeflow steps of the installed pandapipes version are reproduced by seeded_pipeflow.
+    """
+    return pp.__version__.startswith(WARM_START_PANDAPIPES_VERSIONS)
+
+def seeded_pipeflow(net, solution, **kwargs):
+    """Run a pipeflow whose internal arrays are seeded with a previous solution.
+
+    pandapipes creates the internal arrays from the tables of the network in each pipeflow and has no option to initialize
+    the hydraulic calculation from results. The steps of pandapipes.pipeflow are therefore run here for this network only and
+    the internal arrays are seeded between their creation and the hydraulic calculation. The tables of the network and the 
+    pandapipes module are not changed. The steps follow pandapipes 0.10, for other versions and for the calculation mode 
+    "heat" a pipeflow without warm start is run.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        solution (dict): Solution from get_warm_start_solution.
+        **kwargs: Options of the pipeflow.
+    """
+    if not warm_start_supported() or kwargs.get("mode", "hydraulics") == "heat":
+        pp.pipeflow(net, **kwargs)
+        return
+
+    init_options(net, {"net": net, "sol_vec": None, "kwargs": kwargs})
+    net.converged = False
+    init_all_result_tables(net)
+
+    create_lookups(net)
+    node_pit, branch_pit = initialize_pit(net)
+    if len(node_pit) == 0:
+        return
+    seed_pit(node_pit, branch_pit, solution)
+
+    calculation_mode = get_net_option(net, "mode")
+    identify_active_nodes_branches(net, branch_pit, node_pit)
+
+    reduce_pit(net, node_pit, branch_pit, mode="hydraulics")
+    hydraulics(net)
+    if not net.converged:
+        raise PipeflowNotConverged("The hydraulic calculation did not converge to a solution.")
+    extract_results_active_pit(net, mode="hydraulics")
+
+    if calculation_mode == "all":
+        node_pit, branch_pit = net["_pit"]["node"], net["_pit"]["branch"]
+        identify_active_nodes_branches(net, branch_pit, node_pit, False)
+        reduce_pit(net, node_pit, branch_pit, mode="heat_transfer")
+        heat_transfer(net)
+        if not net.converged:
+            raise PipeflowNotConverged("The heat transfer calculation did not converge to a solution.")
+        extract_results_active_pit(net, mode="heat_transfer")
+
+    extract_all_results(net, calculation_mode)
+
+def create_pipeflow_functions(warm_start=False, progress_callback=None, interruption_check=None):
+    """Create the run and progress functions for the time series simulation which record the Newton iterations of every time step.
+
+    With warm_start, every pipeflow is initialized with the node pressures and branch mass flows of the last converged pipeflow 
+    instead of the initial values of the tables. The controlled mass flows of the heat consumers are set by the controllers 
+    and the temperatures are not seeded, so the results are the same as without warm start.
+
+    The progress function is called before every time step. It reports the previous time step to progress_callback and raises 
+    TimeSeriesInterrupted if interruption_check returns True.
+
+    Args:
+        warm_start (bool, optional): Flag to seed each pipeflow from the previous results. Defaults to False.
+        progress_callback (callable, optional): Called with the number of completed time steps, the number of time steps, the 
+            elapsed time in seconds and the hydraulic and thermal iterations of the last time step. Defaults to None.
+        interruption_check (callable, optional): Returns True if the simulation should be aborted. Defaults to None.
+
+    Returns:
+        tuple: Run function, progress function and dictionary with the hydraulic and thermal iterations per time step.
+    """
+    iterations = {"hydraulic": [], "thermal": []}
+    start_time = time.time()
+    previous_solution = {}
+
+    def progress_function(i, time_step, time_steps, **kwargs):
+        # Called by the time series loop before each time step
+        if progress_callback is not None and i > 0:
+            progress_callback(i, len(time_steps), time.time() - start_time, iterations["hydraulic"][-1], iterations["thermal"][-1])
+
+        if i >= len(time_steps):
+            return
+
+        if interruption_check is not None and interruption_check():
+            raise TimeSeriesInterrupted(i)
+
+        iterations["hydraulic"].append(0)
+        iterations["thermal"].append(0)
+
+    def run(net, **kwargs):
+        pipeflow_options = {key: value for key, value in kwargs.items() if key not in ["run", "progress_function"]}
+        if warm_start and previous_solution:
+            seeded_pipeflow(net, previous_solution, **pipeflow_options)
+        else:
+            pp.pipeflow(net, **pipeflow_options)
+
+        if warm_start and net.get("converged", False):
+            previous_solution.update(get_warm_start_solution(net))
+
+        if iterations["hydraulic"]:
+            internal_results = net.get("_internal_results", {})
+            iterations["hydraulic"][-1] += internal_results.get("iterations", 0)
+            iterations["thermal"][-1] += internal_results.get("iterations_T", 0)
+
+    return run, progress_function, iterations
+
+def thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75, return_temperature_heat_consumer=60, 
+                                    warm_start=False, progress_callback=None, interruption_check=None):
     """Run a thermohydraulic time series simulation for the network.
 
     Args:
@@ -202,9 +386,16 @@ def thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, sta
         supply_temperature (float, optional): Supply temperature. Defaults to 85.
         supply_temperature_heat_consumer (float, optional): Minimum supply temperature for heat consumers. Defaults to 75.
         return_temperature_heat_consumer (float, optional): Return temperature for heat consumers. Defaults to 60.
+        warm_start (bool, optional): Seed each pipeflow from the results of the previous one. Defaults to False.
+        progress_callback (callable, optional): Called after every time step with the number of completed time steps, the number 
+            of time steps, the elapsed time in seconds and the hydraulic and thermal iterations of the time step. Defaults to None.
+        interruption_check (callable, optional): Checked before every time step, if it returns True the simulation is aborted and
+            the results of the completed time steps are returned. Defaults to None.
 
     Returns:
-        tuple: Updated yearly time steps, network, and results.
+        tuple: Updated yearly time steps, network, and results. The results contain the Newton iterations of every time step 
+            as "pipeflow.iterations_hydraulic" and "pipeflow.iterations_thermal". After an interruption only the completed time
+            steps are contained.
     """
     # Prepare time series calculation
     yearly_time_steps = yearly_time_steps[start:end]
@@ -225,9 +416,496 @@ def thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, sta
     # Log variables and run time series calculation
     log_variables = create_log_variables(net)
     ow = OutputWriter(net, time_steps, output_path=None, log_variables=log_variables)
-    run_time_series.run_timeseries(net, time_steps, mode="all")
 
-    return yearly_time_steps, net, ow.np_results
+    run, progress_function, iterations = create_pipeflow_functions(warm_start, progress_callback, interruption_check)
+    completed_steps = len(time_steps)
+    try:
+        run_time_series.run_timeseries(net, time_steps, mode="all", run=run, progress_function=progress_function)
+        # The progress of the last time step is reported after the loop
+        progress_function(len(time_steps), None, time_steps)
+    except TimeSeriesInterrupted as e:
+        completed_steps = e.completed_steps
+        logging.warning(str(e))
+
+    yearly_time_steps = yearly_time_steps[:completed_steps]
+    net_results = {key: values[:completed_steps] for key, values in ow.np_results.items()}
+    iterations = {key: values[:completed_steps] for key, values in iterations.items()}
+    net_results["pipeflow.iterations_hydraulic"] = np.array(iterations["hydraulic"])
+    net_results["pipeflow.iterations_thermal"] = np.array(iterations["thermal"])
+    if completed_steps > 0:
+        logging.info(f"Mean Newton iterations per time step: {np.mean(net_results['pipeflow.iterations_hydraulic']):.1f} hydraulic, "
+                     f"{np.mean(net_results['pipeflow.iterations_thermal']):.1f} thermal")
+
+    return yearly_time_steps, net, net_results
+
+def _simulate_time_series_chunk(net, yearly_time_steps, qext_w_profiles, overlap_start, chunk_start, chunk_end, supply_temperature, 
+                                supply_temperature_heat_consumer, return_temperature_heat_consumer, warm_start=False, return_net=False):
+    """Simulate one chunk of the time series in a worker process.
+
+    The chunk is started at overlap_start, the steps between overlap_start and chunk_start are only used to bring the controllers
+    and the network state to the operating point of the chunk and are removed from the results.
+
+    Args:
+        net (pandapipesNet): Copy of the pandapipes network for this chunk.
+        yearly_time_steps (array): Array of yearly time steps.
+        qext_w_profiles (list of arrays): List of external heat profiles.
+        overlap_start (int): Index of the first simulated time step including the overlap.
+        chunk_start (int): Index of the first time step of the chunk.
+        chunk_end (int): Index of the end of the chunk (exclusive).
+        supply_temperature (float or array): Supply temperature.
+        supply_temperature_heat_consumer (float or array): Minimum supply temperature for heat consumers.
+        return_temperature_heat_consumer (float or array): Return temperature for heat consumers.
+        warm_start (bool, optional): Seed each pipeflow from the results of the previous one. Defaults to False.
+        return_net (bool, optional): Whether the simulated network is sent back to the main process. Defaults to False.
+
+    Returns:
+        tuple: Results of the chunk without the overlap steps and the network (or None).
+    """
+    _, net, net_results = thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, overlap_start, chunk_end, supply_temperature, 
+                                                          supply_temperature_heat_consumer, return_temperature_heat_consumer, warm_start)
+    
+    overlap = chunk_start - overlap_start
+    chunk_results = {key: values[overlap:] for key, values in net_results.items()}
+
+    return chunk_results, net if return_net else None
+
+def thermohydraulic_time_series_net_parallel(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75, 
+                                             return_temperature_heat_consumer=60, warm_start=False, n_workers=None, chunk_size=None, overlap=1):
+    """Run the thermohydraulic time series simulation in parallel chunks.
+
+    The interval [start, end) is split into chunks which are simulated in separate processes, each with a deep copy of the network.
+    Every chunk except the first one is warm-started with the preceding overlap steps, so the controllers start from the operating
+    point of the previous hour. The results of the chunks are merged in order and have the same structure as the results of
+    thermohydraulic_time_series_net.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        yearly_time_steps (array): Array of yearly time steps.
+        qext_w_profiles (list of arrays): List of external heat profiles.
+        start (int): Start index for the simulation.
+        end (int): End index for the simulation.
+        supply_temperature (float, optional): Supply temperature. Defaults to 85.
+        supply_temperature_heat_consumer (float, optional): Minimum supply temperature for heat consumers. Defaults to 75.
+        return_temperature_heat_consumer (float, optional): Return temperature for heat consumers. Defaults to 60.
+        warm_start (bool, optional): Seed each pipeflow from the results of the previous one. Defaults to False.
+        n_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Number of time steps per chunk. Defaults to an even split over the workers.
+        overlap (int, optional): Number of time steps used to warm-start each chunk. Defaults to 1.
+
+    Returns:
+        tuple: Updated yearly time steps, network, and merged results.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = int(np.ceil((end - start) / n_workers))
+    chunk_size = max(chunk_size, 1)
+
+    chunk_bounds = [(chunk_start, min(chunk_start + chunk_size, end)) for chunk_start in range(start, end, chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(chunk_bounds))) as executor:
+        futures = []
+        for i, (chunk_start, chunk_end) in enumerate(chunk_bounds):
+            overlap_start = max(start, chunk_start - overlap)
+            futures.append(executor.submit(_simulate_time_series_chunk, copy.deepcopy(net), yearly_time_steps, qext_w_profiles, overlap_start, 
+                                           chunk_start, chunk_end, supply_temperature, supply_temperature_heat_consumer, 
+                                           return_temperature_heat_consumer, warm_start, return_net=(i == len(chunk_bounds) - 1)))
+        
+        chunk_results = [future.result() for future in futures]
+
+    # The state of the network after the last chunk corresponds to the state after a serial run
+    net = chunk_results[-1][1]
+    net_results = {key: np.concatenate([results[key] for results, _ in chunk_results], axis=0) for key in chunk_results[0][0]}
+
+    return yearly_time_steps[start:end], net, net_results
+
+def select_time_steps(profile, time_step_indices, min_ndim=1):
+    """Select time steps from a profile which may also be a constant value.
+
+    Args:
+        profile (float or array): Constant value or profile with the time steps along the last axis.
+        time_step_indices (array): Indices of the time steps to select.
+        min_ndim (int, optional): Minimum number of dimensions for which the profile is time dependent. Defaults to 1.
+
+    Returns:
+        float or array: The selected time steps or the unchanged constant value.
+    """
+    if isinstance(profile, np.ndarray) and profile.ndim >= min_ndim:
+        return profile[..., time_step_indices]
+    return profile
+
+def cluster_typical_days(qext_w_profiles, start, end, n_typical_days=8, supply_temperature=None, return_temperature_heat_consumer=None, include_peak_day=True):
+    """Cluster the days of the simulation interval into typical days with k-means.
+
+    Each day is described by its hourly total heat demand and, if time dependent, the hourly supply temperature and the mean 
+    return temperature of the heat consumers, all normalized to [0, 1]. The real day closest to each cluster center is used as 
+    typical day. The day with the highest hourly heat demand is added as an additional typical day so the peak is kept.
+
+    Args:
+        qext_w_profiles (array): Heat demand profiles of the heat consumers with shape (consumers, time steps).
+        start (int): Start index of the interval.
+        end (int): End index of the interval, only complete days are considered.
+        n_typical_days (int, optional): Number of clusters. Defaults to 8.
+        supply_temperature (float or array, optional): Supply temperature profile of the network. Defaults to None.
+        return_temperature_heat_consumer (float or array, optional): Return temperature profiles of the heat consumers. Defaults to None.
+        include_peak_day (bool, optional): Add the peak day as separate typical day. Defaults to True.
+
+    Returns:
+        dict: "days" (indices of the typical days relative to start), "weights" (number of represented days) and 
+            "day_assignment" (index of the typical day for every day).
+    """
+    n_days = (end - start) // 24
+    if n_days < 1:
+        raise ValueError("Das Berechnungsintervall muss mindestens einen vollständigen Tag umfassen.")
+
+    def normalize(values):
+        value_range = np.max(values) - np.min(values)
+        return (values - np.min(values)) / value_range if value_range > 0 else np.zeros_like(values)
+
+    total_heat = np.sum(np.asarray(qext_w_profiles)[:, start:start + n_days * 24], axis=0).reshape(n_days, 24)
+    features = [normalize(total_heat)]
+    if isinstance(supply_temperature, np.ndarray) and supply_temperature.ndim == 1:
+        features.append(normalize(supply_temperature[start:start + n_days * 24].reshape(n_days, 24)))
+    if isinstance(return_temperature_heat_consumer, np.ndarray) and return_temperature_heat_consumer.ndim == 2:
+        features.append(normalize(np.mean(return_temperature_heat_consumer[:, start:start + n_days * 24], axis=0).reshape(n_days, 24)))
+    features = np.hstack(features)
+
+    n_clusters = min(n_typical_days, n_days)
+    kmeans = KMeans(n_clusters=n_clusters, n_init=10, random_state=0).fit(features)
+
+    # The medoid of each cluster is used as typical day
+    distances = np.linalg.norm(features - kmeans.cluster_centers_[kmeans.labels_], axis=1)
+    typical_days = [np.flatnonzero(kmeans.labels_ == cluster)[np.argmin(distances[kmeans.labels_ == cluster])] for cluster in range(n_clusters)]
+    day_assignment = np.array([typical_days[label] for label in kmeans.labels_])
+
+    peak_day = int(np.argmax(np.max(total_heat, axis=1)))
+    if include_peak_day and peak_day not in typical_days:
+        typical_days.append(peak_day)
+        day_assignment[peak_day] = peak_day
+
+    typical_days = np.sort(np.array(typical_days, dtype=int))
+    weights = np.array([np.sum(day_assignment == day) for day in typical_days])
+
+    return {"days": typical_days, "weights": weights, "day_assignment": day_assignment}
+
+def thermohydraulic_time_series_net_typical_days(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75, 
+                                                 return_temperature_heat_consumer=60, n_typical_days=8, warm_start=False, validate=False):
+    """Run the thermohydraulic time series simulation only for typical days and scale the results back to the whole interval.
+
+    The days between start and end are clustered into typical days (see cluster_typical_days), which are simulated in chronological 
+    order. The results of each typical day are then used for all days it represents, so the returned results have the same structure 
+    and length as the results of thermohydraulic_time_series_net for the complete days of the interval.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        yearly_time_steps (array): Array of yearly time steps.
+        qext_w_profiles (array): Heat demand profiles of the heat consumers.
+        start (int): Start index for the simulation.
+        end (int): End index for the simulation, only complete days are simulated.
+        supply_temperature (float or array, optional): Supply temperature. Defaults to 85.
+        supply_temperature_heat_consumer (float or array, optional): Minimum supply temperature for heat consumers. Defaults to 75.
+        return_temperature_heat_consumer (float or array, optional): Return temperature for heat consumers. Defaults to 60.
+        n_typical_days (int, optional): Number of typical days. Defaults to 8.
+        warm_start (bool, optional): Seed each pipeflow from the results of the previous one. Defaults to False.
+        validate (bool, optional): Additionally run the full time series on a copy of the network and report the errors of the 
+            statistics (see compare_time_series_statistics). Defaults to False.
+
+    Returns:
+        tuple: Yearly time steps of the complete days, network, scaled results and the typical day information. With validate, the
+            typical day information contains the relative errors against the full run as "errors".
+    """
+    qext_w_profiles = np.asarray(qext_w_profiles)
+    typical_days = cluster_typical_days(qext_w_profiles, start, end, n_typical_days, supply_temperature, return_temperature_heat_consumer)
+    n_days = len(typical_days["day_assignment"])
+    end = start + n_days * 24
+
+    if validate:
+        full_net = copy.deepcopy(net)
+
+    # Simulate only the hours of the typical days
+    time_step_indices = (start + typical_days["days"][:, None] * 24 + np.arange(24)).ravel()
+    _, net, typical_day_results = thermohydraulic_time_series_net(net, yearly_time_steps[time_step_indices], qext_w_profiles[:, time_step_indices], 
+                                                                  0, len(time_step_indices), select_time_steps(supply_temperature, time_step_indices), 
+                                                                  select_time_steps(supply_temperature_heat_consumer, time_step_indices, min_ndim=2),
+                                                                  select_time_steps(return_temperature_heat_consumer, time_step_indices, min_ndim=2), warm_start)
+
+    # Map every hour of the interval to the corresponding hour of its typical day
+    typical_day_position = {day: i for i, day in enumerate(typical_days["days"])}
+    result_indices = (np.array([typical_day_position[day] for day in typical_days["day_assignment"]])[:, None] * 24 + np.arange(24)).ravel()
+    net_results = {key: values[result_indices] for key, values in typical_day_results.items()}
+
+    logging.info(f"Simulated {len(typical_days['days'])} typical days for {n_days} days ({len(time_step_indices)} instead of {n_days * 24} time steps)")
+
+    if validate:
+        _, full_net, full_results = thermohydraulic_time_series_net(full_net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature, 
+                                                                    supply_temperature_heat_consumer, return_temperature_heat_consumer, warm_start)
+        typical_days["errors"] = compare_time_series_statistics(calculate_time_series_statistics(full_net, full_results), 
+                                                                calculate_time_series_statistics(net, net_results))
+        for name, error in typical_days["errors"].items():
+            logging.info(f"Typical day error {name}: {error:.2%}")
+
+    return yearly_time_steps[start:end], net, net_results, typical_days
+
+def select_adaptive_time_steps(qext_w_profiles, start, end, supply_temperature=None, supply_temperature_heat_consumer=None, return_temperature_heat_consumer=None, 
+                               demand_threshold=0.05, temperature_threshold=1.0, max_skipped_steps=24):
+    """Select the time steps which have to be solved in the adaptive time series simulation.
+
+    A time step is solved if the heat demand of any heat consumer changed by more than demand_threshold (relative to the maximum 
+    demand of the consumer in the interval) or any time dependent temperature changed by more than temperature_threshold since the 
+    last solved time step. The first and the last time step are always solved.
+
+    Args:
+        qext_w_profiles (array): Heat demand profiles of the heat consumers with shape (consumers, time steps).
+        start (int): Start index of the interval.
+        end (int): End index of the interval.
+        supply_temperature (float or array, optional): Supply temperature profile of the network. Defaults to None.
+        supply_temperature_heat_consumer (float or array, optional): Minimum supply temperature profiles of the heat consumers. Defaults to None.
+        return_temperature_heat_consumer (float or array, optional): Return temperature profiles of the heat consumers. Defaults to None.
+        demand_threshold (float, optional): Relative change of the heat demand. Defaults to 0.05.
+        temperature_threshold (float, optional): Change of the temperatures in K. Defaults to 1.0.
+        max_skipped_steps (int, optional): Maximum number of time steps between two solved time steps. Defaults to 24.
+
+    Returns:
+        np.ndarray: Indices of the solved time steps relative to start.
+    """
+    qext_w = np.asarray(qext_w_profiles)[:, start:end]
+    max_qext_w = np.max(np.abs(qext_w), axis=1)
+    max_qext_w[max_qext_w == 0] = 1
+
+    temperatures = []
+    if isinstance(supply_temperature, np.ndarray) and supply_temperature.ndim == 1:
+        temperatures.append(supply_temperature[start:end][None, :])
+    for temperature in (supply_temperature_heat_consumer, return_temperature_heat_consumer):
+        if isinstance(temperature, np.ndarray) and temperature.ndim == 2:
+            temperatures.append(temperature[:, start:end])
+    temperatures = np.vstack(temperatures) if temperatures else np.zeros((0, end - start))
+
+    solved_steps = [0]
+    for step in range(1, end - start):
+        last = solved_steps[-1]
+        if step - last >= max_skipped_steps or \
+           np.any(np.abs(qext_w[:, step] - qext_w[:, last]) > demand_threshold * max_qext_w) or \
+           np.any(np.abs(temperatures[:, step] - temperatures[:, last]) > temperature_threshold):
+            solved_steps.append(step)
+
+    if solved_steps[-1] != end - start - 1:
+        solved_steps.append(end - start - 1)
+
+    return np.array(solved_steps)
+
+def thermohydraulic_time_series_net_adaptive(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75, 
+                                             return_temperature_heat_consumer=60, demand_threshold=0.05, temperature_threshold=1.0, max_skipped_steps=24, 
+                                             warm_start=False, progress_callback=None, interruption_check=None):
+    """Run the thermohydraulic time series simulation with adaptive time steps.
+
+    Only the time steps selected by select_adaptive_time_steps are solved. The results of the skipped time steps are linearly 
+    interpolated between the neighbouring solved time steps, so the results keep the full resolution and have the same structure 
+    as the results of thermohydraulic_time_series_net. The heat demand of the heat consumers is taken from the profiles. The solved 
+    time steps are marked in "pipeflow.solved", the iterations of skipped time steps are 0.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        yearly_time_steps (array): Array of yearly time steps.
+        qext_w_profiles (array): Heat demand profiles of the heat consumers.
+        start (int): Start index for the simulation.
+        end (int): End index for the simulation.
+        supply_temperature (float or array, optional): Supply temperature. Defaults to 85.
+        supply_temperature_heat_consumer (float or array, optional): Minimum supply temperature for heat consumers. Defaults to 75.
+        return_temperature_heat_consumer (float or array, optional): Return temperature for heat consumers. Defaults to 60.
+        demand_threshold (float, optional): Relative change of the heat demand which requires a new solution. Defaults to 0.05.
+        temperature_threshold (float, optional): Change of the temperatures in K which requires a new solution. Defaults to 1.0.
+        max_skipped_steps (int, optional): Maximum number of time steps between two solved time steps. Defaults to 24.
+        warm_start (bool, optional): Seed each pipeflow from the results of the previous one. Defaults to False.
+        progress_callback (callable, optional): Called after every solved time step, see thermohydraulic_time_series_net. Defaults to None.
+        interruption_check (callable, optional): Checked before every solved time step, see thermohydraulic_time_series_net. Defaults to None.
+
+    Returns:
+        tuple: Updated yearly time steps, network, and results. After an interruption the results end with the last solved time step.
+    """
+    qext_w_profiles = np.asarray(qext_w_profiles)
+    solved_steps = select_adaptive_time_steps(qext_w_profiles, start, end, supply_temperature, supply_temperature_heat_consumer, return_temperature_heat_consumer, 
+                                              demand_threshold, temperature_threshold, max_skipped_steps)
+
+    time_step_indices = start + solved_steps
+    _, net, solved_results = thermohydraulic_time_series_net(net, yearly_time_steps[time_step_indices], qext_w_profiles[:, time_step_indices], 0, len(time_step_indices),
+                                                             select_time_steps(supply_temperature, time_step_indices), 
+                                                             select_time_steps(supply_temperature_heat_consumer, time_step_indices, min_ndim=2), 
+                                                             select_time_steps(return_temperature_heat_consumer, time_step_indices, min_ndim=2), warm_start, 
+                                                             progress_callback, interruption_check)
+
+    # After an interruption the time steps behind the last solved time step can not be interpolated
+    completed_steps = len(solved_results["pipeflow.iterations_hydraulic"])
+    if completed_steps < len(solved_steps):
+        solved_steps = solved_steps[:completed_steps]
+        end = start + (solved_steps[-1] + 1 if completed_steps > 0 else 0)
+
+    # Linear interpolation weights of every time step between the neighbouring solved time steps
+    steps = np.arange(end - start)
+    right = np.minimum(np.searchsorted(solved_steps, steps), len(solved_steps) - 1)
+    left = np.maximum(right - 1, 0)
+    step_width = np.maximum(solved_steps[right] - solved_steps[left], 1)
+    weights = np.clip((steps - solved_steps[left]) / step_width, 0, 1)
+
+    net_results = {}
+    for key, values in solved_results.items():
+        if key.startswith("pipeflow."):
+            net_results[key] = np.zeros(end - start, dtype=values.dtype)
+            net_results[key][solved_steps] = values
+        else:
+            weights_expanded = weights.reshape((-1,) + (1,) * (values.ndim - 1))
+            net_results[key] = values[left] * (1 - weights_expanded) + values[right] * weights_expanded
+
+    if "heat_consumer.qext_w" in net_results:
+        net_results["heat_consumer.qext_w"] = qext_w_profiles[:, start:end].T.astype(float)
+
+    net_results["pipeflow.solved"] = np.zeros(end - start, dtype=bool)
+    net_results["pipeflow.solved"][solved_steps] = True
+    logging.info(f"Adaptive time series: solved {len(solved_steps)} of {end - start} time steps")
+
+    return yearly_time_steps[start:end], net, net_results
+
+def time_series_inputs(qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75, return_temperature_heat_consumer=60):
+    """Collect the input profiles of a time series simulation with the full resolution of the interval.
+
+    Args:
+        qext_w_profiles (array): Heat demand profiles of the heat consumers.
+        start (int): Start index of the interval.
+        end (int): End index of the interval.
+        supply_temperature (float or array, optional): Supply temperature. Defaults to 85.
+        supply_temperature_heat_consumer (float or array, optional): Minimum supply temperature for heat consumers. Defaults to 75.
+        return_temperature_heat_consumer (float or array, optional): Return temperature for heat consumers. Defaults to 60.
+
+    Returns:
+        dict: Input profiles with shape (time steps,) for the supply temperature and (heat consumers, time steps) otherwise.
+    """
+    qext_w_profiles = np.asarray(qext_w_profiles, dtype=float)
+    n_heat_consumers, n_time_steps = qext_w_profiles.shape[0], end - start
+
+    def expand(profile, shape):
+        profile = np.asarray(profile, dtype=float)
+        if profile.ndim == len(shape):
+            return profile[..., start:end]
+        # Constant values for all time steps, per heat consumer or for all heat consumers
+        return np.broadcast_to(profile.reshape(profile.shape + (1,) * (len(shape) - profile.ndim)), shape).copy()
+
+    return {"qext_w": qext_w_profiles[:, start:end],
+            "supply_temperature": expand(supply_temperature, (n_time_steps,)),
+            "supply_temperature_heat_consumer": expand(supply_temperature_heat_consumer, (n_heat_consumers, n_time_steps)),
+            "return_temperature_heat_consumer": expand(return_temperature_heat_consumer, (n_heat_consumers, n_time_steps))}
+
+def hash_net_parameters(net):
+    """Calculate a hash of the network parameters without the values which change during the time series.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+
+    Returns:
+        str: Hexadecimal hash of the network parameters.
+    """
+    return hash_net_state(net, exclude_columns=TIME_SERIES_COLUMNS)
+
+def find_affected_time_steps(net, time_steps, inputs, previous_results):
+    """Find the time steps which have to be simulated again compared to a previous simulation.
+
+    If the network parameters (e.g. pipe types) or the simulated time steps differ from the previous simulation, all time steps are
+    affected, because the hydraulics of the whole network are coupled. Otherwise only the time steps with changed inputs (e.g. the 
+    demand profile of a single heat consumer) are affected.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        time_steps (array): Time steps of the simulation.
+        inputs (dict): Input profiles of the simulation, see time_series_inputs.
+        previous_results (NetResultsStore): Results store of the previous simulation.
+
+    Returns:
+        np.ndarray: Boolean mask of the affected time steps.
+    """
+    affected = np.ones(len(time_steps), dtype=bool)
+
+    if previous_results is None or previous_results.get_net_hash() != hash_net_parameters(net):
+        logging.info("Network parameters changed, all time steps are affected")
+        return affected
+
+    previous_time_steps = previous_results.get_time_steps()
+    if len(previous_time_steps) != len(time_steps) or np.any(previous_time_steps != np.asarray(time_steps).astype('datetime64[s]')):
+        logging.info("Time steps changed, all time steps are affected")
+        return affected
+
+    previous_inputs = previous_results.get_inputs()
+    if set(previous_inputs) != set(inputs) or any(previous_inputs[name].shape != inputs[name].shape for name in inputs):
+        logging.info("Inputs of the previous simulation are missing or incompatible, all time steps are affected")
+        return affected
+
+    affected[:] = False
+    for name, values in inputs.items():
+        changed = values != previous_inputs[name]
+        affected |= changed.reshape(-1, len(time_steps)).any(axis=0)
+
+    return affected
+
+def thermohydraulic_time_series_net_incremental(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature=85, supply_temperature_heat_consumer=75, 
+                                                return_temperature_heat_consumer=60, previous_results=None, warm_start=False, progress_callback=None, 
+                                                interruption_check=None):
+    """Run the thermohydraulic time series simulation again for the time steps affected by changes since a previous simulation.
+
+    The results of the unaffected time steps are copied from the previous simulation. The time steps are quasi-static, so the 
+    results agree with a complete simulation within the convergence tolerance of the controllers. The re-simulated time steps are marked in "pipeflow.solved".
+    After an interruption the results end before the first affected time step which was not calculated again.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        yearly_time_steps (array): Array of yearly time steps.
+        qext_w_profiles (array): Heat demand profiles of the heat consumers.
+        start (int): Start index for the simulation.
+        end (int): End index for the simulation.
+        supply_temperature (float or array, optional): Supply temperature. Defaults to 85.
+        supply_temperature_heat_consumer (float or array, optional): Minimum supply temperature for heat consumers. Defaults to 75.
+        return_temperature_heat_consumer (float or array, optional): Return temperature for heat consumers. Defaults to 60.
+        previous_results (NetResultsStore, optional): Results store of the previous simulation with inputs and network hash. Defaults to None.
+        warm_start (bool, optional): Seed each pipeflow from the results of the previous one. Defaults to False.
+        progress_callback (callable, optional): Called after every re-simulated time step, see thermohydraulic_time_series_net. Defaults to None.
+        interruption_check (callable, optional): Checked before every re-simulated time step, see thermohydraulic_time_series_net. Defaults to None.
+
+    Returns:
+        tuple: Updated yearly time steps, network, and results.
+    """
+    qext_w_profiles = np.asarray(qext_w_profiles)
+    time_steps = yearly_time_steps[start:end]
+    inputs = time_series_inputs(qext_w_profiles, start, end, supply_temperature, supply_temperature_heat_consumer, return_temperature_heat_consumer)
+    affected = find_affected_time_steps(net, time_steps, inputs, previous_results)
+
+    if np.all(affected):
+        time_steps, net, net_results = thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, supply_temperature, 
+                                                                       supply_temperature_heat_consumer, return_temperature_heat_consumer, warm_start, 
+                                                                       progress_callback, interruption_check)
+        net_results["pipeflow.solved"] = np.ones(len(time_steps), dtype=bool)
+        return time_steps, net, net_results
+
+    net_results = {variable: previous_results.load(variable) for variable in previous_results.get_variables()}
+    affected_steps = np.flatnonzero(affected)
+
+    if len(affected_steps) > 0:
+        time_step_indices = start + affected_steps
+        _, net, affected_results = thermohydraulic_time_series_net(net, yearly_time_steps[time_step_indices], qext_w_profiles[:, time_step_indices], 0, len(time_step_indices),
+                                                                   select_time_steps(supply_temperature, time_step_indices), 
+                                                                   select_time_steps(supply_temperature_heat_consumer, time_step_indices, min_ndim=2), 
+                                                                   select_time_steps(return_temperature_heat_consumer, time_step_indices, min_ndim=2), warm_start, 
+                                                                   progress_callback, interruption_check)
+        completed_steps = len(affected_results["pipeflow.iterations_hydraulic"])
+        for variable, values in affected_results.items():
+            if variable in net_results:
+                net_results[variable][affected_steps[:completed_steps]] = values
+
+        # After an interruption the previous results of the remaining affected time steps are outdated
+        if completed_steps < len(affected_steps):
+            time_steps = time_steps[:affected_steps[completed_steps]]
+            net_results = {variable: values[:len(time_steps)] for variable, values in net_results.items()}
+            affected = affected[:len(time_steps)]
+            affected_steps = affected_steps[:completed_steps]
+
+    net_results["pipeflow.solved"] = affected
+    logging.info(f"Incremental time series: solved {len(affected_steps)} of {len(time_steps)} time steps, copied the others from the previous results")
+
+    return time_steps, net, net_results
 
 def calculate_results(net, net_results, cp_kJ_kgK=4.2):
     """Calculate and structure the simulation results.
@@ -274,6 +952,54 @@ def calculate_results(net, net_results, cp_kJ_kgK=4.2):
 
     return pump_results
 
+def calculate_time_series_statistics(net, net_results, cp_kJ_kgK=4.2, time_step_h=1):
+    """Calculate the annual energy, peak load and duration statistics of the pumps from the time series results.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        net_results (dict): Results of the time series simulation.
+        cp_kJ_kgK (float, optional): Specific heat capacity of water in kJ/kg*K. Defaults to 4.2.
+        time_step_h (float, optional): Length of a time step in hours. Defaults to 1.
+
+    Returns:
+        dict: Statistics per pump ("<pump type> <index>") with the heat in MWh, the peak load in kW, the full load hours, the operating 
+            hours, the maximum pressure difference in bar and the sorted duration curve of the heat output in kW.
+    """
+    statistics = {}
+    for pump_type, pumps in calculate_results(net, net_results, cp_kJ_kgK).items():
+        for idx, pump_data in pumps.items():
+            heat_MWh = np.sum(pump_data["qext_kW"]) * time_step_h / 1000
+            peak_kW = np.max(pump_data["qext_kW"])
+            statistics[f"{pump_type} {idx}"] = {
+                "heat_MWh": heat_MWh,
+                "peak_kW": peak_kW,
+                "full_load_hours": heat_MWh * 1000 / peak_kW if peak_kW > 0 else 0,
+                "operating_hours": np.sum(pump_data["mass_flow"] > 0) * time_step_h,
+                "max_deltap_bar": np.max(pump_data["deltap"]),
+                "duration_curve_kW": np.sort(pump_data["qext_kW"])[::-1]
+            }
+    return statistics
+
+def compare_time_series_statistics(reference_statistics, statistics):
+    """Compare the statistics of an approximated time series simulation with the statistics of the full simulation.
+
+    Args:
+        reference_statistics (dict): Statistics of the full simulation from calculate_time_series_statistics.
+        statistics (dict): Statistics of the approximated simulation from calculate_time_series_statistics.
+
+    Returns:
+        dict: Relative errors per pump and statistic. For the duration curve the root mean square error relative to the peak load.
+    """
+    errors = {}
+    for pump, reference in reference_statistics.items():
+        for key, reference_value in reference.items():
+            value = statistics[pump][key]
+            if key == "duration_curve_kW":
+                errors[f"{pump} {key}"] = np.sqrt(np.mean((value - reference_value)**2)) / reference["peak_kW"] if reference["peak_kW"] > 0 else 0
+            else:
+                errors[f"{pump} {key}"] = abs(value - reference_value) / abs(reference_value) if reference_value != 0 else abs(value)
+    return errors
+
 def save_results_csv(time_steps, total_heat_KW, strom_wp_kW, pump_results, filename):
     """Save the simulation results to a CSV file.
 
@@ -359,4 +1085,126 @@ def import_results_csv(filename):
             else:
                 print(f"Warning: Column name '{column}' has an unexpected format and is ignored.")
 
-    return time_steps, total_heat_KW, strom_wp_kW, pump_results
\ No newline at end of file
+    return time_steps, total_heat_KW, strom_wp_kW, pump_results
+
+def save_results_npz(time_steps, total_heat_KW, strom_wp_kW, pump_results, filename, net_results=None):
+    """Save the simulation results as uncompressed NPZ file with a JSON schema.
+
+    Every result is stored as a separate array, the schema describes the assignment of the arrays to the pumps. As the arrays 
+    are stored uncompressed, they can be memory-mapped by import_results_npz.
+
+    Args:
+        time_steps (array): Array of time steps.
+        total_heat_KW (array): Total heat demand in kW.
+        strom_wp_kW (array): Power consumption of heat pumps in kW.
+        pump_results (dict): Structured results for the simulation.
+        filename (str): Path to the output NPZ file.
+        net_results (dict, optional): Raw results of the time series simulation which are stored additionally. Defaults to None.
+
+    Returns:
+        None
+    """
+    arrays = {
+        "time_steps": np.asarray(time_steps).astype('datetime64[s]'),
+        "total_heat_kW": np.asarray(total_heat_KW, dtype='float64'),
+        "strom_wp_kW": np.asarray(strom_wp_kW, dtype='float64')
+    }
+    schema = {"version": 1, "pumps": [], "net_results": []}
+
+    for pump_type, pumps in pump_results.items():
+        for idx, pump_data in pumps.items():
+            pump_number = len(schema["pumps"])
+            schema["pumps"].append({"pump_type": pump_type, "index": int(idx), "values": list(pump_data.keys())})
+            for value, data in pump_data.items():
+                arrays[f"pump_{pump_number}_{value}"] = np.asarray(data, dtype='float64')
+
+    if net_results is not None:
+        for key, data in net_results.items():
+            schema["net_results"].append(key)
+            arrays[f"net_results_{key}"] = np.asarray(data)
+
+    arrays["schema"] = np.array(json.dumps(schema))
+    np.savez(filename, **arrays)
+
+def memmap_npz_array(filename, archive, name):
+    """Memory-map an array of an uncompressed NPZ file.
+
+    Args:
+        filename (str): Path to the NPZ file.
+        archive (ZipFile): The opened NPZ file.
+        name (str): Name of the array.
+
+    Returns:
+        np.memmap or array: The memory-mapped array (copy-on-write), compressed arrays are read completely.
+    """
+    info = archive.getinfo(f"{name}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        with archive.open(info) as f:
+            return np.lib.format.read_array(f)
+
+    with open(filename, 'rb') as f:
+        # The array data starts after the local file header of the zip member and the header of the npy format
+        f.seek(info.header_offset)
+        local_header = f.read(30)
+        name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    if dtype.hasobject:
+        raise ValueError(f"Das Array {name} kann nicht speicherabgebildet werden.")
+    if np.prod(shape) == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode='c', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+def import_results_npz(filename, mmap=True, include_net_results=False):
+    """Import the simulation results from a NPZ file written by save_results_npz.
+
+    Args:
+        filename (str): Path to the input NPZ file.
+        mmap (bool, optional): Memory-map the arrays instead of reading them. Defaults to True.
+        include_net_results (bool, optional): Additionally return the raw results of the time series simulation. Defaults to False.
+
+    Returns:
+        tuple: Imported time steps, total heat demand, power consumption, and pump results (and the raw results with include_net_results).
+    """
+    with zipfile.ZipFile(filename) as archive:
+        def read(name):
+            with archive.open(f"{name}.npy") as f:
+                return np.lib.format.read_array(f)
+
+        load = (lambda name: memmap_npz_array(filename, archive, name)) if mmap else read
+
+        schema = json.loads(str(read("schema")))
+
+        time_steps = load("time_steps")
+        total_heat_KW = load("total_heat_kW")
+        strom_wp_kW = load("strom_wp_kW")
+
+        pump_results = {}
+        for pump_number, pump in enumerate(schema["pumps"]):
+            pump_results.setdefault(pump["pump_type"], {})[pump["index"]] = {value: load(f"pump_{pump_number}_{value}") for value in pump["values"]}
+
+        if include_net_results:
+            net_results = {key: load(f"net_results_{key}") for key in schema["net_results"]}
+            return time_steps, total_heat_KW, strom_wp_kW, pump_results, net_results
+
+    return time_steps, total_heat_KW, strom_wp_kW, pump_results
+
+def import_results(filename):
+    """Import the simulation results, preferring the NPZ file next to the given CSV file if it is up to date.
+
+    Args:
+        filename (str): Path to the CSV or NPZ file.
+
+    Returns:
+        tuple: Imported time steps, total heat demand, power consumption, and pump results.
+    """
+    npz_filename = os.path.splitext(filename)[0] + ".npz"
+    if os.path.exists(npz_filename) and (not os.path.exists(filename) or os.path.getmtime(npz_filename) >= os.path.getmtime(filename)):
+        return import_results_npz(npz_filename)
+    return import_results_csv(filename)
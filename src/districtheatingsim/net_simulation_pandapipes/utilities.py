@@ -9,12 +9,15 @@ import time
 import logging
 import sys
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
 import geopandas as gpd
+import networkx as nx
 from shapely.geometry import LineString
-from scipy.interpolate import RegularGridInterpolator
 
 import pandapipes as pp
 from pandapipes.control.run_control import run_control
@@ -22,11 +25,111 @@ from pandapipes.control.run_control import run_control
 from pandapower.timeseries import DFData
 from pandapower.control.controller.const_control import ConstControl
 
-from net_simulation_pandapipes.controllers import ReturnTemperatureController, WorstPointPressureController
+from utilities.cop_interpolation import get_cop_interpolator
+
+from net_simulation_pandapipes.controllers import ReturnTemperatureController, VectorizedReturnTemperatureController, WorstPointPressureController
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 
+# Pipeflow results of recently calculated network states, see cached_pipeflow. The cache is shared by all networks of the process 
+# and guarded by pipeflow_cache_lock, the number of cached states is set with set_pipeflow_cache_size
+PIPEFLOW_CACHE_SIZE = 32
+pipeflow_cache = OrderedDict()
+pipeflow_cache_lock = threading.Lock()
+
+# Internal arrays of pandapipes which belong to the last calculated state, they are removed when the results of another state are restored
+PIPEFLOW_INTERNAL_DATA = ["_pit", "_active_pit"]
+
+def hash_net_state(net, exclude_columns=None, **kwargs):
+    """Calculate a hash of all element tables of the network which influence the pipeflow results.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        exclude_columns (dict, optional): Columns per table which are not included in the hash, e.g. {"heat_consumer": ["qext_w"]}. Defaults to None.
+        **kwargs: Pipeflow options which are included in the hash.
+
+    Returns:
+        str: Hexadecimal hash of the network state.
+    """
+    hasher = hashlib.sha1()
+    hasher.update(repr(sorted(kwargs.items())).encode())
+    hasher.update(repr(net.fluid).encode())
+
+    for component in net.component_list:
+        table_name = component.table_name()
+        table = net[table_name]
+        hasher.update(table_name.encode())
+        hasher.update(table.index.values.tobytes())
+        for column in table.columns:
+            # Names do not influence the pipeflow
+            if column == "name" or (exclude_columns and column in exclude_columns.get(table_name, ())):
+                continue
+            values = table[column].values
+            hasher.update(column.encode())
+            if values.dtype == object:
+                hasher.update("\0".join(map(str, values)).encode())
+            else:
+                hasher.update(np.ascontiguousarray(values).tobytes())
+
+    return hasher.hexdigest()
+
+def cached_pipeflow(net, **kwargs):
+    """Run a pipeflow calculation or restore the results from the cache if the network state was already calculated.
+
+    The results are cached by a hash of the element tables (pipe parameters, heat consumer demands, pump settings, initial values) 
+    and the pipeflow options. Only converged results are cached. The result tables and the iterations of a restored network are 
+    identical to a new calculation. The internal arrays of pandapipes are not cached, the arrays of the previous state are removed 
+    (see PIPEFLOW_INTERNAL_DATA).
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        **kwargs: Options passed to pp.pipeflow.
+    """
+    key = hash_net_state(net, **kwargs)
+
+    with pipeflow_cache_lock:
+        cached_results = pipeflow_cache.get(key)
+        if cached_results is not None:
+            pipeflow_cache.move_to_end(key)
+
+    if cached_results is not None:
+        for table_name, results in cached_results.items():
+            net[table_name] = results.copy()
+        for name in PIPEFLOW_INTERNAL_DATA:
+            net.pop(name, None)
+        net.converged = True
+        logging.debug("Pipeflow results restored from cache")
+        return
+
+    pp.pipeflow(net, **kwargs)
+
+    if net.converged and PIPEFLOW_CACHE_SIZE > 0:
+        cached_results = {f"res_{component.table_name()}": net[f"res_{component.table_name()}"].copy() for component in net.component_list
+                          if f"res_{component.table_name()}" in net}
+        cached_results["_internal_results"] = net["_internal_results"].copy()
+        with pipeflow_cache_lock:
+            pipeflow_cache[key] = cached_results
+            while len(pipeflow_cache) > PIPEFLOW_CACHE_SIZE:
+                pipeflow_cache.popitem(last=False)
+
+def set_pipeflow_cache_size(size):
+    """Set the number of network states cached by cached_pipeflow, the least recently used states beyond the size are removed.
+
+    Args:
+        size (int): Number of cached states, 0 disables the cache.
+    """
+    global PIPEFLOW_CACHE_SIZE
+    with pipeflow_cache_lock:
+        PIPEFLOW_CACHE_SIZE = size
+        while len(pipeflow_cache) > size:
+            pipeflow_cache.popitem(last=False)
+
+def clear_pipeflow_cache():
+    """Remove all cached pipeflow results."""
+    with pipeflow_cache_lock:
+        pipeflow_cache.clear()
+
 def get_resource_path(relative_path):
     """Get the absolute path to the resource, works for dev and for PyInstaller.
 
@@ -48,6 +151,9 @@ def get_resource_path(relative_path):
 def COP_WP(VLT_L, QT, values=np.genfromtxt(get_resource_path('data/COP/Kennlinien WP.csv'), delimiter=';')):
     """Calculate the Coefficient of Performance (COP) for a heat pump based on supply and source temperatures.
 
+    VLT_L and QT are broadcast against each other, e.g. supply temperatures of shape (buildings, hours) with source
+    temperatures of shape (buildings, 1) are evaluated in one call.
+
     Args:
         VLT_L (array-like): Array of supply temperatures.
         QT (float or array-like): Source temperature or array of source temperatures.
@@ -56,27 +162,21 @@ def COP_WP(VLT_L, QT, values=np.genfromtxt(get_resource_path('data/COP/Kennlinie
     Returns:
         tuple: COP values and possibly adjusted supply temperatures.
     """
-    row_header = values[0, 1:]  # Supply temperatures
-    col_header = values[1:, 0]  # Source temperatures
-    values = values[1:, 1:]
-    f = RegularGridInterpolator((col_header, row_header), values, method='linear')
+    f = get_cop_interpolator(values)
+
+    VLT_L = np.atleast_1d(np.asarray(VLT_L, dtype=float))
+    QT = np.asarray(QT, dtype=float)
+    try:
+        np.broadcast_shapes(VLT_L.shape, QT.shape)
+    except ValueError:
+        raise ValueError("QT must either be a single number or an array with the same length as VLT_L.")
 
     # Technical limit of the heat pump is a temperature range of 75 °C
     VLT_L = np.minimum(VLT_L, 75 + QT)
     VLT_L = np.maximum(VLT_L, 35)
 
-    # Check whether QT is a number or an array
-    if np.isscalar(QT):
-        # If QT is a number, we create an array with that number
-        QT_array = np.full_like(VLT_L, QT)
-    else:
-        # If QT is already an array, we check if it has the same length as VLT_L
-        if len(QT) != len(VLT_L):
-            raise ValueError("QT must either be a single number or an array with the same length as VLT_L.")
-        QT_array = QT
-
     # Calculation of COP_L
-    COP_L = f(np.column_stack((QT_array, VLT_L)))
+    COP_L = f(QT, VLT_L)
 
     return COP_L, VLT_L
 
@@ -95,6 +195,7 @@ def net_optimization(net, v_max_pipe, v_max_heat_exchanger, material_filter, ins
     """
     run_control(net, mode="all")
 
+    net = presize_diameter_types(net, v_max_pipe=v_max_pipe, material_filter=material_filter, insulation_filter=insulation_filter)
     net = optimize_diameter_types(net, v_max=v_max_pipe, material_filter=material_filter, insulation_filter=insulation_filter)
     net = optimize_diameter_parameters(net, element="heat_consumer", v_max=v_max_heat_exchanger)
 
@@ -105,7 +206,7 @@ def net_optimization(net, v_max_pipe, v_max_heat_exchanger, material_filter, ins
 
     return net
 
-def create_controllers(net, qext_w, return_temperature_heat_consumer, supply_temperature_heat_consumer):
+def create_controllers(net, qext_w, return_temperature_heat_consumer, supply_temperature_heat_consumer, vectorized=False, track_worst_point=False):
     """Create controllers for the network to manage heat consumers.
 
     Args:
@@ -113,6 +214,10 @@ def create_controllers(net, qext_w, return_temperature_heat_consumer, supply_tem
         qext_w (array-like): External heat values for heat consumers.
         return_temperature_heat_consumer (array-like): Target return temperatures for heat consumers.
         supply_temperature_heat_consumer (array-like): Minimum supply temperatures for heat consumers.
+        vectorized (bool, optional): Use one VectorizedReturnTemperatureController for all heat consumers instead of one 
+            ReturnTemperatureController per heat consumer. Defaults to False.
+        track_worst_point (bool, optional): Determine the worst point again in every time step of the time series instead of
+            keeping the worst point of the initialization, see WorstPointPressureController. Defaults to False.
 
     Returns:
         pandapipesNet: The pandapipes network with controllers added.
@@ -128,12 +233,18 @@ def create_controllers(net, qext_w, return_temperature_heat_consumer, supply_tem
 
         ConstControl(net, element='heat_consumer', variable='qext_w', element_index=i, data_source=placeholder_data_source, profile_name=f'qext_w_{i}')
         
-        # Adjustment for using return_temperature as an array
-        T_controller = ReturnTemperatureController(net, heat_consumer_idx=i, target_return_temperature=return_temperature_heat_consumer[i], min_supply_temperature=supply_temperature_heat_consumer[i])
+        if not vectorized:
+            # Adjustment for using return_temperature as an array
+            T_controller = ReturnTemperatureController(net, heat_consumer_idx=i, target_return_temperature=return_temperature_heat_consumer[i], min_supply_temperature=supply_temperature_heat_consumer[i])
+            net.controller.loc[len(net.controller)] = [T_controller, True, -1, -1, False, False]
+
+    if vectorized:
+        T_controller = VectorizedReturnTemperatureController(net, heat_consumer_idx=net.heat_consumer.index.values, target_return_temperature=return_temperature_heat_consumer, 
+                                                             min_supply_temperature=supply_temperature_heat_consumer)
         net.controller.loc[len(net.controller)] = [T_controller, True, -1, -1, False, False]
 
-    dp_min, idx_dp_min = calculate_worst_point(net)  # This function must be defined
-    dp_controller = WorstPointPressureController(net, idx_dp_min)  # This class must be defined
+    dp_min, idx_dp_min = calculate_worst_point(net)
+    dp_controller = WorstPointPressureController(net, idx_dp_min, track_worst_point=track_worst_point)
     net.controller.loc[len(net.controller)] = [dp_controller, True, -1, -1, False, False]
 
     return net
@@ -148,7 +259,7 @@ def recalculate_all_mass_flow_limits(net):
         pandapipesNet: The pandapipes network with recalculated mass flow limits.
     """
     for idx, controller in net.controller.iterrows():
-        if isinstance(controller['object'], ReturnTemperatureController):
+        if isinstance(controller['object'], (ReturnTemperatureController, VectorizedReturnTemperatureController)):
             controller['object'].calculate_mass_flow_limits(net)
 
     return net
@@ -163,20 +274,14 @@ def correct_flow_directions(net):
         pandapipesNet: The pandapipes network with corrected flow directions.
     """
     # Initial pipeflow calculation
-    pp.pipeflow(net, mode="all")
-
-    # Check the velocities in each pipe and swap the junctions if necessary
-    for pipe_idx in net.pipe.index:
-        # Check the average velocity in the pipe
-        if net.res_pipe.v_mean_m_per_s[pipe_idx] < 0:
-            # Swap the junctions
-            from_junction = net.pipe.at[pipe_idx, 'from_junction']
-            to_junction = net.pipe.at[pipe_idx, 'to_junction']
-            net.pipe.at[pipe_idx, 'from_junction'] = to_junction
-            net.pipe.at[pipe_idx, 'to_junction'] = from_junction
+    cached_pipeflow(net, mode="all")
+
+    # Swap the junctions of all pipes with a negative average velocity
+    reversed_pipes = net.res_pipe.v_mean_m_per_s.reindex(net.pipe.index).values < 0
+    net.pipe.loc[reversed_pipes, ['from_junction', 'to_junction']] = net.pipe.loc[reversed_pipes, ['to_junction', 'from_junction']].values
 
     # Perform the pipeflow calculation again to obtain updated results
-    pp.pipeflow(net, mode="all")
+    cached_pipeflow(net, mode="all")
 
     return net
 
@@ -193,7 +298,7 @@ def optimize_diameter_parameters(net, element="pipe", v_max=2, dx=0.001):
         pandapipesNet: The optimized pandapipes network.
     """
     v_max /= 1.5
-    pp.pipeflow(net, mode="all")
+    cached_pipeflow(net, mode="all")
     element_df = getattr(net, element)  # Access the element's DataFrame
     res_df = getattr(net, f"res_{element}")  # Access the result DataFrame
             
@@ -213,7 +318,7 @@ def optimize_diameter_parameters(net, element="pipe", v_max=2, dx=0.001):
            # Shrink as long as speed < v_max and check
             elif current_velocity < v_max:
                 element_df.at[idx, 'diameter_m'] -= dx
-                pp.pipeflow(net, mode="all")
+                cached_pipeflow(net, mode="all")
                 element_df = getattr(net, element)  # Access the element's DataFrame
                 res_df = getattr(net, f"res_{element}")  # Access the result DataFrame
                 new_velocity = res_df.v_mean_m_per_s[idx]
@@ -225,7 +330,7 @@ def optimize_diameter_parameters(net, element="pipe", v_max=2, dx=0.001):
                     change_made = True
         
         if change_made:
-            pp.pipeflow(net, mode="all")  # Recalculation only if changes were made
+            cached_pipeflow(net, mode="all")  # Recalculation only if changes were made
             element_df = getattr(net, element)
             res_df = getattr(net, f"res_{element}")
 
@@ -244,7 +349,7 @@ def init_diameter_types(net, v_max_pipe=1.0, material_filter="KMR", insulation_f
         pandapipesNet: The pandapipes network with initialized diameters and types.
     """
     start_time_total = time.time()
-    pp.pipeflow(net, mode="all")
+    cached_pipeflow(net, mode="all")
     logging.info(f"Initial pipeflow calculation took {time.time() - start_time_total:.2f} seconds")
 
     pipe_std_types = pp.std_types.available_std_types(net, "pipe")
@@ -265,11 +370,76 @@ def init_diameter_types(net, v_max_pipe=1.0, material_filter="KMR", insulation_f
         net.pipe.at[pipe_idx, 'k_mm'] = properties['RAU']
         net.pipe.at[pipe_idx, 'alpha_w_per_m2k'] = properties['WDZAHL']
 
-    pp.pipeflow(net, mode="all")
+    cached_pipeflow(net, mode="all")
     logging.info(f"Post-initial diameter adjustment pipeflow calculation took {time.time() - start_time_total:.2f} seconds")
 
     return net
 
+def presize_diameter_types(net, v_max_pipe=1.0, material_filter="KMR", insulation_filter="2v"):
+    """Size the pipes analytically from the design mass flows of the heat consumers.
+
+    The flow and return line are traversed as spanning trees starting at the main pump. The design mass flow of each
+    tree pipe is the sum of the controlled mass flows of all downstream heat consumers, and the smallest standard type
+    meeting v_max_pipe is assigned. Parallel pipes between the same junctions share the design mass flow equally. Pipes closing meshes and feed-ins of secondary producers are not considered, these
+    are corrected by optimize_diameter_types.
+
+    Args:
+        net (pandapipesNet): The pandapipes network.
+        v_max_pipe (float): Maximum allowed velocity in pipes.
+        material_filter (str): Material filter for pipe initialization.
+        insulation_filter (str): Insulation filter for pipe initialization.
+
+    Returns:
+        pandapipesNet: The pandapipes network with presized diameters and types.
+    """
+    start_time_total = time.time()
+
+    pipe_std_types = pp.std_types.available_std_types(net, "pipe")
+    filtered_by_material = pipe_std_types[pipe_std_types['material'] == material_filter]
+    filtered_by_material_and_insulation = filtered_by_material[filtered_by_material['insulation'] == insulation_filter]
+    inner_diameters_m = filtered_by_material_and_insulation['inner_diameter_mm'].values / 1000
+
+    main_pump = net.circ_pump_pressure.iloc[0]
+    density = net.fluid.get_density(main_pump['t_flow_k'])
+    consumer_mass_flows = net.heat_consumer['controlled_mdot_kg_per_s'].values.astype(float)
+
+    # The pipe index is the key of the edges, so parallel pipes between the same junctions are kept as separate edges
+    graph = nx.MultiGraph()
+    graph.add_edges_from((from_junction, to_junction, pipe_idx) for pipe_idx, from_junction, to_junction 
+                         in zip(net.pipe.index, net.pipe.from_junction, net.pipe.to_junction))
+
+    design_mass_flows = pd.Series(np.nan, index=net.pipe.index)
+    for root, consumer_junctions in ((main_pump['flow_junction'], net.heat_consumer['from_junction'].values), 
+                                     (main_pump['return_junction'], net.heat_consumer['to_junction'].values)):
+        if root not in graph:
+            continue
+
+        junction_mass_flows = dict.fromkeys(nx.node_connected_component(graph, root), 0.0)
+        for junction, mass_flow in zip(consumer_junctions, consumer_mass_flows):
+            if junction in junction_mass_flows:
+                junction_mass_flows[junction] += mass_flow
+
+        # Accumulate the mass flows from the leaves to the root, children are visited before their parents in reversed BFS order
+        for parent, child in reversed(list(nx.bfs_edges(graph, root))):
+            junction_mass_flows[parent] += junction_mass_flows[child]
+            parallel_pipes = list(graph[parent][child])
+            design_mass_flows[parallel_pipes] = junction_mass_flows[child] / len(parallel_pipes)
+
+    tree_pipes = design_mass_flows.notna()
+    required_diameters_m = np.sqrt(4 * design_mass_flows[tree_pipes].values / (density * v_max_pipe * np.pi))
+    type_positions = np.minimum(np.searchsorted(inner_diameters_m, required_diameters_m), len(inner_diameters_m) - 1)
+    
+    pipe_indices = net.pipe.index[tree_pipes]
+    net.pipe.loc[pipe_indices, 'std_type'] = filtered_by_material_and_insulation.index.values[type_positions]
+    net.pipe.loc[pipe_indices, 'diameter_m'] = inner_diameters_m[type_positions]
+    net.pipe.loc[pipe_indices, 'k_mm'] = filtered_by_material_and_insulation['RAU'].values[type_positions]
+    net.pipe.loc[pipe_indices, 'alpha_w_per_m2k'] = filtered_by_material_and_insulation['WDZAHL'].values[type_positions]
+
+    cached_pipeflow(net, mode="all")
+    logging.info(f"Presizing of {tree_pipes.sum()} tree pipes ({(~tree_pipes).sum()} pipes not presized) took {time.time() - start_time_total:.2f} seconds")
+
+    return net
+
 def optimize_diameter_types(net, v_max=1.0, material_filter="KMR", insulation_filter="2v"):
     """Optimize the diameters and types of pipes in the network based on the specified velocity and filters.
 
@@ -283,7 +453,7 @@ def optimize_diameter_types(net, v_max=1.0, material_filter="KMR", insulation_fi
         pandapipesNet: The optimized pandapipes network.
     """
     start_time_total = time.time()
-    pp.pipeflow(net, mode="all")
+    cached_pipeflow(net, mode="all")
     logging.info(f"Initial pipeflow calculation took {time.time() - start_time_total:.2f} seconds")
 
     pipe_std_types = pp.std_types.available_std_types(net, "pipe")
@@ -292,19 +462,27 @@ def optimize_diameter_types(net, v_max=1.0, material_filter="KMR", insulation_fi
 
     type_position_dict = {type_name: i for i, type_name in enumerate(filtered_by_material_and_insulation.index)}
 
-    # Initial diameter adjustment
-    for pipe_idx, velocity in enumerate(net.res_pipe.v_mean_m_per_s):
-        current_diameter = net.pipe.at[pipe_idx, 'diameter_m']
-        required_diameter = current_diameter * (velocity / v_max)**0.5
-        # Find the closest available standard type
-        closest_type = min(filtered_by_material_and_insulation.index, key=lambda x: abs(filtered_by_material_and_insulation.loc[x, 'inner_diameter_mm'] / 1000 - required_diameter))
-        net.pipe.std_type.at[pipe_idx] = closest_type
-        properties = filtered_by_material_and_insulation.loc[closest_type]
-        net.pipe.at[pipe_idx, 'diameter_m'] = properties['inner_diameter_mm'] / 1000
-        net.pipe.at[pipe_idx, 'k_mm'] = properties['RAU']
-        net.pipe.at[pipe_idx, 'alpha_w_per_m2k'] = properties['WDZAHL']
-
-    pp.pipeflow(net, mode="all")
+    type_names = filtered_by_material_and_insulation.index.values
+    inner_diameters_m = filtered_by_material_and_insulation['inner_diameter_mm'].values / 1000
+    roughness_mm = filtered_by_material_and_insulation['RAU'].values
+    alpha_w_per_m2k = filtered_by_material_and_insulation['WDZAHL'].values
+
+    def set_type_positions(mask, positions):
+        # Assigns the std_types at the given positions of the filtered type list to all pipes in mask
+        pipe_indices = net.pipe.index[mask]
+        net.pipe.loc[pipe_indices, 'std_type'] = type_names[positions[mask]]
+        net.pipe.loc[pipe_indices, 'diameter_m'] = inner_diameters_m[positions[mask]]
+        net.pipe.loc[pipe_indices, 'k_mm'] = roughness_mm[positions[mask]]
+        net.pipe.loc[pipe_indices, 'alpha_w_per_m2k'] = alpha_w_per_m2k[positions[mask]]
+
+    # Initial diameter adjustment of the pipes exceeding v_max, the closest available standard type is chosen. Pipes within
+    # v_max keep their type, e.g. the type set by presize_diameter_types, and are only downsized in the optimization loop
+    velocities = net.res_pipe.v_mean_m_per_s.values
+    required_diameters_m = net.pipe['diameter_m'].values * (velocities / v_max)**0.5
+    initial_positions = np.argmin(np.abs(inner_diameters_m[np.newaxis, :] - required_diameters_m[:, np.newaxis]), axis=1)
+    set_type_positions(velocities > v_max, initial_positions)
+
+    cached_pipeflow(net, mode="all")
     logging.info(f"Post-initial diameter adjustment pipeflow calculation took {time.time() - start_time_total:.2f} seconds")
 
     # Add a column to track if a pipe is optimized
@@ -312,92 +490,85 @@ def optimize_diameter_types(net, v_max=1.0, material_filter="KMR", insulation_fi
 
     change_made = True
     iteration_count = 0
+    pipeflow_count_total = 0
 
+    # Batched optimization: all eligible pipes are resized at once and only the pipes violating v_max are rolled back,
+    # so every iteration needs at most two pipeflow calculations instead of one per downsized pipe
     while change_made:
         iteration_start_time = time.time()
+        pipeflow_count = 0
+        pipeflow_time = 0.0
         change_made = False
 
-        # Track the number of pipes within and outside the desired velocity range
-        pipes_within_target = 0
-        pipes_outside_target = 0
-
-        for pipe_idx, velocity in enumerate(net.res_pipe.v_mean_m_per_s):
-            if net.pipe.at[pipe_idx, 'optimized'] and velocity <= v_max:
-                pipes_within_target += 1
-                continue
-
-            current_type = net.pipe.std_type.at[pipe_idx]
-            current_type_position = type_position_dict[current_type]
-
-            if velocity > v_max and current_type_position < len(filtered_by_material_and_insulation) - 1:
-                new_type = filtered_by_material_and_insulation.index[current_type_position + 1]
-                net.pipe.std_type.at[pipe_idx] = new_type
-                properties = filtered_by_material_and_insulation.loc[new_type]
-                net.pipe.at[pipe_idx, 'diameter_m'] = properties['inner_diameter_mm'] / 1000
-                net.pipe.at[pipe_idx, 'k_mm'] = properties['RAU']
-                net.pipe.at[pipe_idx, 'alpha_w_per_m2k'] = properties['WDZAHL']
-                change_made = True
-                pipes_outside_target += 1
-
-            elif velocity <= v_max and current_type_position > 0:
-                new_type = filtered_by_material_and_insulation.index[current_type_position - 1]
-                net.pipe.std_type.at[pipe_idx] = new_type
-                properties = filtered_by_material_and_insulation.loc[new_type]
-                net.pipe.at[pipe_idx, 'diameter_m'] = properties['inner_diameter_mm'] / 1000
-                net.pipe.at[pipe_idx, 'k_mm'] = properties['RAU']
-                net.pipe.at[pipe_idx, 'alpha_w_per_m2k'] = properties['WDZAHL']
-
-                pp.pipeflow(net, mode="all")
-                new_velocity = net.res_pipe.v_mean_m_per_s[pipe_idx]
-
-                if new_velocity <= v_max:
-                    change_made = True
-                else:
-                    net.pipe.std_type.at[pipe_idx] = current_type
-                    properties = filtered_by_material_and_insulation.loc[current_type]
-                    net.pipe.at[pipe_idx, 'diameter_m'] = properties['inner_diameter_mm'] / 1000
-                    net.pipe.at[pipe_idx, 'k_mm'] = properties['RAU']
-                    net.pipe.at[pipe_idx, 'alpha_w_per_m2k'] = properties['WDZAHL']
-                    
-                    net.pipe.at[pipe_idx, 'optimized'] = True
-                    pipes_within_target += 1
-            else:
-                net.pipe.at[pipe_idx, 'optimized'] = True
-                pipes_within_target += 1
+        velocities = net.res_pipe.v_mean_m_per_s.values
+        current_positions = net.pipe.std_type.map(type_position_dict).values.astype(int)
+        optimized = net.pipe['optimized'].values.astype(bool)
+
+        # Pipes above v_max are upsized, pipes below v_max which are not yet optimized are tentatively downsized
+        upsize_mask = (velocities > v_max) & (current_positions < len(filtered_by_material_and_insulation) - 1)
+        downsize_mask = ~upsize_mask & ~optimized & (velocities <= v_max) & (current_positions > 0)
+        net.pipe.loc[net.pipe.index[~upsize_mask & ~downsize_mask], 'optimized'] = True
+
+        pipes_outside_target = int(np.sum(upsize_mask))
+        pipes_within_target = len(net.pipe) - pipes_outside_target
+
+        new_positions = current_positions.copy()
+        new_positions[upsize_mask] += 1
+        new_positions[downsize_mask] -= 1
+        set_type_positions(upsize_mask | downsize_mask, new_positions)
+        change_made = bool(np.any(upsize_mask))
+
+        if np.any(downsize_mask):
+            pipeflow_start_time = time.time()
+            cached_pipeflow(net, mode="all")
+            pipeflow_time += time.time() - pipeflow_start_time
+            pipeflow_count += 1
+
+            # Roll back the downsized pipes which now exceed v_max, these are optimized
+            rollback_mask = downsize_mask & (net.res_pipe.v_mean_m_per_s.values > v_max)
+            set_type_positions(rollback_mask, current_positions)
+            net.pipe.loc[net.pipe.index[rollback_mask], 'optimized'] = True
+            change_made = change_made or bool(np.any(downsize_mask & ~rollback_mask))
+            
+            if np.any(rollback_mask) and not change_made:
+                # Restore consistent results for the final network state
+                pipeflow_start_time = time.time()
+                cached_pipeflow(net, mode="all")
+                pipeflow_time += time.time() - pipeflow_start_time
+                pipeflow_count += 1
 
         iteration_count += 1
         if change_made:
-            iteration_pipeflow_start = time.time()
-            pp.pipeflow(net, mode="all")
+            pipeflow_start_time = time.time()
+            cached_pipeflow(net, mode="all")
+            pipeflow_time += time.time() - pipeflow_start_time
+            pipeflow_count += 1
+
+        pipeflow_count_total += pipeflow_count
         
         logging.info(f"Iteration {iteration_count}: {pipes_within_target} pipes within target velocity, {pipes_outside_target} pipes outside target velocity")
-        logging.info(f"Iteration {iteration_count} took {time.time() - iteration_start_time:.2f} seconds")
+        logging.info(f"Iteration {iteration_count} took {time.time() - iteration_start_time:.2f} seconds ({pipeflow_count} pipeflow calculations, {pipeflow_time:.2f} seconds)")
 
-    logging.info(f"Total optimization time: {time.time() - start_time_total:.2f} seconds")
+    logging.info(f"Total optimization time: {time.time() - start_time_total:.2f} seconds ({pipeflow_count_total} pipeflow calculations in the optimization loop)")
     return net
 
-def calculate_worst_point(net):
+def calculate_worst_point(net, run_pipeflow=True):
     """Calculate the worst point in the heating network, defined as the heat exchanger with the lowest pressure difference.
 
     Args:
         net (pandapipesNet): The pandapipes network.
+        run_pipeflow (bool, optional): Run a pipeflow calculation first, otherwise the current results are used. Defaults to True.
 
     Returns:
         tuple: The minimum pressure difference and the index of the worst point.
     """
-    # Initial pipeflow calculation
-    pp.pipeflow(net, mode="all")
-    
-    dp = []
-
-    for idx, p_from, p_to in zip(net.heat_consumer.index, net.res_heat_consumer["p_from_bar"], net.res_heat_consumer["p_to_bar"]):
-        dp_diff = p_from - p_to
-        dp.append((dp_diff, idx))
+    if run_pipeflow:
+        cached_pipeflow(net, mode="all")
 
-    # Find the minimum delta p
-    dp_min, idx_min = min(dp, key=lambda x: x[0])
+    dp = net.res_heat_consumer["p_from_bar"].values - net.res_heat_consumer["p_to_bar"].values
+    position_min = np.nanargmin(dp)
 
-    return dp_min, idx_min
+    return dp[position_min], net.heat_consumer.index[position_min]
 
 def export_net_geojson(net, filename):
     """Export the network data to a GeoJSON file.
@@ -0,0 +1,114 @@
+"""
+Filename: cop_interpolation.py
+Author: Dipl.-Ing. (FH) Jonas Pfeiffer
+Date: 2024-10-17
+Description: Interpolation of COP tables of heat pumps with a registry, so each table is prepared only once.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Interpolators of recently used COP tables, see get_cop_interpolator
+COP_INTERPOLATOR_CACHE_SIZE = 16
+cop_interpolators = OrderedDict()
+
+class COPInterpolator:
+    """Bilinear interpolation of a COP table over source and supply temperature.
+
+    Equivalent to a linear scipy RegularGridInterpolator over (source temperature, supply temperature), but evaluates
+    broadcast arrays in one pass, e.g. supply temperatures of shape (buildings, hours) with source temperatures of shape (buildings, 1).
+
+    Args:
+        values (np.ndarray): COP values loaded from a CSV file, the first row contains the supply temperatures and the first column the source temperatures.
+    """
+    def __init__(self, values):
+        self.supply_temperatures = values[0, 1:]
+        self.source_temperatures = values[1:, 0]
+        self.cop_values = values[1:, 1:]
+
+    @staticmethod
+    def _in_range(grid, x):
+        """Check whether all values are within the table."""
+        return x.size == 0 or (x.min() >= grid[0] and x.max() <= grid[-1])
+
+    @staticmethod
+    def _locate(grid, x):
+        """Find the grid interval and the relative position within the interval, outside of the grid the edge interval is used."""
+        # A COP table has only a few temperatures, counting the passed grid points is faster than a binary search per value
+        i = np.zeros(x.shape, dtype=np.intp)
+        for grid_point in grid[1:-1]:
+            i += x >= grid_point
+        return i, (x - grid[i]) / (grid[i + 1] - grid[i])
+
+    def __call__(self, QT, VLT_L, extrapolate=False):
+        """Interpolate the COP.
+
+        Args:
+            QT (array-like): Source temperatures.
+            VLT_L (array-like): Supply temperatures, broadcastable with QT.
+            extrapolate (bool, optional): Extrapolate linearly outside of the table like RegularGridInterpolator with fill_value=None,
+                otherwise a ValueError is raised. Defaults to False.
+
+        Returns:
+            np.ndarray: COP values in the broadcast shape of QT and VLT_L.
+        """
+        QT = np.asarray(QT, dtype=float)
+        VLT_L = np.asarray(VLT_L, dtype=float)
+        in_range = self._in_range(self.source_temperatures, QT) and self._in_range(self.supply_temperatures, VLT_L)
+        if not in_range and not extrapolate:
+            raise ValueError(f"Temperature is outside of the COP table range (source temperature [{self.source_temperatures[0]}, {self.source_temperatures[-1]}], "
+                             f"supply temperature [{self.supply_temperatures[0]}, {self.supply_temperatures[-1]}]).")
+
+        # Bilinear interpolation per value, if the source temperatures are not shared by many supply temperatures
+        if not in_range or QT.size * len(self.supply_temperatures) > np.broadcast(QT, VLT_L).size:
+            i, t = self._locate(self.source_temperatures, QT)
+            j, u = self._locate(self.supply_temperatures, VLT_L)
+            n_columns = len(self.supply_temperatures)
+            index = i * n_columns + j
+            v = self.cop_values.ravel()
+            cop_low = v.take(index) + u * (v.take(index + 1) - v.take(index))
+            cop_high = v.take(index + n_columns) + u * (v.take(index + n_columns + 1) - v.take(index + n_columns))
+            return np.asarray(cop_low + t * (cop_high - cop_low))
+
+        # Interpolation over the source temperature first, QT usually has far fewer values than VLT_L
+        i, t = self._locate(self.source_temperatures, QT)
+        t = t[..., np.newaxis]
+        cop_rows = ((1 - t) * self.cop_values[i] + t * self.cop_values[i + 1]).reshape(QT.size, -1)
+
+        # The rows are placed one after another on a shifted supply temperature axis, so a single np.interp evaluates
+        # every value within the row of its source temperature
+        offset = self.supply_temperatures[-1] - self.supply_temperatures[0] + 1
+        row_offsets = offset * np.arange(QT.size).reshape(QT.shape)
+        supply_axis = (self.supply_temperatures + row_offsets.reshape(-1, 1)).ravel()
+        return np.asarray(np.interp(VLT_L + row_offsets, supply_axis, cop_rows.ravel()))
+
+def get_cop_interpolator(values):
+    """Get the interpolator of a COP table from the registry, it is created only if the table was not used recently.
+
+    The registry is keyed by the content of the table, so heat pumps and network calculations with the same COP data
+    share one interpolator. The least recently used interpolator is removed when the registry is full.
+
+    Args:
+        values (array-like): COP values loaded from a CSV file.
+
+    Returns:
+        COPInterpolator: Interpolator of the COP over source and supply temperature.
+    """
+    values = np.ascontiguousarray(values, dtype=float)
+    key = (values.shape, hashlib.sha1(values.tobytes()).hexdigest())
+
+    if key in cop_interpolators:
+        cop_interpolators.move_to_end(key)
+        return cop_interpolators[key]
+
+    interpolator = COPInterpolator(values.copy())
+    cop_interpolators[key] = interpolator
+    if len(cop_interpolators) > COP_INTERPOLATOR_CACHE_SIZE:
+        cop_interpolators.popitem(last=False)
+    return interpolator
+
+def clear_cop_interpolators():
+    """Remove all interpolators from the registry."""
+    cop_interpolators.clear()
@@ -8,13 +8,20 @@ Description: Script for testing the heat generator functions.
 
 import sys
 import os
+import time
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'districtheatingsim')))
 
 from src.districtheatingsim.heat_generators import solar_thermal
-from districtheatingsim.heat_generators import heat_generation_mix
+from src.districtheatingsim.heat_generators.solar_radiation import calculate_solar_radiation, clear_solar_radiation_cache
+from src.districtheatingsim.heat_generators import heat_generation_mix
+from src.districtheatingsim.heat_generators.mix_optimization import optimize_mix_global
+from src.districtheatingsim.heat_generators.storage_dispatch import simulate_storage_dispatch
 from src.districtheatingsim.utilities.test_reference_year import import_TRY
+from src.districtheatingsim.utilities.cop_interpolation import get_cop_interpolator
 
 import numpy as np
+from scipy.interpolate import RegularGridInterpolator
 
 import matplotlib.pyplot as plt
 
@@ -248,6 +255,37 @@ def test_solar_thermal():
     WGK = solarThermal.calculate_heat_generation_costs(Wärmemenge, q, r, T, BEW, Stundensatz)
     print(f"Wärmegestehungskosten Solarthermie: {WGK:.2f} €/MWh")
 
+def test_solar_thermal_reference(windows=((0, 8760), (2000, 2500)), seed=42):
+    # Vergleich von Berechnung_STA mit der unveränderten Kopie der bisherigen Schleife
+    from tests.solar_thermal_reference import Berechnung_STA as Berechnung_STA_Referenz
+
+    rng = np.random.default_rng(seed)
+    Last_L = rng.uniform(50, 400, 8760)
+    VLT_L = rng.uniform(70, 90, 8760)
+    RLT_L = VLT_L - rng.uniform(20, 30, 8760)
+
+    TRY = import_TRY(get_resource_path("src/districtheatingsim/data/TRY/TRY_511676144222/TRY2015_511676144222_Jahr.dat"))
+    time_steps = np.arange(np.datetime64('2019-01-01'), np.datetime64('2020-01-01', 'D'), dtype='datetime64[h]')
+    duration = 1
+
+    for Typ in ["Flachkollektor", "Vakuumröhrenkollektor"]:
+        for calc1, calc2 in windows:
+            # Wie in heat_generation_mix werden Lastgang und Zeitschritte auf den Berechnungszeitraum zugeschnitten
+            args = (200, 20, Typ, Last_L[calc1:calc2], VLT_L[calc1:calc2], RLT_L[calc1:calc2], TRY, time_steps[calc1:calc2], calc1, calc2, duration)
+
+            start_time = time.time()
+            reference = Berechnung_STA_Referenz(*args)
+            time_reference = time.time() - start_time
+
+            start_time = time.time()
+            result = solar_thermal.Berechnung_STA(*args)
+            time_result = time.time() - start_time
+
+            print(f"{Typ} {calc1}-{calc2}: Wärmemenge {result[0]:.2f} MWh, Referenz {time_reference:.2f} s, Berechnung_STA {time_result:.2f} s")
+            assert result[0] == reference[0]
+            for values, reference_values in zip(result[1:], reference[1:]):
+                assert np.array_equal(values, reference_values)
+
 def test_waste_heat_pump():
     wasteHeatPump = heat_generation_mix.WasteHeatPump(name="Abwärme", Kühlleistung_Abwärme=50, Temperatur_Abwärme=30, spez_Investitionskosten_Abwärme=500, spezifische_Investitionskosten_WP=1000)
     
@@ -340,6 +378,194 @@ def test_geothermal_heat_pump():
     WGK = geothermalHeatPump.calculate_heat_generation_costs(geothermalHeatPump.max_Wärmeleistung, Wärmemenge, Strombedarf, geothermalHeatPump.spez_Investitionskosten_Erdsonden, Strompreis, q, r, T, BEW, Stundensatz)
     print(f"Wärmegestehungskosten Geothermie: {WGK:.2f} €/MWh")
 
+def test_cop_interpolator():
+    # Laden des COP-Kennfeldes
+    COP_data = np.genfromtxt(get_resource_path("src/districtheatingsim/data/COP/Kennlinien WP.csv"), delimiter=';')
+    f = get_cop_interpolator(COP_data)
+    reference = RegularGridInterpolator((COP_data[1:, 0], COP_data[0, 1:]), COP_data[1:, 1:], method='linear', bounds_error=False, fill_value=None)
+
+    def reference_cop(QT, VLT_L):
+        QT, VLT_L = np.broadcast_arrays(np.asarray(QT, dtype=float), np.asarray(VLT_L, dtype=float))
+        return reference(np.column_stack((QT.ravel(), VLT_L.ravel()))).reshape(QT.shape)
+
+    np.random.seed(42)
+    VLT_L = np.random.uniform(35, 90, 8760)
+    QT_L = np.random.uniform(0, 45, 8760)
+
+    # Innerhalb des Kennfeldes: konstante Quelltemperatur, Quelltemperatur je Zeitschritt und je Gebäude, Gitterpunkte
+    cases = [(10, VLT_L), (QT_L, VLT_L), (np.random.uniform(0, 45, (20, 1)), np.random.uniform(35, 90, (20, 100))),
+             (COP_data[1:, 0].reshape(-1, 1), COP_data[0, 1:])]
+    for QT, VLT in cases:
+        assert np.allclose(f(QT, VLT), reference_cop(QT, VLT), rtol=1e-12, atol=1e-12)
+
+    # Außerhalb des Kennfeldes wird wie in calculate_COP linear extrapoliert: Vorlauftemperaturen unter 35 °C, 
+    # Quelltemperaturen unter 0 °C und über 45 °C sowie die Begrenzung des Temperaturhubs auf 75 K
+    out_of_range_cases = [(10, np.random.uniform(20, 35, 100)), (np.random.uniform(-15, 0, 100), VLT_L[:100]), (np.random.uniform(45, 60, 100), VLT_L[:100]),
+                          (-10, np.minimum(VLT_L, 75 - 10)), (np.random.uniform(-20, 60, (20, 1)), np.random.uniform(20, 100, (20, 100)))]
+    for QT, VLT in out_of_range_cases:
+        assert np.allclose(f(QT, VLT, extrapolate=True), reference_cop(QT, VLT), rtol=1e-12, atol=1e-12)
+        try:
+            f(QT, VLT)
+            assert False, "ValueError was not raised"
+        except ValueError:
+            pass
+
+def simulate_storage_steps(Last_L, Leistung, duration, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an):
+    # Bisheriges Vorgehen von CHP.simulate_storage: Schleife über alle Zeitschritte
+    Wärmeleistung_kW = np.zeros_like(Last_L)
+    Wärmeleistung_Speicher_kW = np.zeros_like(Last_L)
+    speicher_fuellstand = np.zeros_like(Last_L)
+
+    for i in range(len(Last_L)):
+        if an:
+            if speicher_fill >= max_speicher_fill:
+                an = False
+            else:
+                Wärmeleistung_kW[i] = Leistung
+                if Last_L[i] < Leistung:
+                    Wärmeleistung_Speicher_kW[i] = Last_L[i] - Leistung
+                    speicher_fill += (Leistung - Last_L[i]) * duration
+                    speicher_fill = float(min(speicher_fill, speicher_kapazitaet))
+                else:
+                    Wärmeleistung_Speicher_kW[i] = 0
+        else:
+            if speicher_fill <= min_speicher_fill:
+                an = True
+        
+        if not an:
+            Wärmeleistung_kW[i] = 0
+            Wärmeleistung_Speicher_kW[i] = Last_L[i]
+            speicher_fill -= Last_L[i] * duration
+            speicher_fill = float(max(speicher_fill, 0))
+
+        speicher_fuellstand[i] = speicher_fill / speicher_kapazitaet * 100  # %
+
+    return Wärmeleistung_kW, Wärmeleistung_Speicher_kW, speicher_fuellstand, an
+
+def simulate_chp_storage_steps(chp, Last_L, duration):
+    speicher_kapazitaet = chp.Speicher_Volumen_BHKW * 4186 * (chp.T_vorlauf - chp.T_ruecklauf) / 3600  # kWh
+    Wärmeleistung_kW, Wärmeleistung_Speicher_kW, speicher_fuellstand, chp.BHKW_an = \
+        simulate_storage_steps(Last_L, chp.th_Leistung_BHKW, duration, speicher_kapazitaet, chp.initial_fill * speicher_kapazitaet, chp.min_fill * speicher_kapazitaet, 
+                               chp.max_fill * speicher_kapazitaet, chp.BHKW_an)
+    el_Leistung_BHKW_kW = Wärmeleistung_kW / chp.thermischer_Wirkungsgrad * chp.el_Wirkungsgrad
+    return Wärmeleistung_kW, Wärmeleistung_Speicher_kW, el_Leistung_BHKW_kW, speicher_fuellstand
+
+def test_storage_dispatch():
+    # Lastgang und BHKW mit Speicher wie in test_chp, die Ergebnisse entsprechen der Schleife über alle Zeitschritte
+    Last_L = np.random.uniform(50, 400, 8760)
+    duration = 1
+    chp = heat_generation_mix.CHP(name="BHKW", th_Leistung_BHKW=100, speicher_aktiv=True, Speicher_Volumen_BHKW=20)
+
+    chp.BHKW_an = True
+    reference = simulate_chp_storage_steps(chp, Last_L, duration)
+    chp.BHKW_an = True
+    chp.simulate_storage(Last_L, duration)
+
+    assert np.array_equal(chp.Wärmeleistung_kW, reference[0])
+    assert np.array_equal(chp.Wärmeleistung_Speicher_kW, reference[1])
+    assert np.array_equal(chp.el_Leistung_BHKW_kW, reference[2])
+    assert np.array_equal(chp.speicher_fuellstand_BHKW, reference[3])
+
+def test_storage_dispatch_switching_levels(n_steps=200):
+    # Lade- und Entlademengen von 0.1 kWh erreichen die Schaltgrenzen nur bis auf Rundungsfehler, die aufsummierte Vorhersage
+    # weicht dann von der schrittweisen Berechnung ab und die Zeitschritte werden einzeln berechnet
+    storage_dispatch = sys.modules[simulate_storage_dispatch.__module__]
+    simulate_dispatch_steps = storage_dispatch.simulate_dispatch_steps
+    fallback_calls = []
+    def counted_dispatch_steps(*args):
+        fallback_calls.append(args)
+        return simulate_dispatch_steps(*args)
+
+    cases = [(np.full(n_steps, 0.1), 0.2, 1.0, 0.5, 0.2, 0.8),
+             (np.full(n_steps, 0.1), 0.2, 0.3, 0.1, 0.1, 0.3),
+             (np.tile([0.1, 0.3, 0.05], n_steps // 3), 0.25, 1.0, 0.35, 0.15, 0.95)]
+
+    storage_dispatch.simulate_dispatch_steps = counted_dispatch_steps
+    try:
+        for Last_L, Leistung, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill in cases:
+            for an in [True, False]:
+                results = simulate_storage_dispatch(Last_L, Leistung, 1, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an)
+                reference = simulate_storage_steps(Last_L, Leistung, 1, speicher_kapazitaet, speicher_fill, min_speicher_fill, max_speicher_fill, an)
+                for result, reference_result in zip(results, reference):
+                    assert np.array_equal(result, reference_result)
+    finally:
+        storage_dispatch.simulate_dispatch_steps = simulate_dispatch_steps
+
+    print(f"Schrittweise Berechnung in {len(fallback_calls)} von {2 * len(cases)} Fällen")
+    assert len(fallback_calls) > 0
+
+def benchmark_storage_dispatch(n_calls=20):
+    # Laufzeitvergleich mit der Schleife über alle Zeitschritte, wird nicht als Test ausgeführt
+    Last_L = np.random.uniform(50, 400, 8760)
+    duration = 1
+    chp = heat_generation_mix.CHP(name="BHKW", th_Leistung_BHKW=100, speicher_aktiv=True, Speicher_Volumen_BHKW=20)
+
+    start_time = time.time()
+    for _ in range(n_calls):
+        chp.BHKW_an = True
+        simulate_chp_storage_steps(chp, Last_L, duration)
+    time_reference = time.time() - start_time
+
+    start_time = time.time()
+    for _ in range(n_calls):
+        chp.BHKW_an = True
+        chp.simulate_storage(Last_L, duration)
+    time_dispatch = time.time() - start_time
+
+    print(f"{n_calls} Speichersimulationen: Schleife {time_reference:.2f} s, Speicherkern {time_dispatch:.2f} s, Faktor {time_reference / time_dispatch:.1f}")
+
+def test_solar_radiation_cache(n_calls=20):
+    # Strahlung auf die Kollektorebene, bei gleichen Eingaben aus dem Cache
+    TRY = import_TRY(get_resource_path("src/districtheatingsim/data/TRY/TRY_511676144222/TRY2015_511676144222_Jahr.dat"))
+    time_steps = np.arange(np.datetime64('2019-01-01'), np.datetime64('2020-01-01', 'D'), dtype='datetime64[h]')
+    Tag_des_Jahres_L = (time_steps.astype('datetime64[D]') - time_steps.astype('datetime64[Y]').astype('datetime64[D]')).astype(np.int64) + 1
+    IAM_W = {0: 1, 10: 1.02, 20: 1.03, 30: 1.03, 40: 1.03, 50: 0.96, 60: 1.07, 70: 1.19, 80: 0.595, 90: 0.0}
+    IAM_N = {0: 1, 10: 1, 20: 0.99, 30: 0.96, 40: 0.93, 50: 0.9, 60: 0.87, 70: 0.86, 80: 0.43, 90: 0.0}
+    args = (TRY[3], TRY[2], Tag_des_Jahres_L, time_steps, -14.4222, -15, 51.1676, 0.2, 0, 36, IAM_W, IAM_N)
+
+    clear_solar_radiation_cache()
+    start_time = time.time()
+    results = calculate_solar_radiation(*args)
+    time_first = time.time() - start_time
+
+    start_time = time.time()
+    for _ in range(n_calls):
+        cached_results = calculate_solar_radiation(*args)
+    time_cached = (time.time() - start_time) / n_calls
+
+    print(f"Strahlungsberechnung: erster Aufruf {time_first * 1000:.2f} ms, aus dem Cache {time_cached * 1000:.2f} ms")
+    assert all(cached is result for cached, result in zip(cached_results, results))
+    assert calculate_solar_radiation(*args[:-4], 10, 36, IAM_W, IAM_N)[0] is not results[0]
+
+def test_optimize_mix_global(optimizer="slsqp", n_workers=None, **options):
+    # Optimierung mit austauschbarem Optimierer, die Berechnungen erfolgen parallel
+    solarThermal = heat_generation_mix.SolarThermal(name="Solarthermie", bruttofläche_STA=200, vs=20, Typ="Vakuumröhrenkollektor", kosten_speicher_spez=800, kosten_vrk_spez=500)
+    gCHP = heat_generation_mix.CHP(name="BHKW", th_Leistung_BHKW=50, spez_Investitionskosten_GBHKW=1500)
+    bBoiler = heat_generation_mix.BiomassBoiler(name="Biomassekessel", P_BMK=150, Größe_Holzlager=20, spez_Investitionskosten=200, spez_Investitionskosten_Holzlager=400)
+    gBoiler = heat_generation_mix.GasBoiler(name="Gaskessel", spez_Investitionskosten=30)
+    tech_order = [solarThermal, gCHP, bBoiler, gBoiler]
+
+    Last_L = np.random.randint(50, 400, 8760).astype("float")
+    time_steps = np.arange(np.datetime64('2019-01-01'), np.datetime64('2020-01-01', 'D'), dtype='datetime64[h]')
+    initial_data = time_steps, Last_L, np.full(8760, 80), np.full(8760, 55)
+    TRY = import_TRY(get_resource_path("src/districtheatingsim/data/TRY/TRY_511676144222/TRY2015_511676144222_Jahr.dat"))
+    weights = {"WGK_Gesamt": 1.0, "specific_emissions_Gesamt": 0.0, "primärenergiefaktor_Gesamt": 0.0}
+
+    tech_order, optimization_log = optimize_mix_global(tech_order, initial_data, 0, 8760, TRY, None, 70, 150, 60, "Nein", kapitalzins=5, preissteigerungsrate=3,
+                                                       betrachtungszeitraum=20, stundensatz=45, weights=weights, optimizer=optimizer, n_workers=n_workers, seed=0, **options)
+
+    for run in optimization_log["runs"]:
+        print(f"Start {run['start']}: {run['message']}, gewichtete Summe {run['objective']:.2f} nach {run['iterations']} Iterationen")
+    print(f"Beste gewichtete Summe: {optimization_log['objective']:.2f}, Ausgangswert: {optimization_log['initial_objective']:.2f}, "
+          f"{optimization_log['evaluations']} Berechnungen in {optimization_log['time_s']:.1f} s")
+    # Every vector is simulated exactly once across all processes of the pool
+    evaluations_per_process = optimization_log["evaluations_per_process"]
+    print(f"Berechnungen je Prozess: {evaluations_per_process}")
+    assert sum(evaluations_per_process.values()) == optimization_log["evaluations"]
+    assert len(evaluations_per_process) <= (n_workers or os.cpu_count() or 1)
+    if optimization_log["success"]:
+        assert optimization_log["objective"] <= optimization_log["initial_objective"]
+
 def test_berechnung_erzeugermix(optimize=False, plot=True):
     solarThermal = heat_generation_mix.SolarThermal(name="Solarthermie", bruttofläche_STA=200, vs=20, Typ="Vakuumröhrenkollektor", kosten_speicher_spez=800, kosten_vrk_spez=500)
     bBoiler = heat_generation_mix.BiomassBoiler(name="Biomassekessel", P_BMK=150, Größe_Holzlager=20, spez_Investitionskosten=200, spez_Investitionskosten_Holzlager=400)
@@ -439,13 +665,23 @@ def plotPieChart(figure, Anteile, labels):
     ax.legend(loc='lower left')
     ax.axis("equal")  # Stellt sicher, dass der Pie-Chart kreisförmig bleibt
 
-#test_annuität()
-#test_biomass_boiler()
-#test_gas_boiler()
-test_chp()
-#test_solar_thermal()
-#test_waste_heat_pump()
-#test_river_heat_pump()
-#test_geothermal_heat_pump()
-#test_berechnung_erzeugermix(optimize=False, plot=True)
-#test_berechnung_erzeugermix(optimize=True, plot=True)
\ No newline at end of file
+if __name__ == "__main__":
+    #test_annuität()
+    #test_biomass_boiler()
+    #test_gas_boiler()
+    test_chp()
+    #test_solar_thermal()
+    #test_solar_thermal_reference()
+    #test_waste_heat_pump()
+    #test_river_heat_pump()
+    #test_geothermal_heat_pump()
+    #test_cop_interpolator()
+    #test_storage_dispatch()
+    #test_storage_dispatch_switching_levels()
+    #benchmark_storage_dispatch()
+    #test_solar_radiation_cache()
+    #test_optimize_mix_global(optimizer="slsqp", n_starts=4)
+    #test_optimize_mix_global(optimizer="differential_evolution", maxiter=30)
+    #test_optimize_mix_global(optimizer="bayesian", maxiter=20)
+    #test_berechnung_erzeugermix(optimize=False, plot=True)
+    #test_berechnung_erzeugermix(optimize=True, plot=True)
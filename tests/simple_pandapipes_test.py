@@ -8,12 +8,20 @@ Description: Script for testing the pandapipes net simulation functions.
 
 import time
 import logging
+import copy
 import sys
 import os
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'districtheatingsim')))
 
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import LineString
 import pandapipes as pp
 from pandapipes.control.run_control import run_control
 
@@ -21,6 +29,15 @@ from src.districtheatingsim.net_simulation_pandapipes.config_plot import config_
 
 from src.districtheatingsim.net_simulation_pandapipes.pp_net_initialisation_geojson import *
 from src.districtheatingsim.net_simulation_pandapipes.utilities import *
+from src.districtheatingsim.net_simulation_pandapipes.net_results_store import save_net_results_store, NetResultsStore
+from src.districtheatingsim.net_simulation_pandapipes.net_snapshot_cache import hash_initialization_inputs, save_net_snapshot, load_net_snapshot
+from src.districtheatingsim.net_simulation_pandapipes.net_matrix_export import export_net_matrices, import_net_matrices, create_net_from_matrices, calculate_branch_mass_flows
+from src.districtheatingsim.net_simulation_pandapipes.batch_simulation import create_scenario_grid, load_batch_data, load_batch_results, run_batch_simulation, get_scenario_id
+from src.districtheatingsim.net_simulation_pandapipes.net_surrogate import fit_net_surrogate, extract_surrogate_targets, SURROGATE_TARGETS
+from src.districtheatingsim.net_simulation_pandapipes.pp_net_time_series_simulation import thermohydraulic_time_series_net, thermohydraulic_time_series_net_parallel, \
+    thermohydraulic_time_series_net_typical_days, thermohydraulic_time_series_net_adaptive, \
+    thermohydraulic_time_series_net_incremental, time_series_inputs, hash_net_parameters, save_results_csv, save_results_npz, import_results_csv, import_results_npz, \
+    create_pipeflow_functions, TimeSeriesInterrupted
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
@@ -360,7 +377,777 @@ def initialize_net_geojson2():
 
     return net
 
-#get_test_net()
-#get_test_net_2()
-#initialize_net_geojson()
-initialize_net_geojson2()
\ No newline at end of file
+### Tests for the time series simulation ###
+def initialize_test_net_heat_consumer(qext_w=np.array([50000, 100000]), return_temperature=np.array([55, 45]), min_supply_temperature=np.array([65, 65]), 
+                                      supply_temperature=85, flow_pressure_pump=4, lift_pressure_pump=1.5, pipetype="KMR 100/250-2v", v_max_pipe=1, v_max_heat_consumer=1.5, 
+                                      vectorized_controllers=False, track_worst_point=False):
+    net = pp.create_empty_network(fluid="water")
+
+    # List and filter standard types for pipes
+    pipe_std_types = pp.std_types.available_std_types(net, "pipe")
+
+    ### get pipe properties
+    properties = pipe_std_types.loc[pipetype]
+    k = properties['RAU']
+    alpha = properties['WDZAHL']
+
+    initial_mdot_guess_kg_s = qext_w / (4170*(supply_temperature-return_temperature))
+    initial_Vdot_guess_m3_s = initial_mdot_guess_kg_s/1000
+    area_m2 = initial_Vdot_guess_m3_s/v_max_heat_consumer
+    initial_dimension_guess_m = np.round(np.sqrt(area_m2 *(4/np.pi)), 3)
+
+    # Junctions for pump
+    j1 = pp.create_junction(net, pn_bar=1.05, tfluid_k=293.15, name="Junction 1", geodata=(0, 10))
+    j2 = pp.create_junction(net, pn_bar=1.05, tfluid_k=293.15, name="Junction 2", geodata=(0, 0))
+
+    # Junctions for connection pipes forward line
+    j3 = pp.create_junction(net, pn_bar=1.05, tfluid_k=293.15, name="Junction 3", geodata=(60, 0))
+    j4 = pp.create_junction(net, pn_bar=1.05, tfluid_k=293.15, name="Junction 4", geodata=(85, 0))
+
+    # Junctions for connection pipes return line
+    j5 = pp.create_junction(net, pn_bar=1.05, tfluid_k=293.15, name="Junction 5", geodata=(85, 10))
+    j6 = pp.create_junction(net, pn_bar=1.05, tfluid_k=293.15, name="Junction 6", geodata=(60, 10))
+
+    pp.create_circ_pump_const_pressure(net, j1, j2, p_flow_bar=flow_pressure_pump, plift_bar=lift_pressure_pump, 
+                                       t_flow_k=273.15+supply_temperature, type="auto", name="pump1")
+
+    pp.create_pipe(net, j2, j3, std_type=pipetype, length_km=0.06, k_mm=k, alpha_w_per_m2k=alpha, name="pipe1", sections=5, text_k=283)
+    pp.create_pipe(net, j3, j4, std_type=pipetype, length_km=0.025, k_mm=k, alpha_w_per_m2k=alpha, name="pipe2", sections=5, text_k=283)
+    pp.create_pipe(net, j5, j6, std_type=pipetype, length_km=0.025, k_mm=k, alpha_w_per_m2k=alpha, name="pipe3", sections=5, text_k=283)
+    pp.create_pipe(net, j6, j1, std_type=pipetype, length_km=0.06, k_mm=k, alpha_w_per_m2k=alpha, name="pipe4", sections=5, text_k=283)
+
+    pp.create_heat_consumer(net, j3, j6, controlled_mdot_kg_per_s=initial_mdot_guess_kg_s[0], diameter_m=initial_dimension_guess_m[0], 
+                            loss_coefficient=0, qext_w=qext_w[0], name="heat consumer 1")
+    pp.create_heat_consumer(net, j4, j5, controlled_mdot_kg_per_s=initial_mdot_guess_kg_s[1], diameter_m=initial_dimension_guess_m[1], 
+                            loss_coefficient=0, qext_w=qext_w[1], name="heat consumer 2")
+
+    net = create_controllers(net, qext_w, return_temperature, min_supply_temperature, vectorized=vectorized_controllers, track_worst_point=track_worst_point)
+    net = correct_flow_directions(net)
+    net = net_optimization(net, v_max_pipe, v_max_heat_consumer, "KMR", "2v")
+
+    return net
+
+def get_test_profiles(qext_w=np.array([50000, 100000]), hours=8760):
+    # Set a fixed random seed for reproducibility
+    np.random.seed(42)
+
+    yearly_time_steps = np.arange(np.datetime64('2021-01-01T00'), np.datetime64('2021-01-01T00') + np.timedelta64(hours, 'h'), np.timedelta64(1, 'h'))
+    seasonal_factor = 0.55 + 0.45 * np.cos(2 * np.pi * np.arange(hours) / 8760)
+    qext_w_profiles = np.array([q * seasonal_factor * np.random.uniform(0.8, 1.0, hours) for q in qext_w])
+
+    return yearly_time_steps, qext_w_profiles
+
+def test_warm_start_time_series(start=0, end=48):
+    qext_w = np.array([50000, 100000])
+    return_temperature = np.array([55, 45])
+    min_supply_temperature = np.array([65, 65])
+
+    net = initialize_test_net_heat_consumer(qext_w=qext_w, return_temperature=return_temperature, min_supply_temperature=min_supply_temperature)
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    _, _, cold_results = thermohydraulic_time_series_net(copy.deepcopy(net), yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, return_temperature)
+    _, warm_net, warm_results = thermohydraulic_time_series_net(copy.deepcopy(net), yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, 
+                                                                return_temperature, warm_start=True)
+
+    for key, values in cold_results.items():
+        if key.startswith("res_"):
+            np.testing.assert_allclose(warm_results[key], values, rtol=1e-6, atol=1e-8, err_msg=key)
+
+    # The warm start must not change the initial values of the network tables
+    pd.testing.assert_frame_equal(warm_net.junction, net.junction)
+
+    cold_iterations = np.mean(cold_results["pipeflow.iterations_hydraulic"])
+    warm_iterations = np.mean(warm_results["pipeflow.iterations_hydraulic"])
+    logging.info(f"Hydraulic iterations per time step: {cold_iterations:.2f} without and {warm_iterations:.2f} with warm start")
+    assert warm_iterations < cold_iterations
+
+def test_time_series_interruption(start=0, end=24, interrupt_after=10):
+    qext_w = np.array([50000, 100000])
+    return_temperature = np.array([55, 45])
+    min_supply_temperature = np.array([65, 65])
+
+    net = initialize_test_net_heat_consumer(qext_w=qext_w, return_temperature=return_temperature, min_supply_temperature=min_supply_temperature)
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    # The progress function raises TimeSeriesInterrupted with the number of completed time steps
+    _, progress_function, _ = create_pipeflow_functions(interruption_check=lambda: True)
+    try:
+        progress_function(0, 0, range(end - start))
+        assert False, "TimeSeriesInterrupted was not raised"
+    except TimeSeriesInterrupted as e:
+        assert e.completed_steps == 0
+
+    # Without interruption every time step is reported once, the last one after the loop
+    progress = []
+    def progress_callback(completed_steps, n_steps, elapsed_time, hydraulic_iterations, thermal_iterations):
+        progress.append((completed_steps, n_steps, elapsed_time, hydraulic_iterations, thermal_iterations))
+
+    _, _, full_results = thermohydraulic_time_series_net(copy.deepcopy(net), yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, 
+                                                         return_temperature, progress_callback=progress_callback, interruption_check=lambda: False)
+    assert [entry[:2] for entry in progress] == [(i, end - start) for i in range(1, end - start + 1)]
+    assert all(entry[3] > 0 for entry in progress)
+    assert np.array_equal([entry[3] for entry in progress], full_results["pipeflow.iterations_hydraulic"])
+    assert np.all(np.diff([entry[2] for entry in progress]) >= 0)
+
+    # The interruption is requested after interrupt_after reported time steps, the completed time steps are returned
+    progress = []
+    interrupted_time_steps, _, interrupted_results = thermohydraulic_time_series_net(copy.deepcopy(net), yearly_time_steps, qext_w_profiles, start, end, 85, 
+                                                                                     min_supply_temperature, return_temperature, progress_callback=progress_callback, 
+                                                                                     interruption_check=lambda: len(progress) >= interrupt_after)
+    assert [entry[0] for entry in progress] == list(range(1, interrupt_after + 1))
+    assert len(interrupted_time_steps) == interrupt_after
+    np.testing.assert_array_equal(interrupted_time_steps, yearly_time_steps[start:start + interrupt_after])
+    assert set(interrupted_results) == set(full_results)
+    for key, values in full_results.items():
+        assert len(interrupted_results[key]) == interrupt_after, key
+        np.testing.assert_array_equal(interrupted_results[key], values[:interrupt_after], err_msg=key)
+
+    logging.info(f"Time series interrupted after {len(interrupted_time_steps)} of {end - start} time steps")
+
+def test_vectorized_controllers(start=0, end=48):
+    qext_w = np.array([50000, 100000])
+    return_temperature = np.array([55, 45])
+    min_supply_temperature = np.array([65, 65])
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    results = {}
+    for vectorized in [False, True]:
+        net = initialize_test_net_heat_consumer(qext_w=qext_w, return_temperature=return_temperature, min_supply_temperature=min_supply_temperature, 
+                                                vectorized_controllers=vectorized)
+        controller_types = [type(controller).__name__ for controller in net.controller.object.values]
+        assert ("VectorizedReturnTemperatureController" in controller_types) == vectorized
+        start_time = time.time()
+        _, _, results[vectorized] = thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, return_temperature)
+        logging.info(f"Time series calculation with vectorized={vectorized} controllers took {time.time() - start_time:.2f} seconds")
+
+    for key, values in results[False].items():
+        if key.startswith("res_"):
+            np.testing.assert_allclose(results[True][key], values, rtol=1e-9, err_msg=key)
+
+def test_parallel_time_series(start=0, end=744, n_workers=4):
+    qext_w = np.array([50000, 100000])
+    return_temperature = np.array([55, 45])
+    min_supply_temperature = np.array([65, 65])
+
+    net = initialize_test_net_heat_consumer(qext_w=qext_w, return_temperature=return_temperature, min_supply_temperature=min_supply_temperature)
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    start_time = time.time()
+    _, _, serial_results = thermohydraulic_time_series_net(copy.deepcopy(net), yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, return_temperature)
+    logging.info(f"Serial time series calculation took {time.time() - start_time:.2f} seconds")
+
+    start_time = time.time()
+    _, _, parallel_results = thermohydraulic_time_series_net_parallel(copy.deepcopy(net), yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, 
+                                                                      return_temperature, n_workers=n_workers)
+    logging.info(f"Parallel time series calculation with {n_workers} workers took {time.time() - start_time:.2f} seconds")
+
+    for key, values in serial_results.items():
+        np.testing.assert_allclose(parallel_results[key], values, rtol=1e-3, atol=1e-2, err_msg=key)
+
+    logging.info("Parallel results match the serial results")
+
+def test_typical_days_time_series(start=0, end=24*28, n_typical_days=4):
+    qext_w = np.array([50000, 100000])
+    return_temperature = np.array([55, 45])
+    min_supply_temperature = np.array([65, 65])
+
+    net = initialize_test_net_heat_consumer(qext_w=qext_w, return_temperature=return_temperature, min_supply_temperature=min_supply_temperature)
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    start_time = time.time()
+    time_steps, _, net_results, typical_days = thermohydraulic_time_series_net_typical_days(net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, 
+                                                                                            return_temperature, n_typical_days=n_typical_days, validate=True)
+    logging.info(f"Typical day time series calculation with validation took {time.time() - start_time:.2f} seconds")
+
+    assert len(time_steps) == len(net_results["res_junction.p_bar"])
+    assert np.sum(typical_days["weights"]) == (end - start) // 24
+
+    for name, error in typical_days["errors"].items():
+        if "heat_MWh" in name or "peak_kW" in name:
+            assert error < 0.05, f"{name}: {error:.2%}"
+
+def test_results_npz(tmp_path):
+    filename = os.path.join(tmp_path, "Lastgang.csv")
+    yearly_time_steps, qext_w_profiles = get_test_profiles()
+    pump_values = ["mass_flow", "deltap", "return_temp", "flow_temp", "return_pressure", "flow_pressure", "qext_kW"]
+    pump_results = {"Heizentrale Haupteinspeisung": {0: {value: np.random.rand(len(yearly_time_steps)) for value in pump_values}}}
+    total_heat_kW = np.sum(qext_w_profiles, axis=0) / 1000
+
+    save_results_csv(yearly_time_steps, total_heat_kW, np.zeros_like(total_heat_kW), pump_results, filename)
+    save_results_npz(yearly_time_steps, total_heat_kW, np.zeros_like(total_heat_kW), pump_results, filename.replace(".csv", ".npz"))
+
+    start_time = time.time()
+    csv_results = import_results_csv(filename)
+    logging.info(f"Import of the CSV results took {(time.time() - start_time)*1000:.1f} ms")
+
+    start_time = time.time()
+    npz_results = import_results_npz(filename.replace(".csv", ".npz"))
+    logging.info(f"Import of the NPZ results took {(time.time() - start_time)*1000:.1f} ms")
+
+    np.testing.assert_array_equal(csv_results[0], npz_results[0])
+    np.testing.assert_allclose(csv_results[1], npz_results[1])
+    for value in pump_values:
+        np.testing.assert_allclose(csv_results[3]["Heizentrale Haupteinspeisung"][0][value], npz_results[3]["Heizentrale Haupteinspeisung"][0][value])
+
+def test_net_results_store(tmp_path, start=0, end=48):
+    path = os.path.join(tmp_path, "Netzergebnisse")
+    net = initialize_test_net_heat_consumer()
+    yearly_time_steps, qext_w_profiles = get_test_profiles()
+
+    time_steps, net, net_results = thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, 85, np.array([65, 65]), np.array([55, 45]))
+    save_net_results_store(net, net_results, time_steps, path)
+
+    store = NetResultsStore(path)
+    np.testing.assert_array_equal(store.get_time_steps(), time_steps)
+    for variable in store.get_variables():
+        np.testing.assert_allclose(store.load(variable), net_results[variable])
+
+    # Single elements are read by their index in the network table
+    junction = net.junction.index[-1]
+    np.testing.assert_allclose(store.load("res_junction.p_bar", junction, 10, 20), net_results["res_junction.p_bar"][10:20, -1])
+    logging.info(f"Results store contains {len(store.get_variables())} variables")
+
+def test_adaptive_time_series(start=0, end=168, demand_threshold=0.1):
+    qext_w = np.array([50000, 100000])
+    return_temperature = np.array([55, 45])
+    min_supply_temperature = np.array([65, 65])
+
+    net = initialize_test_net_heat_consumer(qext_w=qext_w, return_temperature=return_temperature, min_supply_temperature=min_supply_temperature)
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    reference_net = copy.deepcopy(net)
+    interrupted_net = copy.deepcopy(net)
+    _, _, reference_results = thermohydraulic_time_series_net(reference_net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, return_temperature)
+
+    start_time = time.time()
+    time_steps, _, net_results = thermohydraulic_time_series_net_adaptive(net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, 
+                                                                         return_temperature, demand_threshold=demand_threshold)
+    logging.info(f"Adaptive time series calculation took {time.time() - start_time:.2f} seconds, solved {np.sum(net_results['pipeflow.solved'])} of {end - start} time steps")
+
+    assert len(time_steps) == len(net_results["res_junction.p_bar"]) == end - start
+    for key in ["res_junction.p_bar", "res_heat_consumer.t_to_k"]:
+        assert np.allclose(net_results[key][net_results["pipeflow.solved"]], reference_results[key][net_results["pipeflow.solved"]], rtol=1e-3)
+
+    # The progress is reported for the solved time steps, after an interruption the results end with the last solved time step
+    n_solved = np.sum(net_results["pipeflow.solved"])
+    progress = []
+    time_steps, _, interrupted_results = thermohydraulic_time_series_net_adaptive(interrupted_net, yearly_time_steps, qext_w_profiles, start, end, 85, 
+                                                                                  min_supply_temperature, return_temperature, demand_threshold=demand_threshold, 
+                                                                                  progress_callback=lambda *args: progress.append(args), 
+                                                                                  interruption_check=lambda: len(progress) >= n_solved // 2)
+    solved_steps = np.flatnonzero(net_results["pipeflow.solved"])
+    assert [entry[:2] for entry in progress] == [(i, n_solved) for i in range(1, n_solved // 2 + 1)]
+    assert len(time_steps) == len(interrupted_results["res_junction.p_bar"]) == solved_steps[n_solved // 2 - 1] + 1
+    assert np.sum(interrupted_results["pipeflow.solved"]) == n_solved // 2
+    assert np.allclose(interrupted_results["res_junction.p_bar"], net_results["res_junction.p_bar"][:len(time_steps)])
+
+def test_incremental_time_series(tmp_path, start=0, end=72):
+    path = os.path.join(tmp_path, "Netzergebnisse")
+    qext_w = np.array([50000, 100000])
+    return_temperature = np.array([55, 45])
+    min_supply_temperature = np.array([65, 65])
+
+    net = initialize_test_net_heat_consumer(qext_w=qext_w, return_temperature=return_temperature, min_supply_temperature=min_supply_temperature)
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    time_steps, net, net_results = thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, return_temperature)
+    inputs = time_series_inputs(qext_w_profiles, start, end, 85, min_supply_temperature, return_temperature)
+    save_net_results_store(net, net_results, time_steps, path, inputs, hash_net_parameters(net))
+
+    # Change the demand of one heat consumer on the second day
+    qext_w_profiles = qext_w_profiles.copy()
+    qext_w_profiles[1, start + 24:start + 48] *= 0.5
+
+    start_time = time.time()
+    _, _, incremental_results = thermohydraulic_time_series_net_incremental(net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, 
+                                                                            return_temperature, previous_results=NetResultsStore(path))
+    logging.info(f"Incremental time series calculation took {time.time() - start_time:.2f} seconds")
+    assert np.sum(incremental_results["pipeflow.solved"]) == 24
+
+    _, _, reference_results = thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, return_temperature)
+    for key in ["res_junction.p_bar", "res_heat_consumer.t_to_k", "res_heat_consumer.mdot_from_kg_per_s"]:
+        assert np.allclose(incremental_results[key], reference_results[key], rtol=1e-2)
+
+    # The progress is reported for the re-simulated time steps, after an interruption the results end before the first 
+    # affected time step which was not calculated again
+    progress = []
+    time_steps, _, interrupted_results = thermohydraulic_time_series_net_incremental(net, yearly_time_steps, qext_w_profiles, start, end, 85, min_supply_temperature, 
+                                                                                     return_temperature, previous_results=NetResultsStore(path), 
+                                                                                     progress_callback=lambda *args: progress.append(args), 
+                                                                                     interruption_check=lambda: len(progress) >= 10)
+    assert [entry[:2] for entry in progress] == [(i, 24) for i in range(1, 11)]
+    assert len(time_steps) == 34
+    assert np.sum(interrupted_results["pipeflow.solved"]) == 10
+    for key in ["res_junction.p_bar", "res_heat_consumer.t_to_k", "res_heat_consumer.mdot_from_kg_per_s"]:
+        assert np.allclose(interrupted_results[key], incremental_results[key][:34], rtol=1e-2)
+
+def test_worst_point_tracking(start=0, end=96):
+    qext_w = np.array([50000, 100000])
+    yearly_time_steps, qext_w_profiles = get_test_profiles(qext_w)
+
+    # The last heat consumer is switched off every other day, then the worst point moves to the first heat consumer
+    daily_switch = (np.arange(qext_w_profiles.shape[1]) // 24) % 2
+    qext_w_profiles[1] *= daily_switch
+
+    for track_worst_point in [False, True]:
+        net = initialize_test_net_heat_consumer(qext_w=qext_w, track_worst_point=track_worst_point)
+        time_steps, net, net_results = thermohydraulic_time_series_net(net, yearly_time_steps, qext_w_profiles, start, end, 85, np.array([65, 65]), np.array([55, 45]))
+
+        dp_controller = [ctrl for ctrl in net.controller.object.values if isinstance(ctrl, WorstPointPressureController)][0]
+        worst_point_changes = dp_controller.get_worst_point_changes()
+        logging.info(f"Worst point changes with track_worst_point={track_worst_point}: {worst_point_changes}")
+
+        if not track_worst_point:
+            # By default the worst point of the initialization is kept
+            assert worst_point_changes == []
+            continue
+
+        assert [change[0] for change in worst_point_changes] == [time_step for time_step in range(start, end, 24)]
+
+        # The pressure difference of the heat consumer with demand is controlled in every time step
+        p_bar = net_results["res_junction.p_bar"]
+        dp_bar = p_bar[:, net.heat_consumer.from_junction.values] - p_bar[:, net.heat_consumer.to_junction.values]
+        worst_point_dp_bar = np.where(daily_switch[start:end] == 1, dp_bar[:, 1], dp_bar[:, 0])
+        assert np.all(np.abs(worst_point_dp_bar - dp_controller.target_dp_min_bar) < dp_controller.tolerance), worst_point_dp_bar
+
+def test_net_snapshot_cache(tmp_path):
+    path = os.path.join(tmp_path, "Netzinitialisierung Snapshot")
+    net = initialize_test_net_heat_consumer()
+    yearly_time_steps, qext_w_profiles = get_test_profiles()
+    parameters = {"supply_temperature": 85, "v_max_pipe": 1.0}
+
+    key = hash_initialization_inputs([], parameters)
+    save_net_snapshot(path, key, net, {"yearly_time_steps": yearly_time_steps, "waerme_hast_ges_W": qext_w_profiles})
+
+    snapshot_net, arrays = load_net_snapshot(path, key)
+    assert snapshot_net.pipe.equals(net.pipe) and len(snapshot_net.controller) == len(net.controller)
+    np.testing.assert_array_equal(arrays["waerme_hast_ges_W"], qext_w_profiles)
+
+    # Changed parameters invalidate the snapshot
+    assert load_net_snapshot(path, hash_initialization_inputs([], {**parameters, "v_max_pipe": 1.5})) is None
+
+    # An overwrite interrupted after the network was written leaves no usable snapshot behind
+    new_key = hash_initialization_inputs([], {**parameters, "supply_temperature": 90})
+    savez = np.savez
+    def interrupted_savez(*args, **kwargs):
+        raise KeyboardInterrupt
+    np.savez = interrupted_savez
+    try:
+        save_net_snapshot(path, new_key, net, {"yearly_time_steps": yearly_time_steps})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        np.savez = savez
+    assert load_net_snapshot(path, key) is None
+    assert load_net_snapshot(path, new_key) is None
+
+    # A complete overwrite replaces the snapshot
+    save_net_snapshot(path, new_key, net, {"yearly_time_steps": yearly_time_steps, "waerme_hast_ges_W": qext_w_profiles})
+    assert load_net_snapshot(path, key) is None
+    assert load_net_snapshot(path, new_key) is not None
+
+def create_test_network_files(path):
+    # The lines of the sample network meet in one point 35 km away from the buildings, it is moved next to the buildings
+    source_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "districtheatingsim", "project_data", "Beispiel", "Wärmenetz")
+    filenames = []
+    for name in ["Vorlauf", "Rücklauf", "HAST", "Erzeugeranlagen"]:
+        gdf = gpd.read_file(os.path.join(source_path, f"{name}.geojson"))
+        if name in ["Vorlauf", "Rücklauf"]:
+            center = np.mean([line.coords[0] for line in gdf.geometry], axis=0) + [0, -20]
+            gdf.geometry = [LineString([line.coords[0], center]) for line in gdf.geometry]
+        filenames.append(os.path.join(path, f"{name}.geojson"))
+        gdf.to_file(filenames[-1], driver="GeoJSON")
+    return filenames
+
+def create_test_building_data(hast_filename, json_filename, hours=48, seed=42):
+    # Random load profiles in the format of the building data, one building per heat exchanger
+    n_buildings = len(gpd.read_file(hast_filename))
+    time_steps = np.arange(np.datetime64('2021-01-01T00'), np.datetime64('2021-01-01T00') + np.timedelta64(hours, 'h'), np.timedelta64(1, 'h'))
+    heat_kW = np.random.default_rng(seed).uniform(10, 50, (n_buildings, hours))
+
+    building_data = {str(i): {"VLT_max": 70, "RLT_max": 55, "zeitschritte": time_steps.astype(str).tolist(), "wärme": heat_kW[i].tolist(),
+                              "heizwärme": (heat_kW[i] * 0.8).tolist(), "warmwasserwärme": (heat_kW[i] * 0.2).tolist(),
+                              "vorlauftemperatur": np.full(hours, 70.0).tolist(), "rücklauftemperatur": np.full(hours, 55.0).tolist(),
+                              "max_last": heat_kW.max(axis=1).tolist()} for i in range(n_buildings)}
+    with open(json_filename, 'w', encoding='utf-8') as f:
+        json.dump(building_data, f)
+
+def optimize_diameter_types_greedy(net, v_max=1.0, material_filter="KMR", insulation_filter="2v"):
+    # Previous implementation of optimize_diameter_types, which resizes one pipe per pipeflow calculation
+    pp.pipeflow(net, mode="all")
+    pipe_std_types = pp.std_types.available_std_types(net, "pipe")
+    filtered_types = pipe_std_types[(pipe_std_types['material'] == material_filter) & (pipe_std_types['insulation'] == insulation_filter)]
+    type_position_dict = {type_name: i for i, type_name in enumerate(filtered_types.index)}
+
+    def set_type(pipe_idx, type_name):
+        net.pipe.std_type.at[pipe_idx] = type_name
+        net.pipe.at[pipe_idx, 'diameter_m'] = filtered_types.loc[type_name, 'inner_diameter_mm'] / 1000
+        net.pipe.at[pipe_idx, 'k_mm'] = filtered_types.loc[type_name, 'RAU']
+        net.pipe.at[pipe_idx, 'alpha_w_per_m2k'] = filtered_types.loc[type_name, 'WDZAHL']
+
+    for pipe_idx, velocity in enumerate(net.res_pipe.v_mean_m_per_s):
+        required_diameter = net.pipe.at[pipe_idx, 'diameter_m'] * (velocity / v_max)**0.5
+        set_type(pipe_idx, min(filtered_types.index, key=lambda x: abs(filtered_types.loc[x, 'inner_diameter_mm'] / 1000 - required_diameter)))
+    pp.pipeflow(net, mode="all")
+
+    net.pipe['optimized'] = False
+    change_made = True
+    while change_made:
+        change_made = False
+        for pipe_idx, velocity in enumerate(net.res_pipe.v_mean_m_per_s):
+            if net.pipe.at[pipe_idx, 'optimized'] and velocity <= v_max:
+                continue
+
+            current_type = net.pipe.std_type.at[pipe_idx]
+            current_type_position = type_position_dict[current_type]
+            if velocity > v_max and current_type_position < len(filtered_types) - 1:
+                set_type(pipe_idx, filtered_types.index[current_type_position + 1])
+                change_made = True
+            elif velocity <= v_max and current_type_position > 0:
+                set_type(pipe_idx, filtered_types.index[current_type_position - 1])
+                pp.pipeflow(net, mode="all")
+                if net.res_pipe.v_mean_m_per_s[pipe_idx] <= v_max:
+                    change_made = True
+                else:
+                    set_type(pipe_idx, current_type)
+                    net.pipe.at[pipe_idx, 'optimized'] = True
+            else:
+                net.pipe.at[pipe_idx, 'optimized'] = True
+
+        if change_made:
+            pp.pipeflow(net, mode="all")
+    return net
+
+def test_optimize_diameter_types(tmp_path, initial_type="KMR 100/250-2v"):
+    # Sample network and network from GeoJSON files, both start from the same pipe type for all pipes
+    vorlauf, ruecklauf, hast, erzeugeranlagen = create_test_network_files(tmp_path)
+    json_filename = os.path.join(tmp_path, "Gebäude Lastgang.json")
+    create_test_building_data(hast, json_filename)
+    COP_filename = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "districtheatingsim", "data", "COP", "Kennlinien WP.csv")
+    geojson_net = initialize_geojson(vorlauf, ruecklauf, hast, erzeugeranlagen, json_filename, COP_filename, None, None, 85, 4, 1.5, "Niedertemperaturnetz", 
+                                     initial_type, 5, 1.0, "KMR", "2v", 1.5, 0.1)[0]
+
+    for net in [initialize_test_net_heat_consumer(), geojson_net]:
+        properties = pp.std_types.load_std_type(net, initial_type, "pipe")
+        net.pipe['std_type'] = initial_type
+        net.pipe['diameter_m'] = properties['inner_diameter_mm'] / 1000
+        run_control(net, mode="all")
+
+        greedy_net = optimize_diameter_types_greedy(copy.deepcopy(net))
+        net = optimize_diameter_types(net)
+
+        assert (net.pipe.std_type.values == greedy_net.pipe.std_type.values).all(), f"{net.pipe.std_type.values} != {greedy_net.pipe.std_type.values}"
+        logging.info(f"Optimized pipe types match the previous implementation: {net.pipe.std_type.values}")
+
+def test_create_network_reference(tmp_path, seed=42):
+    # Comparison of the network built with the bulk creators and the unchanged copy of the previous build with one call per element
+    from tests.pp_net_initialisation_reference import create_network as create_network_reference
+
+    vorlauf, ruecklauf, hast, erzeugeranlagen = [load_geojson(filename) for filename in create_test_network_files(tmp_path)]
+    qext_w = np.random.default_rng(seed).uniform(10000, 50000, len(hast))
+    args = (qext_w, np.full(len(hast), 65.0), np.full(len(hast), 55.0), 85, 4, 1.5, "KMR 100/250-2v", 1.0, "KMR", "2v")
+
+    start_time = time.time()
+    reference_net = create_network_reference(vorlauf.copy(), ruecklauf.copy(), hast.copy(), erzeugeranlagen.copy(), *args, v_max_heat_consumer=1.5)
+    time_reference = time.time() - start_time
+
+    start_time = time.time()
+    net = create_network(vorlauf.copy(), ruecklauf.copy(), hast.copy(), erzeugeranlagen.copy(), *args, v_max_heat_consumer=1.5)
+    time_bulk = time.time() - start_time
+
+    # The junctions are numbered differently, they are compared by their coordinates
+    def get_junction_keys(net):
+        geodata = net.junction_geodata.loc[net.junction.index]
+        return pd.Series([get_coordinate_key((x, y)) for x, y in zip(geodata.x, geodata.y)], index=net.junction.index)
+
+    def get_table(net, table_name, junction_columns):
+        table = net[table_name].copy()
+        junction_keys = get_junction_keys(net)
+        for column in junction_columns:
+            table[column] = junction_keys.loc[table[column]].values
+        return table
+
+    junctions, reference_junctions = [net.junction.drop(columns="name").set_index(get_junction_keys(net)).sort_index() for net in [net, reference_net]]
+    assert get_junction_keys(net).is_unique and len(junctions) == len(reference_junctions)
+    pd.testing.assert_frame_equal(junctions, reference_junctions, check_names=False)
+
+    for table_name, junction_columns in [("pipe", ["from_junction", "to_junction"]), ("heat_consumer", ["from_junction", "to_junction"]), 
+                                         ("circ_pump_pressure", ["return_junction", "flow_junction"])]:
+        pd.testing.assert_frame_equal(get_table(net, table_name, junction_columns), get_table(reference_net, table_name, junction_columns), obj=table_name)
+
+    np.testing.assert_allclose(net.res_pipe.v_mean_m_per_s.values, reference_net.res_pipe.v_mean_m_per_s.values, rtol=1e-6, atol=1e-9)
+    logging.info(f"Network with {len(net.junction)} junctions and {len(net.pipe)} pipes built in {time_bulk:.2f} s, previous build {time_reference:.2f} s")
+
+def test_presize_diameter_types():
+    net = initialize_test_net_heat_consumer()
+    optimized_std_types = net.pipe.std_type.values.copy()
+
+    # Start from the initial pipe type with the converged mass flows of the heat consumers
+    net.pipe['std_type'] = "KMR 100/250-2v"
+    net = presize_diameter_types(net, v_max_pipe=1)
+
+    assert (net.pipe.std_type.values == optimized_std_types).all(), f"{net.pipe.std_type.values} != {optimized_std_types}"
+    assert net.res_pipe.v_mean_m_per_s.max() <= 1
+
+    logging.info(f"Presized pipe types match the optimized pipe types: {optimized_std_types}")
+
+def test_presize_parallel_pipes(v_max_pipe=1, initial_type="KMR 100/250-2v"):
+    net = initialize_test_net_heat_consumer()
+
+    # Second pipe parallel to the first pipe of the flow line, both carry the mass flow of all heat consumers together
+    first_pipe = net.pipe.loc[0]
+    parallel_pipe = pp.create_pipe(net, first_pipe.from_junction, first_pipe.to_junction, std_type=initial_type, length_km=first_pipe.length_km,
+                                   k_mm=first_pipe.k_mm, alpha_w_per_m2k=first_pipe.alpha_w_per_m2k, name="parallel pipe1", sections=5, text_k=283)
+    net.pipe['std_type'] = initial_type
+    net = presize_diameter_types(net, v_max_pipe=v_max_pipe)
+
+    pipe_std_types = pp.std_types.available_std_types(net, "pipe")
+    filtered_types = pipe_std_types[(pipe_std_types['material'] == "KMR") & (pipe_std_types['insulation'] == "2v")]
+    density = net.fluid.get_density(net.circ_pump_pressure.t_flow_k.iloc[0])
+    required_diameter_m = np.sqrt(4 * net.heat_consumer.controlled_mdot_kg_per_s.sum() / 2 / (density * v_max_pipe * np.pi))
+    expected_type = filtered_types.index[np.searchsorted(filtered_types.inner_diameter_mm.values / 1000, required_diameter_m)]
+
+    assert net.pipe.std_type.at[0] == net.pipe.std_type.at[parallel_pipe] == expected_type, f"{net.pipe.std_type.values}, expected {expected_type}"
+    logging.info(f"Parallel pipes are presized with {expected_type}")
+
+def test_optimize_presized_diameter_types(v_max_pipe=1):
+    net = initialize_test_net_heat_consumer()
+    net.pipe['std_type'] = "KMR 100/250-2v"
+    net = presize_diameter_types(net, v_max_pipe=v_max_pipe)
+    presized_std_types = net.pipe.std_type.values.copy()
+    within_v_max = net.res_pipe.v_mean_m_per_s.values <= v_max_pipe
+
+    # Record the pipe types of every pipeflow calculation in optimize_diameter_types, the second one follows the initial adjustment
+    utilities_module = sys.modules[optimize_diameter_types.__module__]
+    pipeflow = utilities_module.cached_pipeflow
+    std_types = []
+    def recorded_pipeflow(net, **kwargs):
+        std_types.append(net.pipe.std_type.values.copy())
+        pipeflow(net, **kwargs)
+
+    utilities_module.cached_pipeflow = recorded_pipeflow
+    try:
+        net = optimize_diameter_types(net, v_max=v_max_pipe)
+    finally:
+        utilities_module.cached_pipeflow = pipeflow
+
+    assert within_v_max.any()
+    assert (std_types[1][within_v_max] == presized_std_types[within_v_max]).all(), f"{std_types[1]} != {presized_std_types}"
+    assert (net.pipe.std_type.values == presized_std_types).all(), f"{net.pipe.std_type.values} != {presized_std_types}"
+    assert net.res_pipe.v_mean_m_per_s.max() <= v_max_pipe
+
+    logging.info(f"Presized pipe types are kept by the initial adjustment: {presized_std_types}")
+
+def test_cached_pipeflow(qext_w=np.array([50000, 100000]), cache_size=8):
+    net = initialize_test_net_heat_consumer(qext_w=qext_w)
+    clear_pipeflow_cache()
+    set_pipeflow_cache_size(cache_size)
+
+    # Count the calculations which are not restored from the cache
+    pipeflow = pp.pipeflow
+    pipeflow_calls = []
+    def counted_pipeflow(net, **kwargs):
+        pipeflow_calls.append(hash_net_state(net, **kwargs))
+        pipeflow(net, **kwargs)
+
+    def set_demand(net, factor):
+        net.heat_consumer['qext_w'] = qext_w * factor
+
+    pp.pipeflow = counted_pipeflow
+    try:
+        # Miss, other state, then hit of the first state
+        set_demand(net, 1.0)
+        cached_pipeflow(net, mode="all")
+        set_demand(net, 1.1)
+        cached_pipeflow(net, mode="all")
+        set_demand(net, 1.0)
+        cached_pipeflow(net, mode="all")
+        assert len(pipeflow_calls) == 2 and len(pipeflow_cache) == 2
+
+        # The results of the restored network are identical to a new calculation of the same state, the internal arrays of the 
+        # previous state are removed
+        reference_net = copy.deepcopy(net)
+        pipeflow(reference_net, mode="all")
+        for component in net.component_list:
+            table_name = f"res_{component.table_name()}"
+            pd.testing.assert_frame_equal(net[table_name], reference_net[table_name])
+        assert net["_internal_results"] == reference_net["_internal_results"] and net.converged
+        assert "_pit" not in net and "_active_pit" not in net
+
+        # Changes of the restored results do not change the cache
+        net.res_junction['p_bar'] = 0
+        set_demand(net, 1.1)
+        cached_pipeflow(net, mode="all")
+        set_demand(net, 1.0)
+        cached_pipeflow(net, mode="all")
+        assert len(pipeflow_calls) == 2
+        pd.testing.assert_frame_equal(net.res_junction, reference_net.res_junction)
+
+        # Eviction of the least recently used state after cache_size states
+        for factor in np.linspace(0.5, 0.9, cache_size - 1):
+            set_demand(net, factor)
+            cached_pipeflow(net, mode="all")
+        assert len(pipeflow_calls) == cache_size + 1 and len(pipeflow_cache) == cache_size
+
+        # The state with factor 1.1 was used least recently and is calculated again, the state with factor 1.0 is still cached
+        set_demand(net, 1.0)
+        cached_pipeflow(net, mode="all")
+        assert len(pipeflow_calls) == cache_size + 1
+        set_demand(net, 1.1)
+        cached_pipeflow(net, mode="all")
+        assert len(pipeflow_calls) == cache_size + 2 and len(pipeflow_cache) == cache_size
+
+        # A smaller cache size removes the least recently used states
+        set_pipeflow_cache_size(2)
+        assert len(pipeflow_cache) == 2
+        set_pipeflow_cache_size(cache_size)
+
+        # Networks calculated in parallel threads get the same results as sequentially calculated networks
+        factors = np.tile(np.linspace(0.6, 1.0, 4), 2)
+        nets = [copy.deepcopy(net) for _ in factors]
+        for thread_net, factor in zip(nets, factors):
+            set_demand(thread_net, factor)
+        clear_pipeflow_cache()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda thread_net: cached_pipeflow(thread_net, mode="all"), nets))
+        for thread_net, factor in zip(nets, factors):
+            set_demand(reference_net, factor)
+            pipeflow(reference_net, mode="all")
+            pd.testing.assert_frame_equal(thread_net.res_junction, reference_net.res_junction)
+        assert len(pipeflow_cache) == 4
+    finally:
+        pp.pipeflow = pipeflow
+        clear_pipeflow_cache()
+        set_pipeflow_cache_size(PIPEFLOW_CACHE_SIZE)
+
+    logging.info(f"{len(pipeflow_calls)} pipeflow calculations, {cache_size} states cached")
+
+def test_cop_matrix(n_buildings=500, hours=8760):
+    # Time-varying supply temperatures of the buildings and one source temperature per building
+    np.random.seed(42)
+    supply_temperatures = np.random.uniform(40, 80, (n_buildings, hours))
+    source_temperatures = np.random.uniform(5, 25, n_buildings)
+
+    start_time = time.time()
+    COP, _ = COP_WP(supply_temperatures, source_temperatures[:, np.newaxis])
+    logging.info(f"COP of {n_buildings} buildings and {hours} hours calculated in {time.time() - start_time:.2f} seconds")
+
+    for i in range(0, n_buildings, 50):
+        np.testing.assert_allclose(COP[i], COP_WP(supply_temperatures[i], source_temperatures[i])[0])
+
+def test_net_matrix_export(tmp_path):
+    filename = os.path.join(tmp_path, "Netz_Matrizen.npz")
+    net = initialize_test_net_heat_consumer()
+    export_net_matrices(net, filename)
+    matrices = import_net_matrices(filename)
+
+    # Mass flows of the pipes from the continuity equation match the pipeflow results
+    branch_mdot = calculate_branch_mass_flows(matrices, net.res_heat_consumer.mdot_from_kg_per_s.values)
+    np.testing.assert_allclose(branch_mdot[matrices["branch.table"] == "pipe"], net.res_pipe.mdot_from_kg_per_s.values)
+
+    # The imported network gives the same pipeflow results
+    imported_net = create_net_from_matrices(matrices)
+    assert imported_net.pipe.equals(net.pipe[imported_net.pipe.columns])
+    pp.pipeflow(net, mode="all")
+    pp.pipeflow(imported_net, mode="all")
+    np.testing.assert_allclose(imported_net.res_junction.values, net.res_junction.values)
+
+    # Mass flows of a whole year in one call
+    yearly_time_steps, qext_w_profiles = get_test_profiles()
+    consumer_mdot = net.heat_consumer.controlled_mdot_kg_per_s.values[:, np.newaxis] * qext_w_profiles / net.heat_consumer.qext_w.values[:, np.newaxis]
+    start_time = time.time()
+    branch_mdot = calculate_branch_mass_flows(matrices, consumer_mdot)
+    logging.info(f"Mass flows of {branch_mdot.shape[0]} branches for {branch_mdot.shape[1]} time steps calculated in {time.time() - start_time:.3f} seconds")
+
+def test_net_surrogate(n_samples=24, n_validation=48, tolerances={"mass_flow": 0.02, "deltap": 0.2, "flow_temp": 0.01, "return_temp": 1.0, "deltap_worst_point": 0.2}):
+    # Maximum absolute errors of the predictions in kg/s, bar and °C
+    net = initialize_test_net_heat_consumer()
+    validation_net = copy.deepcopy(net)
+    yearly_time_steps, qext_w_profiles = get_test_profiles()
+    surrogate, net, _ = fit_net_surrogate(net, yearly_time_steps, qext_w_profiles, 0, 8760, n_samples=n_samples)
+
+    # Validation against a full calculation of time steps spread over the year
+    time_step_indices = np.linspace(0, 8759, n_validation).astype(int)
+    _, validation_net, net_results = thermohydraulic_time_series_net(validation_net, yearly_time_steps[time_step_indices], qext_w_profiles[:, time_step_indices], 0, len(time_step_indices))
+    reference = extract_surrogate_targets(validation_net, net_results)
+    predictions = surrogate.predict(qext_w_profiles[:, time_step_indices])
+    for target in SURROGATE_TARGETS:
+        error = np.max(np.abs(predictions[target] - reference[target]))
+        logging.info(f"Surrogate validation error {target}: {error:.4f}")
+        assert error <= tolerances[target], f"{target}: {error:.4f} > {tolerances[target]}"
+
+    start_time = time.time()
+    surrogate.predict(qext_w_profiles)
+    logging.info(f"Surrogate predictions per second: {qext_w_profiles.shape[1] / (time.time() - start_time):.0f}")
+
+def test_batch_simulation_resume(tmp_path, n_workers=2, end=24):
+    path = os.path.join(tmp_path, "Batch")
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    COP_filename = os.path.join(base_path, "src", "districtheatingsim", "data", "COP", "Kennlinien WP.csv")
+    json_filename = os.path.join(path, "Gebäude Lastgang.json")
+    results_filename = os.path.join(path, "Ergebnisse.csv")
+
+    os.makedirs(path)
+    vorlauf, ruecklauf, hast, erzeugeranlagen = create_test_network_files(path)
+    create_test_building_data(hast, json_filename)
+
+    batch_data = load_batch_data(vorlauf, ruecklauf, hast, erzeugeranlagen, json_filename, COP_filename)
+    scenarios = create_scenario_grid(supply_temperature=[80, 85], dT_RL=[5, 10], end=[end])
+    results = run_batch_simulation(batch_data, scenarios, results_filename, n_workers=n_workers)
+    assert len(results) == 4 and (results["status"] == "ok").all()
+
+    # Crash after two completed scenarios, while the result table was written: the file contains two scenarios and the 
+    # temporary file is incomplete
+    with open(results_filename, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(results_filename, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:3])
+    with open(results_filename + ".tmp", 'w', encoding='utf-8') as f:
+        f.writelines(lines[:4])
+        f.write(lines[4][:len(lines[4]) // 2])
+    completed = load_batch_results(results_filename)
+    assert len(completed) == 2
+
+    resumed = run_batch_simulation(batch_data, scenarios, results_filename, n_workers=n_workers)
+    assert len(resumed) == 4 and (resumed["status"] == "ok").all()
+    assert not os.path.exists(results_filename + ".tmp")
+
+    # Only the missing scenarios are simulated again, the completed ones keep their results and calculation times
+    pd.testing.assert_frame_equal(resumed.iloc[:2], completed)
+    assert set(resumed["scenario_id"]) == set(results["scenario_id"])
+    resumed_again = resumed.set_index("scenario_id").loc[results["scenario_id"].iloc[2:]]
+    assert (resumed_again["calculation_time_s"].values != results["calculation_time_s"].iloc[2:].values).all()
+
+    # Changed input files give new identifiers, the results are not reused
+    create_test_building_data(hast, json_filename, seed=1)
+    changed_batch_data = load_batch_data(vorlauf, ruecklauf, hast, erzeugeranlagen, json_filename, COP_filename)
+    assert not {get_scenario_id(scenario, changed_batch_data["input_hash"]) for scenario in scenarios} & set(resumed["scenario_id"])
+
+if __name__ == "__main__":
+    # Files written by the tests are stored in a temporary folder, with pytest the tmp_path fixture is used
+    tmp_path = tempfile.mkdtemp()
+    #get_test_net()
+    #get_test_net_2()
+    #initialize_net_geojson()
+    #initialize_net_geojson2()
+    #test_warm_start_time_series()
+    #test_time_series_interruption()
+    #test_vectorized_controllers()
+    #test_parallel_time_series()
+    #test_typical_days_time_series()
+    #test_results_npz(tmp_path)
+    #test_net_results_store(tmp_path)
+    #test_create_network_reference(tmp_path)
+    #test_presize_diameter_types()
+    #test_optimize_presized_diameter_types()
+    #test_presize_parallel_pipes()
+    #test_cached_pipeflow()
+    #test_optimize_diameter_types(tmp_path)
+    #test_adaptive_time_series()
+    #test_incremental_time_series(tmp_path)
+    #test_worst_point_tracking()
+    #test_net_snapshot_cache(tmp_path)
+    #test_cop_matrix()
+    #test_net_matrix_export(tmp_path)
+    #test_net_surrogate()
+    #test_batch_simulation_resume(tmp_path)